@@ -1,4 +1,3 @@
-# ===== app/__init__.py =====
 """
 Wereng Classification API Package
 """
@@ -6,32 +5,3 @@ Wereng Classification API Package
 __version__ = "1.0.0"
 __author__ = "Your Name"
 __description__ = "API for wereng (planthopper) classification using Deep Learning"
-
-
-# ===== app/routes/__init__.py =====
-"""
-API Routes Package
-"""
-
-from . import classify
-from . import info
-
-__all__ = ['classify', 'info']
-
-
-# ===== app/utils/__init__.py =====
-"""
-Utilities Package
-"""
-
-from .preprocessing import preprocess_image, preprocess_image_from_bytes
-from .helper import load_model, predict_image, save_upload_file, log_prediction
-
-__all__ = [
-    'preprocess_image',
-    'preprocess_image_from_bytes', 
-    'load_model',
-    'predict_image',
-    'save_upload_file',
-    'log_prediction'
-]
\ No newline at end of file
@@ -5,11 +5,51 @@ FastAPI backend untuk klasifikasi hama wereng pada tanaman padi
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 from datetime import datetime
 
-from app.routes import classify, info
+from app.routes import classify, info, stats, jobs
+from app.utils.executor import decode_executor
+from app.utils.log_writer import log_writer
+from app.utils.stats import prediction_stats
+from app.utils.model_manager import MODEL_LOAD_MODE
+from app.utils.model_registry import model_registry
+from app.utils.shm_inference import stop_inference_pool
+from app.utils.cache import prediction_cache
+from app.utils.metrics import registry, MetricsMiddleware
+from app.utils.upload import UploadLimitMiddleware
+from app.utils.rate_limit import RateLimitMiddleware, admission_store
+from app.utils.jobs import job_runner, JOB_MAX_UPLOAD_BYTES
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lifecycle aplikasi: scan registry model dan load versi aktif sesuai MODEL_LOAD_MODE
+    saat startup, hentikan worker inferensi saat shutdown
+    """
+    # eager menunggu model siap; background / lazy hanya scan folder model
+    await asyncio.get_running_loop().run_in_executor(None, model_registry.start, MODEL_LOAD_MODE)
+    
+    # Bangun agregat statistik dari snapshot + prediction store di background
+    decode_executor.submit(prediction_stats.refresh)
+    
+    # Worker job klasifikasi (melanjutkan job yang terputus saat restart)
+    job_runner.start()
+    
+    yield
+    
+    job_runner.stop()
+    model_registry.shutdown()
+    # Hanya menghentikan pool jika dibuat oleh proses ini (bukan pool milik master Gunicorn)
+    stop_inference_pool()
+    log_writer.stop()
+    prediction_stats.persist()
+    decode_executor.shutdown(wait=False)
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -17,9 +57,19 @@ app = FastAPI(
     description="API untuk mengklasifikasi hama wereng pada tanaman padi menggunakan Computer Vision",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    # orjson: serialisasi response (terutama batch/job besar) jauh lebih murah dari json bawaan
+    default_response_class=ORJSONResponse
 )
 
+# Tolak body request yang terlalu besar sebelum multipart di-parse
+# (ditambahkan sebelum CORS agar response 413 tetap mendapat header CORS)
+app.add_middleware(UploadLimitMiddleware, path_limits={"/api/jobs": JOB_MAX_UPLOAD_BYTES})
+
+# Token bucket per client + batas request inferensi bersamaan (429 / 503 sebelum body dibaca)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS Middleware - Allow all origins for development
 app.add_middleware(
     CORSMiddleware,
@@ -29,9 +79,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latency per route untuk /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(classify.router, prefix="/api", tags=["Classification"])
 app.include_router(info.router, prefix="/api", tags=["Model Info"])
+app.include_router(stats.router, prefix="/api", tags=["Statistics"])
+app.include_router(jobs.router, prefix="/api", tags=["Jobs"])
 
 
 @app.get("/", tags=["Root"])
@@ -59,6 +114,129 @@ async def health_check():
     }
 
 
+def _cache_lookups() -> dict:
+    cache = prediction_cache.get_stats()
+    return {
+        ("memory_hit",): cache["memory_hits"],
+        ("disk_hit",): cache["disk_hits"],
+        ("miss",): cache["misses"]
+    }
+
+
+def _batcher_total(key: str) -> int:
+    # Jumlahkan statistik antrian inferensi semua versi model yang sedang di-load
+    return sum(manager.batcher.get_stats()[key] for manager in model_registry.managers().values())
+
+
+def _model_load_seconds() -> dict:
+    values = {}
+    for version, manager in model_registry.managers().items():
+        values[(version, "load")] = manager.load_seconds
+        values[(version, "warmup")] = manager.warmup_seconds
+    return values
+
+
+def _register_metrics():
+    """
+    Gauge yang dihitung saat scrape dari statistik komponen yang sudah ada
+    (tidak ada kerja tambahan di jalur request)
+    """
+    registry.gauge(
+        "wereng_queue_depth",
+        "Items waiting in each internal queue",
+        ("queue",),
+        callback=lambda: {
+            ("inference",): _batcher_total("queue_depth"),
+            ("decode",): decode_executor.get_stats()["queue_depth"],
+            ("log",): log_writer.get_stats()["queue_depth"]
+        }
+    )
+    registry.counter(
+        "wereng_rejected_total",
+        "Requests rejected because a queue was full",
+        ("queue",),
+        callback=lambda: {
+            ("inference",): _batcher_total("total_rejected"),
+            ("decode",): decode_executor.get_stats()["rejected"],
+            ("log",): log_writer.get_stats()["dropped"]
+        }
+    )
+    registry.counter(
+        "wereng_cache_lookups_total",
+        "Prediction cache lookups by result",
+        ("result",),
+        callback=_cache_lookups
+    )
+    registry.counter(
+        "wereng_admission_rejected_total",
+        "Inference requests rejected by admission control",
+        ("reason",),
+        callback=lambda: {
+            ("rate_limited",): admission_store.get_stats()["rate_limited"],
+            ("capacity",): admission_store.get_stats()["capacity"]
+        }
+    )
+    registry.counter(
+        "wereng_admission_store_errors_total",
+        "Admission store failures (requests admitted without a limit check)",
+        callback=lambda: admission_store.get_stats()["errors"]
+    )
+    registry.gauge(
+        "wereng_admission_inflight",
+        "Images reserved for inference across all workers",
+        callback=admission_store.inflight
+    )
+    registry.gauge(
+        "wereng_cache_hit_ratio",
+        "Prediction cache hit rate since start",
+        callback=lambda: prediction_cache.get_stats()["hit_rate"]
+    )
+    registry.gauge(
+        "wereng_model_load_seconds",
+        "Time spent loading and warming up each model version",
+        ("version", "phase"),
+        callback=_model_load_seconds
+    )
+    registry.gauge(
+        "wereng_model_ready",
+        "1 if the active model is loaded and warmed up",
+        callback=lambda: 1 if model_registry.get_status()["ready"] else 0
+    )
+
+
+_register_metrics()
+
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+async def metrics():
+    """
+    Metrics format Prometheus: latency per stage (read, hash, save, decode, resize,
+    normalize, queue_wait, inference, log, log_flush), ukuran batch, kedalaman antrian,
+    cache hit rate, dan waktu load model
+    """
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/ready", tags=["Root"])
+async def readiness_check():
+    """
+    Readiness endpoint - 200 jika model aktif sudah di-load dan warm-up, 503 jika belum
+    """
+    status = model_registry.get_status()
+    
+    return JSONResponse(
+        status_code=200 if status["ready"] else 503,
+        content={
+            "status": "ready" if status["ready"] else "starting",
+            "model": status,
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+
 # Exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
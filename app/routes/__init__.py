@@ -0,0 +1,5 @@
+"""
+API Routes Package
+"""
+
+__all__ = ['classify', 'info', 'stats', 'jobs']
@@ -3,38 +3,189 @@ Classification Route
 Endpoint untuk klasifikasi gambar hama wereng
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from datetime import datetime
+import asyncio
 import os
 from typing import Optional
 
-from app.utils.preprocessing import preprocess_image
-from app.utils.helper import load_model, predict_image, save_upload_file, log_prediction
+from app.utils.preprocessing import load_image_array, augment_batch
+from app.utils.helper import (
+    save_upload_bytes, log_prediction, average_predictions, top_predictions, probability_list,
+    CLASS_LABELS, PERSIST_UPLOADS
+)
+from app.utils.model_manager import ModelManager
+from app.utils.model_registry import model_registry, ModelNotFound
+from app.utils.executor import decode_executor, ExecutorSaturated
+from app.utils.cache import prediction_cache, make_cache_key
+from app.utils.upload import read_upload, UploadRejected
 
 router = APIRouter()
 
-# Load model saat startup
-MODEL_PATH = "app/models/wereng_classifier.h5"
-model = None
+# Jumlah file maksimal per request /classify/batch
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "200"))
 
-try:
-    if os.path.exists(MODEL_PATH):
-        model = load_model(MODEL_PATH)
-        print("✅ Model loaded successfully")
-    else:
-        print("⚠️  Model file not found. Using dummy prediction mode.")
-except Exception as e:
-    print(f"⚠️  Error loading model: {e}. Using dummy prediction mode.")
+# Test-time augmentation untuk /classify: off, always, atau low_confidence
+# (hanya jika confidence prediksi awal di bawah TTA_CONFIDENCE_THRESHOLD)
+TTA_MODES = ("off", "always", "low_confidence")
+TTA_MODE = os.getenv("TTA_MODE", "off").lower()
+TTA_CONFIDENCE_THRESHOLD = float(os.getenv("TTA_CONFIDENCE_THRESHOLD", "0.6"))
+TTA_AUGMENTATIONS = tuple(
+    name.strip() for name in os.getenv("TTA_AUGMENTATIONS", "flip,rotate,brightness").split(",") if name.strip()
+)
+
+
+def _resolve_model(version: Optional[str]) -> ModelManager:
+    """
+    Pilih model untuk request ini dari registry (versi aktif, canary, atau ?version=).
+    Setiap versi punya antrian inferensi (micro-batcher) sendiri.
+    """
+    
+    try:
+        return model_registry.resolve(version)
+    except ModelNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def _prediction_payload(prediction_result: dict, top_k: Optional[int], include_probs: bool) -> dict:
+    """
+    Bagian "prediction" di response; daftar per kelas hanya dibuat jika diminta
+    """
+    
+    payload = {
+        "label": prediction_result["label"],
+        "confidence": round(prediction_result["confidence"], 4),
+        "class_id": prediction_result.get("class_id", 0)
+    }
+    
+    if top_k:
+        payload["top_k"] = top_predictions(prediction_result, top_k)
+    if include_probs:
+        # Urut sesuai class_id (lihat GET /api/model/classes)
+        payload["probs"] = probability_list(prediction_result)
+    
+    return payload
+
+
+def _batch_error(filename: str, error: BaseException) -> dict:
+    """
+    Hasil gagal untuk satu file di /classify/batch; antrian penuh menyertakan retry_after
+    """
+    
+    result = {
+        "filename": filename,
+        "success": False,
+        "error": str(error) or error.__class__.__name__
+    }
+    if isinstance(error, ExecutorSaturated):
+        result["retry_after"] = error.retry_after
+    return result
+
+
+async def _read_upload(file: UploadFile) -> bytes:
+    """
+    Baca isi upload ke memory (per chunk, dengan validasi ukuran dan header gambar),
+    dan simpan salinannya jika PERSIST_UPLOADS aktif
+    """
+    
+    try:
+        contents = await read_upload(file)
+    finally:
+        await file.close()
+    
+    if PERSIST_UPLOADS:
+        await decode_executor.run(save_upload_bytes, contents, file.filename)
+    
+    return contents
+
+
+async def _cache_lookup(contents: bytes, model_manager: ModelManager, variant: str = "") -> tuple:
+    """
+    Cek cache prediksi berdasarkan hash isi gambar + versi model yang dipakai
+    (variant membedakan hasil dengan pengaturan prediksi lain, mis. TTA)
+    
+    Returns:
+    - Tuple (cache key, hasil prediksi atau None)
+    """
+    
+    if not prediction_cache.enabled:
+        return None, None
+    
+    key = await decode_executor.run(make_cache_key, contents, model_manager.model_version + variant)
+    
+    if prediction_cache.has_disk:
+        return key, await decode_executor.run(prediction_cache.get, key)
+    return key, prediction_cache.get(key)
+
+
+async def _cache_store(key: str, prediction_result: dict):
+    """
+    Simpan hasil prediksi ke cache
+    
+    Gagal menyimpan (disk penuh, antrian decode penuh, dll) tidak menggagalkan
+    prediksi yang sudah berhasil; error hanya dicetak.
+    """
+    
+    if key is None:
+        return
+    
+    try:
+        if prediction_cache.has_disk:
+            await decode_executor.run(prediction_cache.set, key, prediction_result)
+        else:
+            prediction_cache.set(key, prediction_result)
+    except Exception as e:
+        print(f"⚠️  Error storing prediction in cache: {e}")
+
+
+async def _predict(image, model_manager: ModelManager, tta: str, threshold: float) -> dict:
+    """
+    Prediksi satu gambar, dengan test-time augmentation (opsional)
+    
+    Semua varian augmentasi dikirim sekaligus ke micro-batcher sehingga
+    diprediksi dalam satu forward pass, lalu probabilitasnya dirata-rata.
+    
+    Returns:
+    - Dictionary hasil prediksi (tta_variants: jumlah gambar yang dirata-rata, 0 jika tanpa TTA)
+    """
+    
+    batcher = model_manager.batcher
+    
+    if tta == "always":
+        variants = augment_batch(image, ("none",) + TTA_AUGMENTATIONS)
+        result = average_predictions(await batcher.predict_many(list(variants)))
+        return dict(result, tta_variants=len(variants))
+    
+    result = await batcher.predict(image)
+    
+    if tta == "low_confidence" and result["confidence"] < threshold:
+        variants = augment_batch(image, TTA_AUGMENTATIONS)
+        result = average_predictions([result] + await batcher.predict_many(list(variants)))
+        return dict(result, tta_variants=len(variants) + 1)
+    
+    return dict(result, tta_variants=0)
 
 
 @router.post("/classify")
-async def classify_image(file: UploadFile = File(...)):
+async def classify_image(
+    file: UploadFile = File(...),
+    version: Optional[str] = None,
+    tta: Optional[str] = None,
+    tta_threshold: Optional[float] = None,
+    top_k: Optional[int] = Query(None, ge=1, le=len(CLASS_LABELS)),
+    include_probs: bool = False
+):
     """
     Endpoint untuk klasifikasi gambar hama wereng
     
     Parameters:
     - file: Image file (JPG, JPEG, PNG)
+    - version: Versi model (opsional, default: versi aktif / canary)
+    - tta: Test-time augmentation: off, always, low_confidence (default: TTA_MODE)
+    - tta_threshold: Batas confidence untuk tta=low_confidence (default: TTA_CONFIDENCE_THRESHOLD)
+    - top_k: Sertakan k kelas teratas beserta confidence-nya (opsional)
+    - include_probs: Sertakan probabilitas semua kelas (urut class_id)
     
     Returns:
     - JSON dengan hasil prediksi
@@ -50,45 +201,75 @@ async def classify_image(file: UploadFile = File(...)):
             detail=f"File type not supported. Allowed types: {', '.join(allowed_extensions)}"
         )
     
+    tta = (tta or TTA_MODE).lower()
+    if tta not in TTA_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid tta mode. Allowed: {', '.join(TTA_MODES)}"
+        )
+    threshold = TTA_CONFIDENCE_THRESHOLD if tta_threshold is None else tta_threshold
+    
+    # Hasil dengan TTA di-cache terpisah dari hasil tanpa TTA
+    cache_variant = ""
+    if tta == "always":
+        cache_variant = f"+tta:{','.join(TTA_AUGMENTATIONS)}"
+    elif tta == "low_confidence":
+        cache_variant = f"+tta<{threshold}:{','.join(TTA_AUGMENTATIONS)}"
+    
+    model_manager = _resolve_model(version)
+    
     try:
-        # Simpan file upload sementara
-        file_path = await save_upload_file(file)
+        # Baca upload langsung dari buffer multipart (tanpa file temporary)
+        contents = await _read_upload(file)
         
-        # Preprocess gambar
-        processed_image = preprocess_image(file_path)
+        # Cek cache (gambar yang sama diupload ulang)
+        cache_key, prediction_result = await _cache_lookup(contents, model_manager, cache_variant)
         
-        # Prediksi
-        if model is not None:
-            # Gunakan model real
-            prediction_result = predict_image(model, processed_image)
-        else:
-            # Gunakan dummy prediction
-            prediction_result = predict_image(None, processed_image, dummy=True)
+        if prediction_result is None:
+            # Preprocess gambar (di thread pool decode)
+            processed_image = await decode_executor.run(load_image_array, contents)
+            
+            # Prediksi lewat micro-batcher (digabung dengan request lain yang bersamaan)
+            prediction_result = await _predict(processed_image, model_manager, tta, threshold)
+            
+            await _cache_store(cache_key, prediction_result)
         
         # Prepare response
         response = {
             "success": True,
-            "prediction": {
-                "label": prediction_result["label"],
-                "confidence": round(prediction_result["confidence"], 4),
-                "class_id": prediction_result.get("class_id", 0)
-            },
+            "prediction": _prediction_payload(prediction_result, top_k, include_probs),
+            "model_version": model_manager.base_version,
             "filename": file.filename,
             "timestamp": datetime.now().isoformat()
         }
         
+        if tta != "off":
+            response["tta"] = {
+                "mode": tta,
+                "applied": prediction_result.get("tta_variants", 0) > 0,
+                "variants": prediction_result.get("tta_variants", 0)
+            }
+        
         # Log prediction
         log_prediction(
             filename=file.filename,
             label=prediction_result["label"],
-            confidence=prediction_result["confidence"]
+            confidence=prediction_result["confidence"],
+            class_id=prediction_result.get("class_id")
         )
         
-        # Hapus file temporary
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
-        return JSONResponse(content=response, status_code=200)
+        # Dikembalikan langsung sebagai response orjson (tanpa jsonable_encoder)
+        return ORJSONResponse(content=response, status_code=200)
+    
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     
     except Exception as e:
         raise HTTPException(
@@ -97,83 +278,148 @@ async def classify_image(file: UploadFile = File(...)):
         )
 
 
+@router.get("/classify/stats")
+async def get_batching_stats():
+    """
+    Statistik micro-batching untuk endpoint /classify
+    
+    Returns:
+    - Jumlah batch, rata-rata ukuran batch dan distribusi ukuran batch yang terbentuk (per versi model)
+    """
+    
+    return {
+        "success": True,
+        "batching": {
+            version: manager.batcher.get_stats()
+            for version, manager in model_registry.managers().items()
+        },
+        "decode_executor": decode_executor.get_stats(),
+        "cache": prediction_cache.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 @router.post("/classify/batch")
-async def classify_batch_images(files: list[UploadFile] = File(...)):
+async def classify_batch_images(
+    files: list[UploadFile] = File(...),
+    version: Optional[str] = None,
+    top_k: Optional[int] = Query(None, ge=1, le=len(CLASS_LABELS)),
+    include_probs: bool = False
+):
     """
     Endpoint untuk klasifikasi batch (multiple images)
     
+    Semua file di-decode secara paralel, gambar yang valid digabung menjadi
+    tensor batch dan diprediksi per potongan sebesar BATCH_MAX_SIZE.
+    
     Parameters:
-    - files: List of image files
+    - files: List of image files (maksimal MAX_BATCH_FILES)
+    - version: Versi model (opsional, satu versi untuk semua file dalam request)
+    - top_k / include_probs: Lihat /classify
     
     Returns:
     - JSON dengan hasil prediksi untuk setiap gambar
     """
     
-    if len(files) > 10:
+    if len(files) > MAX_BATCH_FILES:
         raise HTTPException(
             status_code=400,
-            detail="Maximum 10 images per batch"
+            detail=f"Maximum {MAX_BATCH_FILES} images per batch"
         )
     
-    results = []
+    model_manager = _resolve_model(version)
+    allowed_extensions = [".jpg", ".jpeg", ".png"]
+    results = [None] * len(files)
     
-    for file in files:
-        # Validasi tipe file
-        allowed_extensions = [".jpg", ".jpeg", ".png"]
+    # Batasi jumlah decode bersamaan per request agar antrian decode tidak penuh
+    decode_slots = asyncio.Semaphore(decode_executor.max_workers)
+    
+    async def _decode(file: UploadFile):
+        async with decode_slots:
+            contents = await _read_upload(file)
+            cache_key, cached = await _cache_lookup(contents, model_manager)
+            if cached is not None:
+                return cache_key, cached, None
+            return cache_key, None, await decode_executor.run(load_image_array, contents)
+    
+    # Validasi tipe file
+    pending = []
+    for idx, file in enumerate(files):
         file_ext = os.path.splitext(file.filename)[1].lower()
         
         if file_ext not in allowed_extensions:
-            results.append({
+            results[idx] = {
                 "filename": file.filename,
                 "success": False,
                 "error": "File type not supported"
-            })
+            }
+        else:
+            pending.append(idx)
+    
+    # Decode semua gambar secara paralel
+    decoded = await asyncio.gather(
+        *[_decode(files[idx]) for idx in pending],
+        return_exceptions=True
+    )
+    
+    predictions = {}
+    images = []
+    image_indices = []
+    cache_keys = []
+    for idx, decode_result in zip(pending, decoded):
+        if isinstance(decode_result, BaseException):
+            results[idx] = _batch_error(files[idx].filename, decode_result)
             continue
         
-        try:
-            # Simpan file upload sementara
-            file_path = await save_upload_file(file)
-            
-            # Preprocess gambar
-            processed_image = preprocess_image(file_path)
-            
-            # Prediksi
-            if model is not None:
-                prediction_result = predict_image(model, processed_image)
-            else:
-                prediction_result = predict_image(None, processed_image, dummy=True)
-            
-            results.append({
-                "filename": file.filename,
-                "success": True,
-                "prediction": {
-                    "label": prediction_result["label"],
-                    "confidence": round(prediction_result["confidence"], 4),
-                    "class_id": prediction_result.get("class_id", 0)
-                }
-            })
-            
-            # Log prediction
-            log_prediction(
-                filename=file.filename,
-                label=prediction_result["label"],
-                confidence=prediction_result["confidence"]
-            )
-            
-            # Hapus file temporary
-            if os.path.exists(file_path):
-                os.remove(file_path)
+        cache_key, cached, image = decode_result
+        if cached is not None:
+            predictions[idx] = cached
+        else:
+            images.append(image)
+            image_indices.append(idx)
+            cache_keys.append(cache_key)
+    
+    # Prediksi semua gambar valid (yang tidak ada di cache) dalam batch; potongan yang
+    # gagal (mis. antrian inferensi penuh) dilaporkan per file, potongan lain tetap diproses
+    try:
+        batch_predictions = (
+            await model_manager.batcher.predict_many(images, return_exceptions=True) if images else []
+        )
+    except Exception as e:
+        batch_predictions = [e] * len(images)
+    
+    for cache_key, prediction_result in zip(cache_keys, batch_predictions):
+        if not isinstance(prediction_result, BaseException):
+            await _cache_store(cache_key, prediction_result)
+    
+    predictions.update(zip(image_indices, batch_predictions))
+    
+    for idx in sorted(predictions):
+        prediction_result = predictions[idx]
+        filename = files[idx].filename
         
-        except Exception as e:
-            results.append({
-                "filename": file.filename,
-                "success": False,
-                "error": str(e)
-            })
+        if isinstance(prediction_result, BaseException):
+            results[idx] = _batch_error(filename, prediction_result)
+            continue
+        
+        results[idx] = {
+            "filename": filename,
+            "success": True,
+            "prediction": _prediction_payload(prediction_result, top_k, include_probs)
+        }
+        
+        # Log prediction
+        log_prediction(
+            filename=filename,
+            label=prediction_result["label"],
+            confidence=prediction_result["confidence"],
+            class_id=prediction_result.get("class_id")
+        )
     
-    return {
+    return ORJSONResponse(content={
         "success": True,
         "total_images": len(files),
+        "model_version": model_manager.base_version,
         "results": results,
         "timestamp": datetime.now().isoformat()
-    }
\ No newline at end of file
+    })
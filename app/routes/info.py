@@ -3,49 +3,150 @@ Model Info Route
 Endpoint untuk informasi model dan history
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from typing import Optional
+import asyncio
+import hmac
 import os
 import json
 
+from app.utils.executor import decode_executor
+from app.utils.prediction_store import prediction_store
+from app.utils.stats import prediction_stats
+from app.utils.log_writer import log_writer
+from app.utils.log_reader import tail_records, iter_records as iter_log_records
+from app.utils.model_registry import model_registry, ModelNotFound
+
 router = APIRouter()
 
-# Model metadata (hardcoded untuk demo, bisa diganti dari file JSON)
-MODEL_METADATA = {
-    "model_name": "Wereng Classifier",
-    "model_version": "1.0.0",
-    "architecture": "MobileNetV2",
-    "input_shape": [224, 224, 3],
-    "total_classes": 4,
-    "classes": [
-        "Wereng Coklat (Brown Planthopper)",
-        "Wereng Hijau (Green Leafhopper)",
-        "Wereng Punggung Putih (White Backed Planthopper)",
-        "Bukan Wereng (Not Wereng)"
-    ],
-    "training_accuracy": 0.95,
-    "validation_accuracy": 0.92,
-    "training_date": "2025-10-15",
-    "dataset_size": 2000,
-    "epochs": 50
-}
+# Token untuk POST /model/reload dan /model/activate (header X-Admin-Token);
+# kosong berarti kedua endpoint dinonaktifkan
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN", "")
+
+HISTORY_SOURCES = ("store", "log")
 
 
 @router.get("/model/info")
-async def get_model_info():
+async def get_model_info(version: Optional[str] = None):
     """
     Mendapatkan informasi tentang model yang digunakan
     
+    Parameters:
+    - version: Versi model (default: versi aktif)
+    
+    Returns:
+    - Metadata model dari registry (akurasi, label, tanggal training, dll) dan status load
+    """
+    
+    try:
+        metadata = model_registry.get_metadata(version)
+    except ModelNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    version = metadata["model_version"]
+    manager = model_registry.managers().get(version)
+    status = manager.get_status() if manager is not None else None
+    
+    return {
+        "success": True,
+        "model_loaded": bool(status and status["state"] == "ready"),
+        "model_info": metadata,
+        "model_status": status,
+        "active_version": model_registry.active_version,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/model/versions")
+async def get_model_versions():
+    """
+    Mendapatkan daftar versi model di registry beserta routing aktif / canary
+    
+    Returns:
+    - Versi yang tersedia, versi aktif, canary, dan status versi yang sedang di-load
+    """
+    
+    status = model_registry.get_status()
+    
+    return {
+        "success": True,
+        "versions": [
+            model_registry.artifacts[version].to_dict()
+            for version in status.pop("versions")
+        ],
+        "registry": status,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def require_model_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency untuk endpoint yang mengubah model aktif
+    
+    Raises:
+    - HTTPException 403 jika MODEL_ADMIN_TOKEN tidak diset, 401 jika token salah
+    """
+    if not MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model admin endpoints are disabled (MODEL_ADMIN_TOKEN not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, MODEL_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/model/reload", dependencies=[Depends(require_model_admin)])
+async def reload_models():
+    """
+    Scan ulang folder model dan terapkan registry.json (hot reload tanpa restart)
+    
+    Returns:
+    - Status registry setelah reload
+    """
+    
+    status = await asyncio.get_running_loop().run_in_executor(None, model_registry.reload, True)
+    
+    return {
+        "success": True,
+        "registry": status,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.post("/model/activate", dependencies=[Depends(require_model_admin)])
+async def activate_model(
+    version: str,
+    canary_version: Optional[str] = None,
+    canary_percent: float = Query(0.0, ge=0.0, le=100.0)
+):
+    """
+    Ganti versi model aktif (hot swap) dan atur canary
+    
+    Versi baru di-load dan di-warm-up sebelum menggantikan versi lama; request yang
+    sedang berjalan tetap diselesaikan oleh versi lama.
+    
+    Parameters:
+    - version: Versi yang dijadikan aktif
+    - canary_version: Versi canary (opsional)
+    - canary_percent: Persentase request yang diarahkan ke canary (0-100)
+    
     Returns:
-    - Metadata model (akurasi, label, tanggal training, dll)
+    - Status registry setelah aktivasi
     """
     
-    model_exists = os.path.exists("app/models/wereng_classifier.h5")
+    try:
+        status = await asyncio.get_running_loop().run_in_executor(
+            None, model_registry.activate, version, canary_version, canary_percent
+        )
+    except ModelNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
     
     return {
         "success": True,
-        "model_loaded": model_exists,
-        "model_info": MODEL_METADATA,
+        "registry": status,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -59,78 +160,84 @@ async def get_model_classes():
     - List of classes
     """
     
+    metadata = model_registry.get_metadata()
+    
     return {
         "success": True,
-        "total_classes": MODEL_METADATA["total_classes"],
+        "total_classes": metadata["total_classes"],
         "classes": [
             {
                 "id": idx,
                 "name": class_name,
                 "description": get_class_description(class_name)
             }
-            for idx, class_name in enumerate(MODEL_METADATA["classes"])
+            for idx, class_name in enumerate(metadata["classes"])
         ],
         "timestamp": datetime.now().isoformat()
     }
 
 
 @router.get("/history")
-async def get_prediction_history(limit: int = 50):
+async def get_prediction_history(
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[int] = None,
+    label: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    source: str = "store"
+):
     """
-    Mendapatkan riwayat prediksi
+    Mendapatkan riwayat prediksi (terbaru lebih dulu)
     
     Parameters:
     - limit: Maximum number of records to return (default: 50)
+    - cursor: Nilai next_cursor dari response sebelumnya (halaman berikutnya)
+    - label: Filter berdasarkan label prediksi
+    - since / until: Filter rentang waktu (ISO 8601)
+    - source: "store" (database) atau "log" (tail file log teks, hanya limit + label)
     
     Returns:
     - List of prediction history
     """
     
-    log_file = "logs/prediction_logs.txt"
-    
-    if not os.path.exists(log_file):
-        return {
-            "success": True,
-            "total_records": 0,
-            "history": [],
-            "message": "No prediction history available",
-            "timestamp": datetime.now().isoformat()
-        }
+    if source not in HISTORY_SOURCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid source. Allowed: {', '.join(HISTORY_SOURCES)}"
+        )
     
     try:
-        with open(log_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+        if source == "log":
+            history = await decode_executor.run(tail_records, limit, label=label)
+            return {
+                "success": True,
+                "total_records": len(history),
+                "history": history,
+                "next_cursor": None,
+                "timestamp": datetime.now().isoformat()
+            }
         
-        # Parse log lines
-        history = []
-        for line in reversed(lines[-limit:]):  # Get last N records
-            if "→" in line:
-                parts = line.strip().split("→")
-                if len(parts) == 2:
-                    timestamp_filename = parts[0].strip()
-                    prediction_info = parts[1].strip()
-                    
-                    # Parse timestamp dan filename
-                    timestamp = timestamp_filename.split("]")[0].replace("[", "").strip()
-                    filename = timestamp_filename.split("]")[1].strip()
-                    
-                    # Parse prediction
-                    label = prediction_info.split("(")[0].replace("prediksi:", "").strip()
-                    confidence = prediction_info.split("(")[1].replace(")", "").strip()
-                    
-                    history.append({
-                        "timestamp": timestamp,
-                        "filename": filename,
-                        "prediction": label,
-                        "confidence": float(confidence)
-                    })
+        history = await decode_executor.run(
+            prediction_store.query,
+            limit=limit,
+            cursor=cursor,
+            label=label,
+            since=since,
+            until=until
+        )
         
-        return {
+        response = {
             "success": True,
             "total_records": len(history),
             "history": history,
+            "next_cursor": history[-1]["id"] if len(history) == limit else None,
             "timestamp": datetime.now().isoformat()
         }
+        
+        if not history and cursor is None:
+            response["message"] = "No prediction history available"
+        
+        return response
     
     except Exception as e:
         return {
@@ -140,6 +247,41 @@ async def get_prediction_history(limit: int = 50):
         }
 
 
+@router.get("/history/export")
+async def export_prediction_history(source: str = "store"):
+    """
+    Export seluruh riwayat prediksi sebagai NDJSON (satu record JSON per baris)
+    
+    Data dibaca per halaman dan di-stream ke client, sehingga memory tetap konstan
+    berapapun jumlah record.
+    
+    Parameters:
+    - source: "store" (database) atau "log" (file log teks termasuk hasil rotasi)
+    
+    Returns:
+    - Streaming response application/x-ndjson
+    """
+    
+    if source not in HISTORY_SOURCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid source. Allowed: {', '.join(HISTORY_SOURCES)}"
+        )
+    
+    records = prediction_store.iter_records() if source == "store" else iter_log_records()
+    
+    def _ndjson():
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+    
+    filename = f"prediction_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+    return StreamingResponse(
+        _ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.delete("/history")
 async def clear_prediction_history():
     """
@@ -149,11 +291,14 @@ async def clear_prediction_history():
     - Confirmation message
     """
     
-    log_file = "logs/prediction_logs.txt"
-    
     try:
-        if os.path.exists(log_file):
-            os.remove(log_file)
+        total = await decode_executor.run(prediction_store.count)
+        await decode_executor.run(prediction_store.clear)
+        await decode_executor.run(prediction_stats.reset)
+        
+        log_files = await decode_executor.run(log_writer.clear_files)
+        
+        if total or log_files:
             message = "Prediction history cleared successfully"
         else:
             message = "No prediction history to clear"
@@ -0,0 +1,163 @@
+"""
+Jobs Route
+Endpoint job klasifikasi offline: upload zip / banyak file sekaligus,
+diproses di background, progress dan hasil diambil per halaman
+"""
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from datetime import datetime
+import asyncio
+import os
+import shutil
+from typing import Optional
+
+from app.utils.jobs import (
+    job_store, job_runner, new_job_id, job_directory, save_stream, list_archive_images,
+    IMAGE_EXTENSIONS, ITEM_STATUSES, JOB_MAX_FILES, JOB_MAX_UPLOAD_BYTES
+)
+from app.utils.model_registry import model_registry, ModelNotFound
+from app.utils.upload import UPLOAD_MAX_BYTES, UploadRejected
+
+router = APIRouter()
+
+
+async def _save_inputs(files: list, directory: str) -> tuple:
+    """
+    Simpan upload ke folder job
+
+    Returns:
+    - Tuple (source, path zip atau None, list (filename, path), list file yang dilewati)
+    """
+    
+    loop = asyncio.get_running_loop()
+    
+    # File besar disalin di thread pool default agar tidak menahan thread decode request interaktif
+    if len(files) == 1 and os.path.splitext(files[0].filename)[1].lower() == ".zip":
+        archive = os.path.join(directory, "input.zip")
+        await loop.run_in_executor(None, save_stream, files[0].file, archive, JOB_MAX_UPLOAD_BYTES)
+        members = await loop.run_in_executor(None, list_archive_images, archive)
+        return "zip", archive, [(os.path.basename(member), member) for member in members], []
+    
+    items, skipped = [], []
+    for file in files:
+        file_ext = os.path.splitext(file.filename)[1].lower()
+        if file_ext not in IMAGE_EXTENSIONS:
+            skipped.append(file.filename)
+            continue
+        
+        path = os.path.join(directory, f"{len(items):06d}{file_ext}")
+        await loop.run_in_executor(None, save_stream, file.file, path, UPLOAD_MAX_BYTES)
+        items.append((file.filename, path))
+    
+    return "files", None, items, skipped
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(files: list[UploadFile] = File(...), version: Optional[str] = None):
+    """
+    Buat job klasifikasi untuk banyak gambar
+    
+    Parameters:
+    - files: Satu file .zip berisi gambar JPG/PNG, atau banyak file gambar
+    - version: Versi model (opsional, dipakai untuk seluruh job)
+    
+    Returns:
+    - JSON dengan job_id dan status awal (HTTP 202); progress di GET /api/jobs/{job_id}
+    """
+    
+    if len(files) > JOB_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {JOB_MAX_FILES} images per job"
+        )
+    
+    try:
+        model_version = model_registry.resolve(version).base_version
+    except ModelNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    job_id = new_job_id()
+    directory = job_directory(job_id)
+    os.makedirs(directory, exist_ok=True)
+    
+    try:
+        source, archive, items, skipped = await _save_inputs(files, directory)
+        
+        if not items:
+            raise ValueError("No JPG/PNG images found in upload")
+        
+        job = await asyncio.get_running_loop().run_in_executor(
+            None, job_store.create, job_id, items, model_version, source, archive
+        )
+    
+    except UploadRejected as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    except ValueError as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    except Exception as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Error creating job: {str(e)}")
+    
+    finally:
+        for file in files:
+            await file.close()
+    
+    job_runner.notify()
+    
+    return ORJSONResponse(
+        status_code=202,
+        content={
+            "success": True,
+            "job": job,
+            "skipped_files": skipped,
+            "status_url": f"/api/jobs/{job_id}",
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    limit: int = Query(100, ge=0, le=1000),
+    cursor: Optional[int] = None,
+    status: Optional[str] = None
+):
+    """
+    Status, progress, dan hasil job (urut sesuai urutan file)
+    
+    Parameters:
+    - job_id: ID job dari POST /api/jobs
+    - limit: Jumlah hasil per halaman (0 untuk hanya status/progress)
+    - cursor: Nilai next_cursor dari response sebelumnya (halaman berikutnya)
+    - status: Filter hasil: pending, done, error
+    
+    Returns:
+    - Status job (total, processed, failed, progress) dan satu halaman hasil per gambar
+    """
+    
+    if status is not None and status not in ITEM_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid status. Allowed: {', '.join(ITEM_STATUSES)}"
+        )
+    
+    loop = asyncio.get_running_loop()
+    job = await loop.run_in_executor(None, job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    
+    results = await loop.run_in_executor(None, job_store.results, job_id, limit, cursor, status)
+    
+    return ORJSONResponse(content={
+        "success": True,
+        "job": job,
+        "results": results,
+        "next_cursor": results[-1]["index"] if results and len(results) == limit else None,
+        "timestamp": datetime.now().isoformat()
+    })
@@ -0,0 +1,57 @@
+"""
+Statistics Route
+Endpoint analitik prediksi: jumlah per kelas, distribusi confidence, dan tren outbreak
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from datetime import datetime
+from typing import Optional
+
+from app.utils.executor import decode_executor
+from app.utils.stats import prediction_stats
+
+router = APIRouter()
+
+GRANULARITIES = ("hourly", "daily")
+
+
+@router.get("/stats")
+async def get_prediction_stats(
+    granularity: str = "hourly",
+    buckets: int = Query(24, ge=1, le=1000),
+    label: Optional[str] = None
+):
+    """
+    Mendapatkan statistik prediksi
+
+    Parameters:
+    - granularity: "hourly" atau "daily" untuk tren
+    - buckets: Jumlah bucket waktu terakhir (default: 24)
+    - label: Jika diisi, setiap bucket tren menyertakan share label ini (mis. Wereng Coklat)
+
+    Returns:
+    - Jumlah per kelas, rata-rata/std confidence, histogram confidence, dan tren per waktu
+    """
+
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid granularity. Allowed: {', '.join(GRANULARITIES)}"
+        )
+
+    try:
+        # Tambahkan record baru (dari semua worker) sebelum membaca agregat
+        await decode_executor.run(prediction_stats.refresh)
+
+        return {
+            "success": True,
+            "stats": prediction_stats.summary(granularity=granularity, buckets=buckets, label=label),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }
@@ -0,0 +1,26 @@
+"""
+Utilities Package
+
+Submodule di-import secara lazy agar `import app.utils` tidak ikut memuat
+numpy/PIL/FastAPI sebelum benar-benar dibutuhkan.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'preprocess_image': 'preprocessing',
+    'preprocess_image_from_bytes': 'preprocessing',
+    'load_model': 'helper',
+    'predict_image': 'helper',
+    'save_upload_file': 'helper',
+    'log_prediction': 'helper'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,301 @@
+"""
+Micro-Batching Scheduler
+Mengumpulkan request klasifikasi yang datang bersamaan menjadi satu batch
+sehingga model.predict dipanggil sekali untuk banyak gambar
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable
+
+import numpy as np
+
+from app.utils.executor import ExecutorSaturated
+from app.utils.metrics import STAGE_LATENCY, BATCH_SIZE, timed
+from app.utils.preprocessing import BatchBuffer
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+BATCH_MAX_QUEUE = int(os.getenv("BATCH_MAX_QUEUE", "256"))
+
+_STOP = object()
+
+
+class _PendingItem:
+    """
+    Satu gambar yang menunggu giliran diprediksi
+    """
+
+    __slots__ = ("img_array", "future", "enqueued_at")
+
+    def __init__(self, img_array: np.ndarray, future: Future):
+        self.img_array = img_array
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Antrian inferensi terpusat dengan dynamic micro-batching
+
+    Satu thread worker mengambil request dari antrian, menunggu maksimal
+    `max_wait_ms` untuk request berikutnya (hingga `max_batch_size`), lalu
+    menjalankan satu forward pass dan mengembalikan hasil ke masing-masing
+    request yang menunggu. Gambar uint8 disalin ke BatchBuffer milik thread
+    worker sehingga tensor batch tidak dialokasikan ulang setiap kali.
+
+    Parameters:
+    - predict_fn: Fungsi yang menerima array (N, H, W, C) dan mengembalikan list hasil prediksi
+    - max_batch_size: Jumlah gambar maksimal dalam satu batch
+    - max_wait_ms: Waktu tunggu maksimal (milidetik) untuk mengisi batch
+    - max_queue: Jumlah gambar maksimal yang boleh mengantri sebelum request ditolak
+    - normalize: Jika False, predict_fn menerima tensor uint8 (normalisasi di dalam model)
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], list],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        max_queue: int = BATCH_MAX_QUEUE,
+        normalize: bool = True
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue = max(1, max_queue)
+        self.normalize = normalize
+        self._buffer = BatchBuffer(self.max_batch_size)
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Counters
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._total_batches = 0
+        self._total_items = 0
+        self._total_errors = 0
+        self._total_rejected = 0
+
+    def start(self):
+        """
+        Jalankan thread worker (dipanggil otomatis saat submit pertama)
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name="micro-batcher",
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Hentikan thread worker setelah antrian yang tersisa diproses
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout=timeout)
+            self._thread = None
+
+    def submit(self, img_array: np.ndarray) -> Future:
+        """
+        Masukkan satu gambar ke antrian inferensi
+
+        Parameters:
+        - img_array: Array gambar uint8 dengan shape (H, W, 3) (lihat load_image_array)
+
+        Returns:
+        - concurrent.futures.Future yang berisi dictionary hasil prediksi
+
+        Raises:
+        - ExecutorSaturated jika antrian inferensi sudah penuh
+        """
+        self.start()
+        if self._queue.qsize() >= self.max_queue:
+            with self._stats_lock:
+                self._total_rejected += 1
+            raise ExecutorSaturated("inference")
+
+        future = Future()
+        self._queue.put(_PendingItem(img_array, future))
+        return future
+
+    def submit_many(self, images: list) -> list:
+        """
+        Masukkan beberapa gambar ke antrian inferensi sekaligus
+
+        Parameters:
+        - images: List array gambar uint8 dengan shape (H, W, 3)
+
+        Returns:
+        - List concurrent.futures.Future, urutan sama dengan input
+
+        Raises:
+        - ExecutorSaturated jika antrian tidak cukup untuk semua gambar
+        """
+        self.start()
+        if self._queue.qsize() + len(images) > self.max_queue:
+            with self._stats_lock:
+                self._total_rejected += len(images)
+            raise ExecutorSaturated("inference")
+
+        futures = []
+        for img_array in images:
+            future = Future()
+            self._queue.put(_PendingItem(img_array, future))
+            futures.append(future)
+        return futures
+
+    async def predict_many(self, images: list, return_exceptions: bool = False) -> list:
+        """
+        Prediksi banyak gambar, dikirim per potongan sebesar max_batch_size
+
+        Parameters:
+        - images: List array gambar uint8 dengan shape (H, W, 3)
+        - return_exceptions: True untuk mengembalikan exception (mis. ExecutorSaturated) di posisi
+          gambar yang gagal dan tetap memproses potongan berikutnya
+
+        Returns:
+        - List dictionary hasil prediksi (atau exception), urutan sama dengan input
+        """
+        results = []
+        for start in range(0, len(images), self.max_batch_size):
+            chunk = images[start:start + self.max_batch_size]
+            try:
+                futures = self.submit_many(chunk)
+            except ExecutorSaturated as e:
+                if not return_exceptions:
+                    raise
+                results.extend([e] * len(chunk))
+                continue
+            results.extend(await asyncio.gather(
+                *[asyncio.wrap_future(f) for f in futures],
+                return_exceptions=return_exceptions
+            ))
+        return results
+
+    async def predict(self, img_array: np.ndarray) -> dict:
+        """
+        Versi async dari submit, untuk dipakai langsung di route handler
+        """
+        return await asyncio.wrap_future(self.submit(img_array))
+
+    def get_stats(self) -> dict:
+        """
+        Statistik ukuran batch yang benar-benar terbentuk
+
+        Returns:
+        - Dictionary berisi jumlah batch, jumlah gambar, rata-rata dan distribusi ukuran batch
+        """
+        with self._stats_lock:
+            total_batches = self._total_batches
+            total_items = self._total_items
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queue.qsize(),
+                "total_batches": total_batches,
+                "total_items": total_items,
+                "total_errors": self._total_errors,
+                "total_rejected": self._total_rejected,
+                "mean_batch_size": round(total_items / total_batches, 3) if total_batches else 0.0,
+                "batch_size_counts": {
+                    str(size): count for size, count in sorted(self._batch_sizes.items())
+                }
+            }
+
+    def _collect_batch(self, first: _PendingItem) -> tuple:
+        """
+        Kumpulkan item dari antrian hingga batch penuh atau waktu tunggu habis
+
+        Returns:
+        - Tuple (list item, flag stop)
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    # Ambil yang sudah ada di antrian tanpa menunggu lagi
+                    item = self._queue.get_nowait()
+                else:
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch, should_stop = self._collect_batch(item)
+            self._process(batch)
+
+            if should_stop:
+                break
+
+    def _process(self, batch: list):
+        # Lewati request yang sudah dibatalkan (client disconnect)
+        active = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not active:
+            return
+
+        # Waktu tunggu di antrian sampai batch mulai diproses
+        started = time.perf_counter()
+        for item in active:
+            STAGE_LATENCY.observe(started - item.enqueued_at, stage="queue_wait")
+        BATCH_SIZE.observe(len(active))
+
+        try:
+            inputs = self._buffer.fill(
+                [item.img_array for item in active],
+                normalize=self.normalize
+            )
+            with timed("inference"):
+                results = self.predict_fn(inputs)
+
+            # zip() akan diam-diam melewatkan sisa request jika jumlah hasil tidak sama
+            if len(results) != len(active):
+                raise RuntimeError(
+                    f"predict_fn returned {len(results)} results for a batch of {len(active)}"
+                )
+
+            for item, result in zip(active, results):
+                item.future.set_result(result)
+
+            with self._stats_lock:
+                self._batch_sizes[len(active)] += 1
+                self._total_batches += 1
+                self._total_items += len(active)
+
+        except Exception as e:
+            with self._stats_lock:
+                self._total_errors += 1
+            for item in active:
+                if not item.future.done():
+                    item.future.set_exception(e)
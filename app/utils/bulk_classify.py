@@ -0,0 +1,342 @@
+"""
+Bulk Classifier
+Klasifikasi offline seluruh folder arsip gambar (termasuk subfolder) di mesin CPU besar
+
+Pipeline producer/consumer:
+    process pool (decode + resize, satu proses per core) -> antrian prefetch terbatas
+    -> batched inference di proses utama -> CSV / JSONL / Parquet
+
+File output sekaligus menjadi checkpoint: jika dijalankan ulang dengan output yang sama,
+gambar yang sudah tercatat dilewati (gunakan --no-resume untuk mulai dari awal).
+
+Contoh:
+    python -m app.utils.bulk_classify /data/survei_2025 --output hasil.csv
+    python -m app.utils.bulk_classify /data/survei_2025 --output hasil.parquet --workers 30 --batch-size 64
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from app.utils.batcher import BATCH_MAX_SIZE
+from app.utils.preprocessing import load_image_array, get_batch_buffer
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+OUTPUT_FORMATS = ("csv", "jsonl", "parquet")
+FIELDS = ("path", "label", "confidence", "class_id", "error")
+
+
+def find_images(root: str) -> list:
+    """
+    Cari semua file gambar di folder (rekursif), urut sehingga urutan output stabil
+
+    Returns:
+    - List path relatif terhadap root
+    """
+
+    paths = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS and not filename.startswith("."):
+                paths.append(os.path.relpath(os.path.join(directory, filename), root))
+    return paths
+
+
+def _decode(root: str, path: str) -> tuple:
+    # Dijalankan di proses decode: kembalikan error sebagai string agar satu file rusak tidak menghentikan run
+    try:
+        return path, load_image_array(os.path.join(root, path)), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def prefetch_decoded(root: str, paths: list, workers: int, prefetch: int):
+    """
+    Decode gambar di process pool dengan antrian prefetch terbatas (urutan sama dengan input)
+
+    Paling banyak `prefetch` gambar yang sudah/sedang di-decode menunggu di memory,
+    sehingga decode tidak berlari jauh di depan inferensi.
+
+    Returns:
+    - Generator tuple (path, array uint8 atau None, error atau None)
+    """
+
+    # spawn: proses decode tidak mewarisi thread runtime inferensi dari proses utama
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        pending = deque()
+        remaining = iter(paths)
+
+        for path in remaining:
+            pending.append(pool.submit(_decode, root, path))
+            if len(pending) >= prefetch:
+                break
+
+        while pending:
+            result = pending.popleft().result()
+            path = next(remaining, None)
+            if path is not None:
+                pending.append(pool.submit(_decode, root, path))
+            yield result
+
+
+def _truncate_partial_line(path: str):
+    # Proses sebelumnya bisa berhenti di tengah penulisan baris; buang sisa baris yang terpotong
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            position -= step
+            f.seek(position)
+            newline = f.read(step).rfind(b"\n")
+            if newline != -1:
+                f.truncate(position + newline + 1)
+                return
+        f.truncate(0)
+
+
+class ResultWriter:
+    """
+    Tulis hasil per batch (append + flush) dan baca ulang path yang sudah selesai untuk resume
+
+    Parquet tidak bisa di-append, sehingga hasilnya ditulis ke file JSONL sementara
+    (<output>.partial.jsonl, sekaligus checkpoint) lalu dikonversi saat run selesai.
+
+    Parameters:
+    - output: Path file output
+    - output_format: csv, jsonl, atau parquet
+    - resume: Lanjutkan dari output yang sudah ada
+    """
+
+    def __init__(self, output: str, output_format: str, resume: bool = True):
+        self.output = output
+        self.output_format = output_format
+        self.path = output + ".partial.jsonl" if output_format == "parquet" else output
+        self.done = set()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if output_format == "parquet" and resume and os.path.exists(output) and not os.path.exists(self.path):
+            # Run sebelumnya sudah selesai: hasil lama jadi titik awal checkpoint
+            self._restore_parquet()
+
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if resume and exists:
+            _truncate_partial_line(self.path)
+            self.done = self._read_done()
+        mode = "a" if resume and exists else "w"
+
+        self._file = open(self.path, mode, encoding="utf-8", newline="")
+        self._csv = None
+        if self.output_format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=FIELDS)
+            if mode == "w" or os.path.getsize(self.path) == 0:
+                self._csv.writeheader()
+
+    def _read_done(self) -> set:
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            if self.output_format == "csv":
+                return {row["path"] for row in csv.DictReader(f)}
+            return {json.loads(line)["path"] for line in f if line.strip()}
+
+    def write(self, rows: list):
+        if self._csv is not None:
+            self._csv.writerows(rows)
+        else:
+            self._file.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        if self.output_format == "parquet":
+            self._convert_parquet()
+
+    def _restore_parquet(self):
+        import pyarrow.parquet as pq
+
+        with open(self.path, "w", encoding="utf-8") as f:
+            for batch in pq.ParquetFile(self.output).iter_batches():
+                f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch.to_pylist()))
+
+    def _convert_parquet(self, chunk_rows: int = 50000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("path", pa.string()),
+            ("label", pa.string()),
+            ("confidence", pa.float64()),
+            ("class_id", pa.int64()),
+            ("error", pa.string())
+        ])
+
+        with open(self.path, "r", encoding="utf-8") as f, pq.ParquetWriter(self.output, schema) as writer:
+            rows = []
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+                if len(rows) >= chunk_rows:
+                    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                    rows = []
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+
+        os.remove(self.path)
+
+
+def _load_model(model_path: str = None):
+    from app.utils.model_manager import ModelManager
+    from app.utils.model_registry import ModelRegistry
+
+    if model_path is None:
+        artifact = ModelRegistry().configured_artifact()
+        manager = ModelManager(artifact.model_path, base_version=artifact.version)
+    else:
+        manager = ModelManager(model_path)
+
+    manager.load()
+    return manager
+
+
+def classify_directory(
+    root: str,
+    output: str,
+    output_format: str = None,
+    model_path: str = None,
+    batch_size: int = BATCH_MAX_SIZE * 4,
+    workers: int = None,
+    prefetch: int = None,
+    resume: bool = True
+) -> dict:
+    """
+    Klasifikasi semua gambar di folder
+
+    Parameters:
+    - root: Folder gambar (dibaca rekursif)
+    - output: File output (.csv, .jsonl, .parquet)
+    - output_format: Format output (default: dari ekstensi file output)
+    - model_path: File model (default: versi aktif registry)
+    - batch_size: Jumlah gambar per forward pass
+    - workers: Jumlah proses decode (default: jumlah core - 1)
+    - prefetch: Jumlah gambar maksimal di antrian prefetch (default: 4 batch)
+    - resume: Lewati gambar yang sudah ada di output
+
+    Returns:
+    - Ringkasan run (jumlah gambar, error, durasi, throughput)
+    """
+
+    from app.utils.helper import predict_batch
+
+    output_format = output_format or os.path.splitext(output)[1].lstrip(".").lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format '{output_format}'. Allowed: {', '.join(OUTPUT_FORMATS)}")
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    prefetch = prefetch or batch_size * 4
+
+    writer = ResultWriter(output, output_format, resume=resume)
+    paths = [path for path in find_images(root) if path not in writer.done]
+    print(f"📊 {len(paths)} images to classify ({len(writer.done)} already in {writer.path})")
+
+    manager = _load_model(model_path)
+    print(f"✅ Model {manager.model_version} ready, decoding with {workers} processes")
+
+    buffer = get_batch_buffer(batch_size)
+    processed = errors = 0
+    start = last_report = time.perf_counter()
+
+    def _flush(batch: list, rows: list) -> int:
+        if batch:
+            inputs = buffer.fill([image for _, image in batch], normalize=manager.batcher.normalize)
+            predictions = predict_batch(manager.model, inputs, dummy=manager.model is None)
+            for (path, _), prediction_result in zip(batch, predictions):
+                rows.append({
+                    "path": path,
+                    "label": prediction_result["label"],
+                    "confidence": round(float(prediction_result["confidence"]), 6),
+                    "class_id": prediction_result.get("class_id"),
+                    "error": None
+                })
+        writer.write(rows)
+        return len(rows)
+
+    try:
+        batch, rows = [], []
+        for path, image, error in prefetch_decoded(root, paths, workers, prefetch):
+            if error is not None:
+                rows.append({"path": path, "label": None, "confidence": None, "class_id": None, "error": error})
+                errors += 1
+            else:
+                batch.append((path, image))
+
+            if len(batch) >= batch_size or len(rows) >= batch_size:
+                processed += _flush(batch, rows)
+                batch, rows = [], []
+
+                now = time.perf_counter()
+                if now - last_report >= 10:
+                    last_report = now
+                    print(f"   {processed}/{len(paths)} images ({processed / (now - start):.1f} img/s)")
+
+        if batch or rows:
+            processed += _flush(batch, rows)
+
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "images": processed,
+        "errors": errors,
+        "skipped": len(writer.done),
+        "elapsed_seconds": round(elapsed, 2),
+        "images_per_second": round(processed / elapsed, 2) if elapsed else None,
+        "model_version": manager.model_version,
+        "output": output
+    }
+    print(f"✅ Classified {processed} images in {elapsed:.1f}s ({summary['images_per_second']} img/s), {errors} errors")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Klasifikasi offline seluruh folder gambar")
+    parser.add_argument("directory", help="Folder gambar (dibaca rekursif)")
+    parser.add_argument("--output", required=True, help="File output: .csv, .jsonl, atau .parquet")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Default: dari ekstensi --output")
+    parser.add_argument("--model", help="File model (default: versi aktif registry)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_MAX_SIZE * 4)
+    parser.add_argument("--workers", type=int, help="Jumlah proses decode (default: jumlah core - 1)")
+    parser.add_argument("--prefetch", type=int, help="Gambar maksimal di antrian prefetch (default: 4 batch)")
+    parser.add_argument("--no-resume", action="store_true", help="Tulis ulang output dari awal")
+    args = parser.parse_args()
+
+    classify_directory(
+        args.directory,
+        args.output,
+        output_format=args.format,
+        model_path=args.model,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        prefetch=args.prefetch,
+        resume=not args.no_resume
+    )
+
+
+if __name__ == "__main__":
+    main()
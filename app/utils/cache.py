@@ -0,0 +1,238 @@
+"""
+Prediction Cache
+Cache hasil prediksi berdasarkan hash isi gambar + versi model,
+dengan tier memory (LRU + TTL) dan tier disk SQLite opsional (dipakai bersama antar worker)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.utils.metrics import timed
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+PREDICTION_CACHE_DB = os.getenv("PREDICTION_CACHE_DB", "")
+
+
+def make_cache_key(data: bytes, model_version: str) -> str:
+    """
+    Membuat cache key dari isi file dan versi model
+
+    Parameters:
+    - data: Bytes gambar yang diupload
+    - model_version: Versi model yang dipakai untuk prediksi
+
+    Returns:
+    - String key (versi model + digest BLAKE2b)
+    """
+
+    with timed("hash"):
+        digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+    return f"{model_version}:{digest}"
+
+
+def _encode_json(value):
+    # Baris probabilitas (numpy) disimpan sebagai list float
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class PredictionCache:
+    """
+    Cache dua tingkat untuk hasil prediksi
+
+    Parameters:
+    - max_size: Jumlah entry maksimal di memory (LRU), 0 untuk menonaktifkan
+    - ttl: Umur entry dalam detik
+    - db_path: Path database SQLite untuk tier disk, kosong untuk menonaktifkan
+    """
+
+    def __init__(
+        self,
+        max_size: int = PREDICTION_CACHE_SIZE,
+        ttl: float = PREDICTION_CACHE_TTL,
+        db_path: str = PREDICTION_CACHE_DB
+    ):
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self.db_path = db_path
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk_writes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 or bool(self.db_path)
+
+    @property
+    def has_disk(self) -> bool:
+        return bool(self.db_path)
+
+    def get_memory(self, key: str):
+        """
+        Ambil entry dari tier memory saja (tanpa I/O)
+
+        Returns:
+        - Dictionary hasil prediksi atau None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < now:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            self._memory_hits += 1
+            return value
+
+    def get(self, key: str):
+        """
+        Ambil entry dari memory, lalu dari disk jika ada
+
+        Returns:
+        - Dictionary hasil prediksi atau None
+        """
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+
+        if self.has_disk:
+            value = self._disk_get(key)
+            if value is not None:
+                with self._lock:
+                    self._disk_hits += 1
+                self._memory_set(key, value)
+                return value
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key: str, value: dict):
+        """
+        Simpan hasil prediksi ke memory dan disk
+        """
+        self._memory_set(key, value)
+        if self.has_disk:
+            self._disk_set(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.has_disk:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM prediction_cache")
+
+    def get_stats(self) -> dict:
+        """
+        Statistik cache (hit/miss dan ukuran)
+        """
+        with self._lock:
+            hits = self._memory_hits + self._disk_hits
+            lookups = hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "disk_tier": self.db_path or None,
+                "size": len(self._entries),
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _memory_set(self, key: str, value: dict):
+        if self.max_size == 0:
+            return
+
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        # Satu koneksi SQLite per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prediction_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_prediction_cache_expires ON prediction_cache (expires_at)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _disk_get(self, key: str):
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM prediction_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️  Error reading prediction cache: {e}")
+            return None
+
+        if row is None or row[1] < time.time():
+            return None
+
+        value = json.loads(row[0])
+        if "probs" in value:
+            value["probs"] = np.asarray(value["probs"], dtype=np.float32)
+        return value
+
+    def _disk_set(self, key: str, value: dict):
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO prediction_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, default=_encode_json), time.time() + self.ttl)
+                )
+
+                # Bersihkan entry kedaluwarsa secara berkala
+                self._disk_writes += 1
+                if self._disk_writes % 256 == 0:
+                    conn.execute("DELETE FROM prediction_cache WHERE expires_at < ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"⚠️  Error writing prediction cache: {e}")
+
+
+# Cache global untuk endpoint klasifikasi
+prediction_cache = PredictionCache()
@@ -0,0 +1,184 @@
+"""
+Model Converter
+Export model Keras (.h5) ke format runtime ringan (TFLite / ONNX),
+termasuk varian TFLite terkuantisasi (dynamic-range dan full-integer INT8)
+
+Contoh:
+    python -m app.utils.converter --model app/models/wereng_classifier.h5 --format tflite onnx
+    python -m app.utils.converter --format dynamic int8 --calibration-dir dataset/validation
+"""
+
+import argparse
+import os
+
+
+QUANTIZATION_MODES = ("dynamic", "int8")
+
+
+def export_tflite(model_path: str, output_path: str = None) -> str:
+    """
+    Export model .h5 ke TFLite (float32)
+
+    Parameters:
+    - model_path: Path ke file model .h5
+    - output_path: Path output (default: nama yang sama dengan ekstensi .tflite)
+
+    Returns:
+    - Path file .tflite
+    """
+
+    import tensorflow as tf
+
+    output_path = output_path or os.path.splitext(model_path)[0] + ".tflite"
+
+    model = tf.keras.models.load_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    tflite_model = converter.convert()
+
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+
+    print(f"✅ TFLite model saved to {output_path}")
+    return output_path
+
+
+def export_onnx(model_path: str, output_path: str = None, opset: int = 13) -> str:
+    """
+    Export model .h5 ke ONNX (membutuhkan tf2onnx)
+
+    Parameters:
+    - model_path: Path ke file model .h5
+    - output_path: Path output (default: nama yang sama dengan ekstensi .onnx)
+    - opset: Versi ONNX opset
+
+    Returns:
+    - Path file .onnx
+    """
+
+    import tensorflow as tf
+    import tf2onnx
+
+    output_path = output_path or os.path.splitext(model_path)[0] + ".onnx"
+
+    model = tf.keras.models.load_model(model_path)
+    # Batch dimension dibiarkan dinamis agar bisa dipakai micro-batching
+    input_signature = [
+        tf.TensorSpec([None] + list(model.input_shape[1:]), tf.float32, name="input")
+    ]
+    tf2onnx.convert.from_keras(
+        model,
+        input_signature=input_signature,
+        opset=opset,
+        output_path=output_path
+    )
+
+    print(f"✅ ONNX model saved to {output_path}")
+    return output_path
+
+
+def _representative_dataset(calibration_dir: str, max_images: int):
+    """
+    Generator gambar kalibrasi untuk quantization full-integer
+    (memakai preprocessing yang sama dengan server)
+    """
+
+    from app.utils.preprocessing import preprocess_image
+
+    paths = []
+    for root, _, files in os.walk(calibration_dir):
+        for name in sorted(files):
+            if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                paths.append(os.path.join(root, name))
+
+    if not paths:
+        raise ValueError(f"No calibration images found in {calibration_dir}")
+
+    # Ambil sampel merata dari seluruh kelas
+    step = max(1, len(paths) // max_images)
+    for path in paths[::step][:max_images]:
+        yield [preprocess_image(path)]
+
+
+def export_tflite_quantized(
+    model_path: str,
+    mode: str,
+    calibration_dir: str = None,
+    output_path: str = None,
+    max_calibration_images: int = 200
+) -> str:
+    """
+    Export model .h5 ke TFLite terkuantisasi
+
+    Parameters:
+    - model_path: Path ke file model .h5
+    - mode: "dynamic" (bobot int8, aktivasi float) atau "int8" (full-integer, butuh kalibrasi)
+    - calibration_dir: Folder gambar kalibrasi (mis. dataset/validation dari model_training.ipynb)
+    - output_path: Path output (default: <nama>.<mode>.tflite)
+    - max_calibration_images: Jumlah gambar kalibrasi maksimal
+
+    Returns:
+    - Path file .tflite
+    """
+
+    import tensorflow as tf
+
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}'. Allowed: {', '.join(QUANTIZATION_MODES)}")
+
+    output_path = output_path or f"{os.path.splitext(model_path)[0]}.{mode}.tflite"
+
+    model = tf.keras.models.load_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if mode == "int8":
+        if not calibration_dir:
+            raise ValueError("Full-integer quantization requires a calibration image directory")
+
+        converter.representative_dataset = lambda: _representative_dataset(
+            calibration_dir, max_calibration_images
+        )
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+        converter.inference_output_type = tf.uint8
+
+    tflite_model = converter.convert()
+
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+
+    print(f"✅ Quantized TFLite model ({mode}) saved to {output_path}")
+    return output_path
+
+
+EXPORTERS = {
+    "tflite": export_tflite,
+    "onnx": export_onnx
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export model Keras ke TFLite / ONNX")
+    parser.add_argument("--model", default="app/models/wereng_classifier.h5")
+    parser.add_argument("--format", nargs="+", default=["tflite"],
+                        choices=sorted(EXPORTERS) + list(QUANTIZATION_MODES),
+                        help="tflite/onnx (float32) atau dynamic/int8 (TFLite terkuantisasi)")
+    parser.add_argument("--calibration-dir", default="dataset/validation",
+                        help="Folder gambar kalibrasi untuk mode int8")
+    parser.add_argument("--calibration-images", type=int, default=200)
+    args = parser.parse_args()
+
+    for fmt in args.format:
+        if fmt in QUANTIZATION_MODES:
+            export_tflite_quantized(
+                args.model,
+                fmt,
+                calibration_dir=args.calibration_dir,
+                max_calibration_images=args.calibration_images
+            )
+        else:
+            EXPORTERS[fmt](args.model)
+
+
+if __name__ == "__main__":
+    main()
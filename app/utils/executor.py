@@ -0,0 +1,109 @@
+"""
+Bounded Executors
+Thread pool dengan batas antrian untuk pekerjaan CPU-heavy (decode, resize, file I/O)
+agar event loop asyncio tetap responsif
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", str(min(8, os.cpu_count() or 1))))
+DECODE_MAX_QUEUE = int(os.getenv("DECODE_MAX_QUEUE", "64"))
+
+
+class ExecutorSaturated(Exception):
+    """
+    Dilempar ketika antrian executor sudah penuh (dipetakan ke HTTP 503)
+    """
+
+    def __init__(self, name: str, retry_after: int = 1):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Server busy: {name} queue is full, please retry")
+
+
+class BoundedExecutor:
+    """
+    ThreadPoolExecutor dengan batas jumlah pekerjaan yang sedang berjalan + mengantri
+
+    Jika batas terlampaui, submit langsung melempar ExecutorSaturated
+    (backpressure) daripada menumpuk antrian tanpa batas.
+
+    Parameters:
+    - name: Nama executor (dipakai untuk nama thread dan pesan error)
+    - max_workers: Jumlah thread worker
+    - max_queue: Jumlah pekerjaan maksimal yang boleh menunggu di antrian
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.capacity = self.max_workers + self.max_queue
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Jalankan fungsi di thread pool
+
+        Returns:
+        - concurrent.futures.Future
+
+        Raises:
+        - ExecutorSaturated jika antrian penuh
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise ExecutorSaturated(self.name)
+            self._in_flight += 1
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Versi async dari submit, untuk dipakai langsung di route handler
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def get_stats(self) -> dict:
+        """
+        Statistik executor (jumlah pekerjaan aktif dan yang ditolak)
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.max_workers),
+                "rejected": self._rejected
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+
+# Executor untuk decode/resize gambar dan file I/O
+decode_executor = BoundedExecutor("decode", DECODE_WORKERS, DECODE_MAX_QUEUE)
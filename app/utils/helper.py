@@ -3,42 +3,372 @@ Helper Functions
 Fungsi-fungsi bantuan untuk model loading, prediction, file handling, dll
 """
 
+import hashlib
 import os
-import shutil
+import time
 import numpy as np
 from datetime import datetime
 from fastapi import UploadFile
-import random
+import threading
+import uuid
 
+from app.utils.executor import decode_executor, ExecutorSaturated
+from app.utils.log_writer import log_writer
+from app.utils.metrics import timed
+from app.utils.upload import UPLOAD_MAX_BYTES, UPLOAD_CHUNK_SIZE, UploadRejected
 
-def load_model(model_path: str):
+
+UPLOAD_DIR = "app/static/uploads"
+
+# Simpan salinan upload ke UPLOAD_DIR untuk audit (default: tidak disimpan)
+PERSIST_UPLOADS = os.getenv("PERSIST_UPLOADS", "false").lower() in ("1", "true", "yes")
+
+# Normalisasi /255 dilakukan di dalam graph model (input uint8 langsung)
+NORMALIZE_IN_MODEL = os.getenv("NORMALIZE_IN_MODEL", "false").lower() in ("1", "true", "yes")
+
+# Backend inferensi: auto, keras, tflite, onnx, synthetic
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "auto").lower()
+
+# Jumlah thread intra-op untuk runtime inferensi (0 = default runtime)
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+
+# Varian model: float, dynamic (dynamic-range quantization), int8 (full-integer quantization)
+MODEL_VARIANT = os.getenv("MODEL_VARIANT", "float").lower()
+MODEL_VARIANTS = ("float", "dynamic", "int8")
+
+# Backend synthetic (model pengganti tanpa TensorFlow): none, sleep, atau conv
+# Default none agar mode dummy tidak menambah latensi; sleep / conv harus diset eksplisit untuk load test
+SYNTHETIC_COST = os.getenv("SYNTHETIC_COST", "none").lower()
+SYNTHETIC_BATCH_MS = float(os.getenv("SYNTHETIC_BATCH_MS", "10"))
+SYNTHETIC_IMAGE_MS = float(os.getenv("SYNTHETIC_IMAGE_MS", "5"))
+SYNTHETIC_CONV_LAYERS = int(os.getenv("SYNTHETIC_CONV_LAYERS", "2"))
+SYNTHETIC_CONV_CHANNELS = int(os.getenv("SYNTHETIC_CONV_CHANNELS", "16"))
+SYNTHETIC_COSTS = ("none", "sleep", "conv")
+
+# Urutan label sesuai output model (tabel bersama, immutable)
+CLASS_LABELS = (
+    "Wereng Coklat (Brown Planthopper)",
+    "Wereng Hijau (Green Leafhopper)",
+    "Wereng Punggung Putih (White Backed Planthopper)",
+    "Bukan Wereng (Not Wereng)"
+)
+
+
+class KerasBackend:
+    """
+    Backend inferensi menggunakan TensorFlow/Keras (fallback, paling berat)
+    
+    Parameters:
+    - model_path: Path ke file model .h5 / SavedModel
+    - num_threads: Jumlah thread intra-op (0 = default TensorFlow)
+    """
+    
+    name = "keras"
+    
+    def __init__(self, model_path: str, num_threads: int = 0):
+        import tensorflow as tf
+        from tensorflow import keras
+        
+        if num_threads:
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            except RuntimeError:
+                # Runtime TensorFlow sudah diinisialisasi
+                pass
+        
+        self.model_path = model_path
+        self.model = keras.models.load_model(model_path)
+    
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        return self.model.predict(batch, verbose=verbose)
+
+
+class TFLiteBackend:
+    """
+    Backend inferensi menggunakan TFLite interpreter (tflite_runtime jika ada)
+    
+    Parameters:
+    - model_path: Path ke file .tflite
+    - num_threads: Jumlah thread intra-op (0 = default runtime)
+    """
+    
+    name = "tflite"
+    
+    def __init__(self, model_path: str, num_threads: int = 0):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        
+        self.model_path = model_path
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads or None)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self._lock = threading.Lock()
+    
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        # Interpreter TFLite tidak thread-safe
+        with self._lock:
+            if len(batch) != self._batch_size:
+                shape = [len(batch)] + list(self._input["shape"][1:])
+                self.interpreter.resize_tensor_input(self._input["index"], shape)
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = len(batch)
+            
+            self.interpreter.set_tensor(self._input["index"], self._quantize_input(batch))
+            self.interpreter.invoke()
+            return self._dequantize_output(self.interpreter.get_tensor(self._output["index"]))
+    
+    def _quantize_input(self, batch: np.ndarray) -> np.ndarray:
+        # Model full-integer (INT8) menerima input terkuantisasi
+        dtype = self._input["dtype"]
+        scale, zero_point = self._input["quantization"]
+        if np.issubdtype(dtype, np.integer) and scale:
+            if batch.dtype == np.uint8:
+                batch = batch.astype(np.float32) / 255.0
+            info = np.iinfo(dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max)
+        return np.asarray(batch, dtype=dtype)
+    
+    def _dequantize_output(self, output: np.ndarray) -> np.ndarray:
+        scale, zero_point = self._output["quantization"]
+        if np.issubdtype(output.dtype, np.integer) and scale:
+            return (output.astype(np.float32) - zero_point) * scale
+        return output.copy()
+
+
+class ONNXBackend:
+    """
+    Backend inferensi menggunakan ONNX Runtime (CPU)
+    
+    Parameters:
+    - model_path: Path ke file .onnx
+    - num_threads: Jumlah thread intra-op (0 = default runtime)
+    """
+    
+    name = "onnx"
+    
+    def __init__(self, model_path: str, num_threads: int = 0):
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        
+        self.model_path = model_path
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self.session.get_inputs()[0].name
+    
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        return self.session.run(None, {self._input_name: np.asarray(batch, dtype=np.float32)})[0]
+
+
+class SyntheticBackend:
+    """
+    Model pengganti tanpa TensorFlow untuk load test dan staging
+    
+    Kontrak input/output sama dengan model asli: (N, 224, 224, 3) uint8 atau float [0, 1]
+    -> (N, jumlah kelas) probabilitas. Output deterministik, diturunkan dari hash piksel
+    gambar (gambar yang sama selalu menghasilkan prediksi yang sama, uint8 maupun float).
+    
+    Biaya komputasi bisa diatur:
+    - sleep: SYNTHETIC_BATCH_MS per batch + SYNTHETIC_IMAGE_MS per gambar (melepas GIL seperti runtime asli);
+      isi dengan hasil `python -m benchmarks.micro` pada model asli
+    - conv: stack konvolusi 3x3 NumPy (SYNTHETIC_CONV_LAYERS x SYNTHETIC_CONV_CHANNELS), beban CPU nyata
+    - none: tanpa biaya tambahan (default; sleep / conv harus diset eksplisit)
+    
+    Parameters:
+    - model_path: Tidak dipakai (kontrak sama dengan backend lain)
+    - num_threads: Tidak dipakai
+    """
+    
+    name = "synthetic"
+    
+    def __init__(
+        self,
+        model_path: str = None,
+        num_threads: int = 0,
+        cost: str = SYNTHETIC_COST,
+        batch_ms: float = SYNTHETIC_BATCH_MS,
+        image_ms: float = SYNTHETIC_IMAGE_MS,
+        conv_layers: int = SYNTHETIC_CONV_LAYERS,
+        conv_channels: int = SYNTHETIC_CONV_CHANNELS
+    ):
+        if cost not in SYNTHETIC_COSTS:
+            print(f"⚠️  Unknown synthetic cost '{cost}'. Using none.")
+            cost = "none"
+        
+        self.model_path = model_path
+        self.variant = "synthetic"
+        self.cost = cost
+        self.batch_seconds = max(0.0, batch_ms) / 1000.0
+        self.image_seconds = max(0.0, image_ms) / 1000.0
+        
+        # Bobot konvolusi tetap (seed 0) agar biaya dan hasil konsisten antar proses
+        rng = np.random.default_rng(0)
+        channels = [3] + [max(1, conv_channels)] * max(0, conv_layers)
+        self.kernels = [
+            rng.normal(0, 0.1, size=(3, 3, c_in, c_out)).astype(np.float32)
+            for c_in, c_out in zip(channels[:-1], channels[1:])
+        ]
+    
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        batch = np.asarray(batch)
+        if batch.dtype != np.uint8:
+            batch = np.clip(np.round(batch * 255.0), 0, 255).astype(np.uint8)
+        
+        if self.cost == "sleep":
+            time.sleep(self.batch_seconds + self.image_seconds * len(batch))
+        elif self.cost == "conv":
+            self._conv_stack(batch)
+        
+        return np.stack([self._probabilities(image) for image in batch])
+    
+    def _probabilities(self, image: np.ndarray) -> np.ndarray:
+        # Seed dari hash piksel: satu kelas dominan, sama untuk gambar yang sama
+        seed = int.from_bytes(hashlib.blake2b(np.ascontiguousarray(image), digest_size=8).digest(), "little")
+        return np.random.default_rng(seed).dirichlet(np.full(len(CLASS_LABELS), 0.3)).astype(np.float32)
+    
+    def _conv_stack(self, batch: np.ndarray) -> np.ndarray:
+        x = batch[:, ::2, ::2, :].astype(np.float32) / 255.0
+        for kernel in self.kernels:
+            windows = np.lib.stride_tricks.sliding_window_view(x, (3, 3), axis=(1, 2))
+            x = np.maximum(np.einsum("nhwcij,ijco->nhwo", windows, kernel, optimize=True), 0)
+            x = x[:, ::2, ::2, :]
+        return x.mean(axis=(1, 2))
+
+
+INFERENCE_BACKENDS = {
+    "keras": KerasBackend,
+    "tflite": TFLiteBackend,
+    "onnx": ONNXBackend,
+    "synthetic": SyntheticBackend
+}
+
+_BACKEND_EXTENSIONS = {
+    ".tflite": "tflite",
+    ".onnx": "onnx"
+}
+
+
+def _resolve_backend(model_path: str, backend: str, variant: str = "float") -> tuple:
     """
-    Load model dari file .h5
+    Tentukan backend dan file model yang dipakai
+    
+    Mode "auto" memilih berdasarkan ekstensi file, atau mencari file .tflite/.onnx
+    dengan nama yang sama di samping file .h5 (hasil app.utils.converter).
+    Varian terkuantisasi selalu memakai file <nama>.<variant>.tflite.
+    
+    Returns:
+    - Tuple (nama backend, path model)
+    """
+    
+    stem, ext = os.path.splitext(model_path)
+    
+    if backend == "synthetic":
+        return backend, model_path
+    
+    if variant != "float":
+        return "tflite", f"{stem}.{variant}.tflite"
+    
+    if backend != "auto":
+        if backend != "keras" and ext not in _BACKEND_EXTENSIONS:
+            model_path = f"{stem}.{backend}"
+        return backend, model_path
+    
+    if ext in _BACKEND_EXTENSIONS:
+        return _BACKEND_EXTENSIONS[ext], model_path
+    
+    for candidate_ext, candidate in _BACKEND_EXTENSIONS.items():
+        if os.path.exists(stem + candidate_ext):
+            return candidate, stem + candidate_ext
+    
+    return "keras", model_path
+
+
+def load_model(model_path: str, backend: str = None, num_threads: int = None, variant: str = None):
+    """
+    Load model dengan backend inferensi yang dipilih
     
     Parameters:
     - model_path: Path ke file model
+    - backend: auto, keras, tflite, onnx, atau synthetic (default: INFERENCE_BACKEND)
+    - num_threads: Jumlah thread intra-op (default: INFERENCE_THREADS)
+    - variant: float, dynamic, atau int8 (default: MODEL_VARIANT)
     
     Returns:
-    - Loaded model
+    - Backend inferensi dengan method predict(batch), atau None jika gagal
     """
     
+    backend = (backend or INFERENCE_BACKEND).lower()
+    num_threads = INFERENCE_THREADS if num_threads is None else num_threads
+    variant = (variant or MODEL_VARIANT).lower()
+    
+    if backend != "auto" and backend not in INFERENCE_BACKENDS:
+        print(f"⚠️  Unknown inference backend '{backend}'. Falling back to keras.")
+        backend = "keras"
+    
+    if variant not in MODEL_VARIANTS:
+        print(f"⚠️  Unknown model variant '{variant}'. Using float model.")
+        variant = "float"
+    
+    backend, resolved_path = _resolve_backend(model_path, backend, variant)
+    if backend == "synthetic":
+        variant = "synthetic"
+    
     try:
-        # Import tensorflow/keras
-        from tensorflow import keras
-        
-        model = keras.models.load_model(model_path)
-        print(f"✅ Model loaded from {model_path}")
+        model = INFERENCE_BACKENDS[backend](resolved_path, num_threads)
+        model.variant = variant
+        print(f"✅ Model loaded from {resolved_path} ({backend} backend, {variant})")
         return model
     
     except ImportError:
+        if backend != "keras":
+            print(f"⚠️  Runtime for {backend} backend not installed. Falling back to keras.")
+            return load_model(model_path, backend="keras", num_threads=num_threads, variant="float")
         print("⚠️  TensorFlow not installed. Using dummy prediction mode.")
         return None
     
     except Exception as e:
+        if backend != "keras":
+            print(f"⚠️  Error loading {backend} model: {e}. Falling back to keras.")
+            return load_model(model_path, backend="keras", num_threads=num_threads, variant="float")
         print(f"⚠️  Error loading model: {e}")
         return None
 
 
+def add_input_normalization(model):
+    """
+    Bungkus model agar menerima input uint8 dan melakukan normalisasi /255 di dalam graph
+    
+    Parameters:
+    - model: KerasBackend yang modelnya menerima input float32 [0, 1]
+    
+    Returns:
+    - Backend yang sama, dengan model keras baru yang menerima input uint8
+    """
+    
+    if not isinstance(model, KerasBackend):
+        raise ValueError(f"Input normalization is only supported for the keras backend, got {model.name}")
+    
+    from tensorflow import keras
+    
+    inner = model.model
+    inputs = keras.Input(shape=inner.input_shape[1:], dtype="uint8")
+    x = keras.layers.Rescaling(1.0 / 255.0)(inputs)
+    outputs = inner(x)
+    model.model = keras.Model(inputs, outputs, name=f"{inner.name}_uint8")
+    return model
+
+
 def predict_image(model, img_array: np.ndarray, dummy: bool = False) -> dict:
     """
     Prediksi gambar menggunakan model
@@ -49,88 +379,168 @@ def predict_image(model, img_array: np.ndarray, dummy: bool = False) -> dict:
     - dummy: Jika True, gunakan dummy prediction
     
     Returns:
-    - Dictionary dengan hasil prediksi
+    - Dictionary dengan hasil prediksi (lihat format_predictions)
     """
     
-    # Class labels
-    class_labels = [
-        "Wereng Coklat (Brown Planthopper)",
-        "Wereng Hijau (Green Leafhopper)",
-        "Wereng Punggung Putih (White Backed Planthopper)",
-        "Bukan Wereng (Not Wereng)"
-    ]
-    
     if dummy or model is None:
-        # Dummy prediction untuk testing
-        class_id = random.randint(0, len(class_labels) - 1)
-        confidence = random.uniform(0.75, 0.98)
-        
-        return {
-            "label": class_labels[class_id],
-            "confidence": confidence,
-            "class_id": class_id,
-            "all_predictions": [
-                {"class": class_labels[i], "confidence": random.uniform(0.01, 0.95)}
-                for i in range(len(class_labels))
-            ]
-        }
+        # Dummy prediction untuk testing (deterministik, lihat SyntheticBackend)
+        model = synthetic_model()
     
     try:
         # Real prediction
-        predictions = model.predict(img_array, verbose=0)
-        predicted_class_id = np.argmax(predictions[0])
-        confidence = float(predictions[0][predicted_class_id])
-        
-        # Get all class predictions
-        all_predictions = [
-            {
-                "class": class_labels[i],
-                "confidence": float(predictions[0][i])
-            }
-            for i in range(len(class_labels))
-        ]
-        
-        # Sort by confidence
-        all_predictions = sorted(all_predictions, key=lambda x: x["confidence"], reverse=True)
-        
-        return {
-            "label": class_labels[predicted_class_id],
-            "confidence": confidence,
-            "class_id": int(predicted_class_id),
-            "all_predictions": all_predictions
-        }
+        return format_predictions(model.predict(img_array, verbose=0))[0]
     
     except Exception as e:
         raise Exception(f"Error during prediction: {str(e)}")
 
 
+def predict_batch(model, batch: np.ndarray, dummy: bool = False) -> list:
+    """
+    Prediksi banyak gambar sekaligus dalam satu forward pass
+    
+    Parameters:
+    - model: Model yang sudah di-load
+    - batch: Numpy array dengan shape (N, 224, 224, 3)
+    - dummy: Jika True, gunakan dummy prediction
+    
+    Returns:
+    - List dictionary hasil prediksi, satu per gambar (urutan sama dengan input)
+    """
+    
+    if dummy or model is None:
+        model = synthetic_model()
+    
+    try:
+        return format_predictions(model.predict(batch, verbose=0))
+    
+    except Exception as e:
+        raise Exception(f"Error during batch prediction: {str(e)}")
+
+
+_synthetic_model = None
+
+
+def synthetic_model() -> SyntheticBackend:
+    """
+    SyntheticBackend bersama untuk mode dummy (dibuat sekali)
+    """
+    
+    global _synthetic_model
+    if _synthetic_model is None:
+        _synthetic_model = SyntheticBackend()
+    return _synthetic_model
+
+
+def format_predictions(predictions: np.ndarray) -> list:
+    """
+    Ubah output probabilitas model (N, jumlah kelas) menjadi hasil prediksi ringkas
+    
+    Label diambil dari CLASS_LABELS (dipakai bersama, tidak dibuat ulang), probabilitas
+    semua kelas disimpan sebagai satu baris numpy; daftar per kelas hanya dibuat
+    jika diminta (lihat top_predictions / probability_list).
+    
+    Parameters:
+    - predictions: Array probabilitas per kelas
+    
+    Returns:
+    - List dictionary {label, confidence, class_id, probs}, satu per baris
+    """
+    
+    probs = np.asarray(predictions, dtype=np.float32)
+    class_ids = probs.argmax(axis=1)
+    
+    return [
+        {
+            "label": CLASS_LABELS[class_id],
+            "confidence": float(row[class_id]),
+            "class_id": int(class_id),
+            "probs": row
+        }
+        for row, class_id in zip(probs, class_ids)
+    ]
+
+
+def top_predictions(result: dict, k: int) -> list:
+    """
+    k kelas dengan probabilitas tertinggi
+    
+    Returns:
+    - List dictionary {class, class_id, confidence}, urut dari yang tertinggi
+    """
+    
+    probs = np.asarray(result["probs"])
+    top = np.argsort(probs)[::-1][:k]
+    return [
+        {"class": CLASS_LABELS[i], "class_id": int(i), "confidence": round(float(probs[i]), 4)}
+        for i in top
+    ]
+
+
+def probability_list(result: dict) -> list:
+    """
+    Probabilitas semua kelas (urut sesuai class_id / CLASS_LABELS)
+    """
+    
+    return [round(p, 4) for p in np.asarray(result["probs"], dtype=np.float64).tolist()]
+
+
+def average_predictions(results: list) -> dict:
+    """
+    Rata-rata probabilitas beberapa hasil prediksi untuk gambar yang sama (mis. varian TTA)
+    
+    Parameters:
+    - results: List dictionary hasil prediksi (format predict_batch)
+    
+    Returns:
+    - Satu dictionary hasil prediksi dari probabilitas rata-rata
+    """
+    
+    return format_predictions(np.mean([result["probs"] for result in results], axis=0)[np.newaxis])[0]
+
+
 async def save_upload_file(upload_file: UploadFile) -> str:
     """
-    Simpan file upload ke folder temporary
+    Simpan file upload ke folder temporary (per chunk, maksimal UPLOAD_MAX_BYTES)
     
     Parameters:
     - upload_file: File yang diupload
     
     Returns:
     - Path ke file yang disimpan
-    """
-    
-    # Buat folder uploads jika belum ada
-    upload_dir = "app/static/uploads"
-    os.makedirs(upload_dir, exist_ok=True)
     
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{upload_file.filename}"
-    file_path = os.path.join(upload_dir, filename)
+    Raises:
+    - UploadRejected jika file melebihi UPLOAD_MAX_BYTES (file parsial dihapus)
+    """
     
-    # Save file
+    file_path = _unique_upload_path(upload_file.filename)
+    
+    def _copy():
+        written = 0
+        with timed("save"), open(file_path, "wb") as buffer:
+            while True:
+                chunk = upload_file.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > UPLOAD_MAX_BYTES:
+                    raise UploadRejected(413, f"File too large. Maximum {UPLOAD_MAX_BYTES} bytes")
+                buffer.write(chunk)
+    
+    # Save file (di thread pool agar tidak memblokir event loop)
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+        await decode_executor.run(_copy)
         
         return file_path
     
+    except UploadRejected:
+        # Hapus file parsial
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    
+    except ExecutorSaturated:
+        raise
+    
     except Exception as e:
         raise Exception(f"Error saving file: {str(e)}")
     
@@ -138,33 +548,66 @@ async def save_upload_file(upload_file: UploadFile) -> str:
         upload_file.file.close()
 
 
-def log_prediction(filename: str, label: str, confidence: float):
+def save_upload_bytes(data: bytes, filename: str) -> str:
     """
-    Log prediksi ke file
+    Simpan isi upload (bytes) ke folder uploads, untuk audit (opt-in lewat PERSIST_UPLOADS)
     
     Parameters:
-    - filename: Nama file gambar
-    - label: Label hasil prediksi
-    - confidence: Confidence score
-    """
-    
-    # Buat folder logs jika belum ada
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
+    - data: Isi file yang diupload
+    - filename: Nama file asli
     
-    log_file = os.path.join(log_dir, "prediction_logs.txt")
+    Returns:
+    - Path ke file yang disimpan
+    """
     
-    # Format log entry
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = f"[{timestamp}] {filename} → prediksi: {label} ({confidence:.4f})\n"
+    file_path = _unique_upload_path(filename)
     
-    # Append to log file
     try:
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(log_entry)
+        with timed("save"), open(file_path, "wb") as buffer:
+            buffer.write(data)
+        
+        return file_path
     
     except Exception as e:
-        print(f"⚠️  Error writing to log: {e}")
+        raise Exception(f"Error saving file: {str(e)}")
+
+
+def _unique_upload_path(filename: str) -> str:
+    """
+    Generate path unik di folder uploads (timestamp + random suffix, aman untuk upload bersamaan)
+    """
+    
+    # Buat folder uploads jika belum ada
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_name = os.path.basename(filename or "upload")
+    return os.path.join(UPLOAD_DIR, f"{timestamp}_{uuid.uuid4().hex[:8]}_{safe_name}")
+
+
+def log_prediction(filename: str, label: str, confidence: float, class_id: int = None):
+    """
+    Log prediksi ke prediction store (SQLite) dan file log teks
+    
+    Entry hanya dimasukkan ke antrian; penulisan dilakukan per batch oleh
+    thread log writer sehingga request tidak menunggu disk.
+    
+    Parameters:
+    - filename: Nama file gambar
+    - label: Label hasil prediksi
+    - confidence: Confidence score
+    - class_id: ID kelas hasil prediksi (opsional)
+    """
+    
+    # Entry yang dibuang saat antrian penuh dihitung di log_writer.dropped
+    with timed("log"):
+        log_writer.submit({
+            "timestamp": datetime.now(),
+            "filename": filename,
+            "label": label,
+            "confidence": float(confidence),
+            "class_id": class_id
+        })
 
 
 def clean_old_uploads(max_age_hours: int = 24):
@@ -175,7 +618,7 @@ def clean_old_uploads(max_age_hours: int = 24):
     - max_age_hours: Umur maksimal file dalam jam (default: 24)
     """
     
-    upload_dir = "app/static/uploads"
+    upload_dir = UPLOAD_DIR
     
     if not os.path.exists(upload_dir):
         return
@@ -217,6 +660,11 @@ def get_model_summary(model) -> dict:
     if model is None:
         return {"error": "Model not loaded"}
     
+    if not isinstance(model, KerasBackend):
+        return {"backend": model.name, "model_path": model.model_path}
+    
+    model = model.model
+    
     try:
         import io
         import sys
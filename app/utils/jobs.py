@@ -0,0 +1,647 @@
+"""
+Classification Jobs
+Job klasifikasi offline untuk ribuan gambar (hasil survei lapangan): upload disimpan ke disk,
+worker di background memproses gambar per potongan (decode paralel + batched inference)
+dan menyimpan progress serta hasil per gambar ke SQLite
+
+Status job: queued -> running -> completed / failed. Job yang sedang berjalan memegang
+lease; jika server restart (atau worker mati), lease habis dan job dilanjutkan oleh
+worker lain mulai dari gambar yang belum diproses.
+"""
+
+import asyncio
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.utils.batcher import BATCH_MAX_SIZE
+from app.utils.executor import ExecutorSaturated
+from app.utils.helper import log_prediction
+from app.utils.model_registry import model_registry, ModelNotFound
+from app.utils.preprocessing import load_image_array
+from app.utils.upload import UPLOAD_MAX_BYTES, UploadRejected, validate_image_bytes
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+JOB_DB = os.getenv("JOB_DB", "logs/jobs.sqlite")
+JOB_STORAGE_DIR = os.getenv("JOB_STORAGE_DIR", "jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_DECODE_WORKERS = int(os.getenv("JOB_DECODE_WORKERS", "2"))
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", str(BATCH_MAX_SIZE * 4)))
+JOB_MAX_FILES = int(os.getenv("JOB_MAX_FILES", "20000"))
+JOB_MAX_UPLOAD_BYTES = int(os.getenv("JOB_MAX_UPLOAD_BYTES", str(2 * 1024 * 1024 * 1024)))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2.0"))
+JOB_KEEP_INPUTS = os.getenv("JOB_KEEP_INPUTS", "false").lower() in ("1", "true", "yes")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+ITEM_STATUSES = ("pending", "done", "error")
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def job_directory(job_id: str, storage_dir: str = JOB_STORAGE_DIR) -> str:
+    return os.path.join(storage_dir, job_id)
+
+
+def save_stream(source, path: str, max_bytes: int, chunk_size: int = 1024 * 1024) -> int:
+    """
+    Salin file upload ke disk per chunk dengan batas ukuran (file parsial dihapus jika terlalu besar)
+
+    Returns:
+    - Jumlah byte yang ditulis
+
+    Raises:
+    - UploadRejected jika melebihi max_bytes
+    """
+
+    written = 0
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadRejected(413, f"File too large. Maximum {max_bytes} bytes")
+                f.write(chunk)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return written
+
+
+def list_archive_images(archive_path: str, max_files: int = JOB_MAX_FILES) -> list:
+    """
+    Daftar file gambar di dalam zip (tanpa ekstrak)
+
+    Returns:
+    - List nama member zip (urut sesuai isi arsip)
+
+    Raises:
+    - ValueError jika zip rusak, terlalu banyak file, atau tidak berisi gambar
+    """
+
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [
+                info.filename for info in archive.infolist()
+                if not info.is_dir()
+                and os.path.splitext(info.filename)[1].lower() in IMAGE_EXTENSIONS
+                and not os.path.basename(info.filename).startswith(".")
+            ]
+    except zipfile.BadZipFile:
+        raise ValueError("Invalid zip file")
+
+    if not members:
+        raise ValueError("Zip file does not contain any JPG/PNG images")
+    if len(members) > max_files:
+        raise ValueError(f"Too many images in zip ({len(members)}). Maximum {max_files}")
+    return members
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    total, processed = row["total"], row["processed"]
+    return {
+        "job_id": row["id"],
+        "status": row["status"],
+        "model_version": row["model_version"],
+        "source": row["source"],
+        "total": total,
+        "processed": processed,
+        "failed": row["failed"],
+        "progress": round(processed / total, 4) if total else 1.0,
+        "error": row["error"],
+        "created_at": datetime.fromtimestamp(row["created_at"]).isoformat(),
+        "updated_at": datetime.fromtimestamp(row["updated_at"]).isoformat(),
+        "finished_at": datetime.fromtimestamp(row["finished_at"]).isoformat() if row["finished_at"] else None
+    }
+
+
+def _row_to_item(row: sqlite3.Row) -> dict:
+    item = {"index": row["idx"], "filename": row["filename"], "status": row["status"]}
+    if row["status"] == "done":
+        item["prediction"] = {
+            "label": row["label"],
+            "confidence": round(row["confidence"], 4),
+            "class_id": row["class_id"]
+        }
+    elif row["status"] == "error":
+        item["error"] = row["error"]
+    return item
+
+
+class JobStore:
+    """
+    Status job dan hasil per gambar di SQLite (mode WAL, aman dipakai beberapa worker)
+
+    Parameters:
+    - db_path: Path file database SQLite
+    """
+
+    def __init__(self, db_path: str = JOB_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Satu koneksi SQLite per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, "
+                "status TEXT NOT NULL, "
+                "model_version TEXT, "
+                "source TEXT NOT NULL, "
+                "archive TEXT, "
+                "total INTEGER NOT NULL, "
+                "processed INTEGER NOT NULL DEFAULT 0, "
+                "failed INTEGER NOT NULL DEFAULT 0, "
+                "error TEXT, "
+                "lease_until REAL, "
+                "created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL, "
+                "finished_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_items ("
+                "job_id TEXT NOT NULL, "
+                "idx INTEGER NOT NULL, "
+                "filename TEXT NOT NULL, "
+                "path TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "label TEXT, "
+                "confidence REAL, "
+                "class_id INTEGER, "
+                "error TEXT, "
+                "PRIMARY KEY (job_id, idx))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (job_id, status, idx)")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, items: list, model_version: str,
+               source: str, archive: str = None) -> dict:
+        """
+        Daftarkan job baru beserta semua gambarnya (status queued)
+
+        Parameters:
+        - job_id: ID job
+        - items: List tuple (filename, path); path = file di disk, atau nama member jika archive diisi
+        - model_version: Versi model yang dipakai untuk seluruh job
+        - source: "zip" atau "files"
+        - archive: Path file zip (opsional)
+
+        Returns:
+        - Dictionary status job
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, model_version, source, archive, total, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, model_version, source, archive, len(items), now, now)
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, idx, filename, path, status) VALUES (?, ?, ?, ?, 'pending')",
+                [(job_id, idx, filename, path) for idx, (filename, path) in enumerate(items)]
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict:
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def get_archive(self, job_id: str) -> str:
+        row = self._connection().execute("SELECT archive FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["archive"] if row is not None else None
+
+    def claim(self, lease_seconds: float = JOB_LEASE_SECONDS) -> dict:
+        """
+        Ambil job berikutnya untuk diproses: job queued, atau job running yang lease-nya habis
+        (worker sebelumnya mati / server restart)
+
+        Returns:
+        - Dictionary status job atau None jika tidak ada job
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            # BEGIN IMMEDIATE agar dua worker tidak mengambil job yang sama
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', lease_until = ?, updated_at = ? WHERE id = ?",
+                (now + lease_seconds, now, row["id"])
+            )
+        return self.get(row["id"])
+
+    def pending_items(self, job_id: str, limit: int) -> list:
+        """
+        Gambar yang belum diproses, urut sesuai index
+
+        Returns:
+        - List dictionary (index, filename, path)
+        """
+        rows = self._connection().execute(
+            "SELECT idx, filename, path FROM job_items WHERE job_id = ? AND status = 'pending' "
+            "ORDER BY idx LIMIT ?",
+            (job_id, limit)
+        ).fetchall()
+        return [{"index": row["idx"], "filename": row["filename"], "path": row["path"]} for row in rows]
+
+    def record_results(self, job_id: str, results: list, lease_seconds: float = JOB_LEASE_SECONDS):
+        """
+        Simpan hasil satu potongan gambar dan perpanjang lease dalam satu transaksi
+
+        Parameters:
+        - results: List dictionary dengan key index dan (label, confidence, class_id) atau error
+        """
+        now = time.time()
+        processed = failed = 0
+        conn = self._connection()
+        with conn:
+            for result in results:
+                if "error" in result:
+                    cursor = conn.execute(
+                        "UPDATE job_items SET status = 'error', error = ? "
+                        "WHERE job_id = ? AND idx = ? AND status = 'pending'",
+                        (result["error"], job_id, result["index"])
+                    )
+                    failed += cursor.rowcount
+                else:
+                    cursor = conn.execute(
+                        "UPDATE job_items SET status = 'done', label = ?, confidence = ?, class_id = ? "
+                        "WHERE job_id = ? AND idx = ? AND status = 'pending'",
+                        (result["label"], float(result["confidence"]), result.get("class_id"),
+                         job_id, result["index"])
+                    )
+                processed += cursor.rowcount
+
+            conn.execute(
+                "UPDATE jobs SET processed = processed + ?, failed = failed + ?, "
+                "lease_until = ?, updated_at = ? WHERE id = ?",
+                (processed, failed, now + lease_seconds, now, job_id)
+            )
+
+    def finish(self, job_id: str, status: str, error: str = None):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ?, finished_at = ? "
+                "WHERE id = ?",
+                (status, error, now, now, job_id)
+            )
+
+    def renew_lease(self, job_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        """
+        Perpanjang lease job yang sedang diproses (heartbeat)
+
+        Returns:
+        - False jika job sudah tidak running (dikembalikan ke antrian / selesai)
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                (now + lease_seconds, now, job_id)
+            )
+        return cursor.rowcount > 0
+
+    def release(self, job_id: str):
+        """
+        Kembalikan job ke antrian (worker berhenti sebelum job selesai)
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                (time.time(), job_id)
+            )
+
+    def results(self, job_id: str, limit: int = 100, cursor: int = None, status: str = None) -> list:
+        """
+        Hasil per gambar (urut index), dengan pagination cursor
+
+        Parameters:
+        - limit: Jumlah hasil maksimal
+        - cursor: Hanya hasil dengan index > cursor (halaman berikutnya)
+        - status: Filter status gambar (pending, done, error)
+
+        Returns:
+        - List dictionary hasil
+        """
+        clauses, params = ["job_id = ?"], [job_id]
+        if cursor is not None:
+            clauses.append("idx > ?")
+            params.append(cursor)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        params.append(max(0, limit))
+
+        rows = self._connection().execute(
+            f"SELECT idx, filename, status, label, confidence, class_id, error FROM job_items "
+            f"WHERE {' AND '.join(clauses)} ORDER BY idx LIMIT ?",
+            params
+        ).fetchall()
+        return [_row_to_item(row) for row in rows]
+
+    def counts(self) -> dict:
+        rows = self._connection().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class _ItemReader:
+    """
+    Membaca isi gambar job dari disk atau dari member zip
+    """
+
+    def __init__(self, archive_path: str = None):
+        self._archive = zipfile.ZipFile(archive_path) if archive_path else None
+
+    def read(self, item: dict) -> bytes:
+        if self._archive is not None:
+            info = self._archive.getinfo(item["path"])
+            if info.file_size > UPLOAD_MAX_BYTES:
+                raise ValueError(f"File too large ({info.file_size} bytes). Maximum {UPLOAD_MAX_BYTES} bytes")
+            return self._archive.read(info)
+
+        with open(item["path"], "rb") as f:
+            return f.read(UPLOAD_MAX_BYTES + 1)
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+
+
+def _decode(contents: bytes):
+    validate_image_bytes(contents)
+    return load_image_array(contents)
+
+
+class JobRunner:
+    """
+    Worker pool untuk job klasifikasi
+
+    Setiap worker adalah thread dengan event loop sendiri; gambar di-decode di thread pool
+    terpisah (tidak memakai antrian decode request interaktif) lalu diprediksi lewat
+    micro-batcher model yang sama dengan /api/classify.
+
+    Parameters:
+    - store: JobStore
+    - workers: Jumlah job yang diproses bersamaan per proses server
+    - decode_workers: Jumlah thread decode per worker
+    - chunk_size: Jumlah gambar per potongan (progress disimpan setiap potongan)
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = JOB_WORKERS,
+        decode_workers: int = JOB_DECODE_WORKERS,
+        chunk_size: int = JOB_CHUNK_SIZE,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        storage_dir: str = JOB_STORAGE_DIR,
+        lease_seconds: float = JOB_LEASE_SECONDS
+    ):
+        self.store = store
+        self.workers = max(0, workers)
+        self.decode_workers = max(1, decode_workers)
+        self.chunk_size = max(1, chunk_size)
+        self.poll_interval = poll_interval
+        self.storage_dir = storage_dir
+        self.lease_seconds = lease_seconds
+
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        """
+        Bangunkan worker (job baru dibuat di proses ini)
+        """
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Hentikan worker; job yang belum selesai dikembalikan ke antrian
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self._stop.set()
+            self._wakeup.set()
+        for thread in threads:
+            thread.join(timeout=timeout)
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": len(self._threads),
+            "chunk_size": self.chunk_size,
+            "completed": self.completed,
+            "failed": self.failed,
+            "jobs": self.store.counts()
+        }
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        decode_pool = ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix="job-decode")
+        try:
+            while not self._stop.is_set():
+                try:
+                    job = self.store.claim()
+                except Exception as e:
+                    print(f"⚠️  Error claiming job: {e}")
+                    job = None
+
+                if job is None:
+                    # Job dari worker lain tidak memicu notify; cek ulang secara berkala
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+
+                loop.run_until_complete(self._process(job, loop, decode_pool))
+        finally:
+            decode_pool.shutdown(wait=False)
+            loop.close()
+
+    async def _process(self, job: dict, loop, decode_pool):
+        job_id = job["job_id"]
+        reader = None
+        print(f"📦 Job {job_id} started ({job['processed']}/{job['total']} already processed)")
+
+        # Lease diperpanjang selama job berjalan (termasuk saat menunggu model di-load),
+        # agar worker lain tidak mengambil job yang sama
+        heartbeat = loop.create_task(self._heartbeat(job_id, loop))
+        try:
+            model_manager = self._resolve_model(job["model_version"])
+            await loop.run_in_executor(None, model_manager.wait_until_loaded)
+            if not self.store.renew_lease(job_id, self.lease_seconds):
+                print(f"⚠️  Job {job_id} lease lost while waiting for the model")
+                return
+            reader = _ItemReader(self.store.get_archive(job_id))
+
+            while True:
+                if self._stop.is_set():
+                    self.store.release(job_id)
+                    return
+                if heartbeat.done():
+                    print(f"⚠️  Job {job_id} lease lost. Stopping")
+                    return
+
+                items = self.store.pending_items(job_id, self.chunk_size)
+                if not items:
+                    break
+
+                results = await self._process_chunk(items, reader, model_manager, loop, decode_pool)
+                # record_results sekaligus memperpanjang lease
+                self.store.record_results(job_id, results, self.lease_seconds)
+
+        except Exception as e:
+            if self._stop.is_set():
+                self.store.release(job_id)
+                return
+            print(f"⚠️  Job {job_id} failed: {e}")
+            self.store.finish(job_id, "failed", error=str(e))
+            self.failed += 1
+            return
+
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            if reader is not None:
+                reader.close()
+
+        self.store.finish(job_id, "completed")
+        self.completed += 1
+        print(f"✅ Job {job_id} completed")
+
+        if not JOB_KEEP_INPUTS:
+            shutil.rmtree(job_directory(job_id, self.storage_dir), ignore_errors=True)
+
+    async def _heartbeat(self, job_id: str, loop):
+        # Selesai (tanpa exception) jika job sudah tidak running: _process berhenti di potongan berikutnya
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await loop.run_in_executor(None, self.store.renew_lease, job_id, self.lease_seconds)
+            except sqlite3.Error as e:
+                print(f"⚠️  Error renewing lease for job {job_id}: {e}")
+                continue
+            if not renewed:
+                return
+
+    async def _process_chunk(self, items: list, reader: _ItemReader, model_manager, loop, decode_pool) -> list:
+        # Baca isi file berurutan (zip tidak dibaca dari banyak thread), decode secara paralel
+        contents = await loop.run_in_executor(
+            decode_pool, lambda: [self._safe(reader.read, item) for item in items]
+        )
+        decoded = await asyncio.gather(
+            *[
+                loop.run_in_executor(decode_pool, _decode, data)
+                for data in contents if not isinstance(data, Exception)
+            ],
+            return_exceptions=True
+        )
+
+        results = []
+        images, image_items = [], []
+        decoded = iter(decoded)
+        for item, data in zip(items, contents):
+            image = data if isinstance(data, Exception) else next(decoded)
+            if isinstance(image, Exception):
+                results.append({"index": item["index"], "error": str(image)})
+            else:
+                images.append(image)
+                image_items.append(item)
+
+        if images:
+            predictions = await self._predict(model_manager, images)
+            for item, prediction_result in zip(image_items, predictions):
+                results.append({
+                    "index": item["index"],
+                    "label": prediction_result["label"],
+                    "confidence": prediction_result["confidence"],
+                    "class_id": prediction_result.get("class_id")
+                })
+                log_prediction(
+                    filename=item["filename"],
+                    label=prediction_result["label"],
+                    confidence=prediction_result["confidence"],
+                    class_id=prediction_result.get("class_id")
+                )
+
+        return results
+
+    async def _predict(self, model_manager, images: list) -> list:
+        # Request interaktif didahulukan: jika antrian inferensi penuh, tunggu lalu coba lagi
+        while True:
+            try:
+                return await model_manager.batcher.predict_many(images)
+            except ExecutorSaturated as e:
+                if self._stop.is_set():
+                    raise
+                await asyncio.sleep(e.retry_after)
+
+    @staticmethod
+    def _safe(fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            return e
+
+    @staticmethod
+    def _resolve_model(version: str):
+        # Versi job sudah dihapus dari registry: lanjutkan dengan versi aktif
+        try:
+            return model_registry.resolve(version)
+        except ModelNotFound:
+            return model_registry.resolve(None)
+
+
+# Store dan worker pool global untuk /api/jobs
+job_store = JobStore()
+job_runner = JobRunner(job_store)
@@ -0,0 +1,94 @@
+"""
+Prediction Log Reader
+Membaca file log teks besar tanpa memuat seluruh isinya: tail dengan seek mundur
+per blok (O(limit), tidak bergantung ukuran file) dan streaming maju untuk export
+"""
+
+import os
+
+from app.utils.log_writer import LOG_FILE, rotated_log_files
+from app.utils.prediction_store import parse_legacy_line
+
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def iter_lines_reverse(path: str, block_size: int = READ_BLOCK_SIZE):
+    """
+    Yield baris file dari yang paling akhir, membaca per blok dari ujung file
+
+    Parameters:
+    - path: Path file teks (UTF-8)
+    - block_size: Ukuran blok baca dalam byte
+
+    Returns:
+    - Generator string baris (tanpa newline)
+    """
+
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            chunk = f.read(read_size) + remainder
+
+            lines = chunk.split(b"\n")
+            # Baris pertama mungkin terpotong, simpan untuk blok berikutnya
+            remainder = lines[0]
+
+            for line in reversed(lines[1:]):
+                if line:
+                    yield line.decode("utf-8", errors="replace")
+
+        if remainder:
+            yield remainder.decode("utf-8", errors="replace")
+
+
+def tail_records(limit: int = 50, log_file: str = LOG_FILE, label: str = None) -> list:
+    """
+    Ambil `limit` record terakhir dari log teks (termasuk file hasil rotasi)
+
+    Parameters:
+    - limit: Jumlah record maksimal
+    - log_file: Path file log utama
+    - label: Filter label prediksi (opsional)
+
+    Returns:
+    - List dictionary record, dari yang paling baru
+    """
+
+    records = []
+    if limit <= 0:
+        return records
+
+    for path in rotated_log_files(log_file):
+        for line in iter_lines_reverse(path):
+            record = parse_legacy_line(line)
+            if record is None or (label and record["prediction"] != label):
+                continue
+
+            records.append(record)
+            if len(records) >= limit:
+                return records
+
+    return records
+
+
+def iter_records(log_file: str = LOG_FILE):
+    """
+    Streaming seluruh record log teks dari yang paling lama (memory konstan)
+
+    Returns:
+    - Generator dictionary record
+    """
+
+    for path in reversed(rotated_log_files(log_file)):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                record = parse_legacy_line(line)
+                if record is not None:
+                    yield record
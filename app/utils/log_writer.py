@@ -0,0 +1,290 @@
+"""
+Prediction Log Writer
+Menulis log prediksi di background: request hanya memasukkan entry ke antrian,
+satu thread writer menulis per batch ke prediction store dan file log teks (dengan rotasi)
+"""
+
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa lock antar proses (jalankan satu worker)
+    fcntl = None
+
+from app.utils.metrics import timed
+from app.utils.prediction_store import prediction_store
+from app.utils.stats import prediction_stats
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+LOG_FILE = os.getenv("PREDICTION_LOG_FILE", "logs/prediction_logs.txt")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_FLUSH_BATCH = int(os.getenv("LOG_FLUSH_BATCH", "256"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "size").lower()  # size, daily
+LOG_ROTATE_BYTES = int(os.getenv("LOG_ROTATE_BYTES", str(50 * 1024 * 1024)))
+LOG_ROTATE_BACKUPS = int(os.getenv("LOG_ROTATE_BACKUPS", "10"))
+LOG_DROP_POLICY = os.getenv("LOG_DROP_POLICY", "drop").lower()  # drop, block
+LOG_BLOCK_TIMEOUT = float(os.getenv("LOG_BLOCK_TIMEOUT", "0.5"))
+
+# Peringatan antrian penuh dicetak paling sering sekali per interval (jumlahnya ada di counter dropped)
+_DROP_WARNING_INTERVAL = 60.0
+
+_STOP = object()
+
+
+def format_log_line(entry: dict) -> str:
+    """
+    Format satu entry ke baris log teks
+    """
+
+    timestamp = entry["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
+    return f"[{timestamp}] {entry['filename']} → prediksi: {entry['label']} ({entry['confidence']:.4f})\n"
+
+
+def rotated_log_files(log_file: str = LOG_FILE) -> list:
+    """
+    Daftar file log dari yang paling baru: prediction_logs.txt, .1, .2, ...
+    """
+
+    files = [log_file] if os.path.exists(log_file) else []
+    index = 1
+    while os.path.exists(f"{log_file}.{index}"):
+        files.append(f"{log_file}.{index}")
+        index += 1
+    return files
+
+
+class PredictionLogWriter:
+    """
+    Writer log prediksi dengan antrian terbatas
+
+    Parameters:
+    - log_file: Path file log teks
+    - store: PredictionStore tujuan (None untuk hanya menulis file teks)
+    - max_queue: Jumlah entry maksimal di antrian (batas memory)
+    - flush_batch: Tulis ketika jumlah entry mencapai nilai ini
+    - flush_interval: Tulis paling lambat setiap N detik
+    - drop_policy: "drop" (buang entry saat antrian penuh) atau "block" (tunggu sebentar)
+    - on_flush: Callback setelah batch ditulis ke store (mis. update statistik)
+    """
+
+    def __init__(
+        self,
+        log_file: str = LOG_FILE,
+        store=prediction_store,
+        max_queue: int = LOG_QUEUE_SIZE,
+        flush_batch: int = LOG_FLUSH_BATCH,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        drop_policy: str = LOG_DROP_POLICY,
+        on_flush=None
+    ):
+        self.log_file = log_file
+        self.store = store
+        self.flush_batch = max(1, flush_batch)
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.on_flush = on_flush
+
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._last_drop_warning = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, entry: dict) -> bool:
+        """
+        Masukkan entry log ke antrian (tidak memblokir request kecuali drop_policy="block")
+
+        Returns:
+        - True jika entry masuk antrian, False jika dibuang
+        """
+        self.start()
+        try:
+            if self.drop_policy == "block":
+                self._queue.put(entry, timeout=LOG_BLOCK_TIMEOUT)
+            else:
+                self._queue.put_nowait(entry)
+            return True
+
+        except queue.Full:
+            self.dropped += 1
+            now = time.monotonic()
+            if self._last_drop_warning is None or now - self._last_drop_warning >= _DROP_WARNING_INTERVAL:
+                self._last_drop_warning = now
+                print(f"⚠️  Log queue full, prediction log entries dropped (total: {self.dropped})")
+            return False
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Tulis semua entry yang tersisa lalu hentikan thread writer
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout=timeout)
+            self._thread = None
+
+    def clear_files(self) -> list:
+        """
+        Hapus file log teks beserta hasil rotasinya, di bawah lock yang sama dengan writer
+        (worker lain tidak sedang merotasi atau menulis ke file yang dihapus)
+
+        Returns:
+        - List file yang dihapus
+        """
+        with self._file_lock():
+            log_files = rotated_log_files(self.log_file)
+            for log_file in log_files:
+                os.remove(log_file)
+        return log_files
+
+    def get_stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
+
+    def _run(self):
+        while True:
+            batch = []
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+
+            # Kumpulkan entry sampai batch penuh atau interval habis
+            while len(batch) < self.flush_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(remaining, 0.001)) if batch else self._queue.get()
+                except queue.Empty:
+                    break
+
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            if stop:
+                # Kosongkan sisa antrian sebelum berhenti
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+
+            if batch:
+                self._write(batch)
+
+            if stop:
+                break
+
+    def _write(self, batch: list):
+        with timed("log_flush"):
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: list):
+        if self.store is not None:
+            try:
+                self.store.append_many(batch)
+                if self.on_flush is not None:
+                    self.on_flush()
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  Error writing to prediction store: {e}")
+
+        try:
+            data = "".join(format_log_line(entry) for entry in batch).encode("utf-8")
+
+            directory = os.path.dirname(self.log_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Cek ukuran, rotasi, dan write di bawah satu lock file: worker lain tidak bisa
+            # merotasi file yang sama bersamaan atau menulis ke file yang sudah di-rename
+            with self._file_lock():
+                self._maybe_rotate(len(data))
+
+                # Satu write per batch (mode append) agar baris tidak bercampur antar worker
+                with open(self.log_file, "ab") as f:
+                    f.write(data)
+
+            self.written += len(batch)
+
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️  Error writing to log: {e}")
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+
+        directory = os.path.dirname(self.log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.log_file + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _maybe_rotate(self, incoming_bytes: int):
+        # Dipanggil di bawah _file_lock
+        if not os.path.exists(self.log_file):
+            return
+
+        if LOG_ROTATE_WHEN == "daily":
+            # Tanggal dari mtime file (bukan state per proses) agar semua worker sepakat
+            # dan file hanya dirotasi sekali per hari
+            modified = datetime.fromtimestamp(os.path.getmtime(self.log_file)).date()
+            should_rotate = modified != datetime.now().date()
+        else:
+            should_rotate = os.path.getsize(self.log_file) + incoming_bytes > LOG_ROTATE_BYTES
+
+        if should_rotate:
+            self._rotate()
+
+    def _rotate(self):
+        # prediction_logs.txt -> .1 -> .2 ... (backup terlama dihapus)
+        oldest = f"{self.log_file}.{LOG_ROTATE_BACKUPS}"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+
+        for index in range(LOG_ROTATE_BACKUPS - 1, 0, -1):
+            source = f"{self.log_file}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.log_file}.{index + 1}")
+
+        if LOG_ROTATE_BACKUPS > 0:
+            os.replace(self.log_file, f"{self.log_file}.1")
+        else:
+            os.remove(self.log_file)
+
+
+# Writer global untuk log_prediction (statistik /api/stats diperbarui setiap flush)
+log_writer = PredictionLogWriter(on_flush=prediction_stats.refresh)
@@ -0,0 +1,272 @@
+"""
+Metrics
+Instrumentasi ringan format Prometheus (tanpa dependency tambahan):
+counter, gauge, histogram latency per stage, dan gauge yang dihitung saat scrape
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Bucket latency default (detik)
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list:
+        raise NotImplementedError
+
+
+class _ValueMetric(_Metric):
+    """
+    Metric satu nilai per kombinasi label; bisa juga dihitung saat scrape lewat callback
+    (callback mengembalikan angka atau dict {tuple nilai label: angka})
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), callback=None):
+        super().__init__(name, documentation, label_names)
+        self._values = {}
+        self._callback = callback
+
+    def _samples(self) -> list:
+        if self._callback is not None:
+            try:
+                values = self._callback()
+            except Exception:
+                values = {}
+            items = values.items() if isinstance(values, dict) else [((), values)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+            if value is not None
+        ]
+
+
+class Counter(_ValueMetric):
+    """
+    Nilai yang hanya bertambah (jumlah request, cache hit, dll)
+    """
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_ValueMetric):
+    """
+    Nilai yang bisa naik-turun (kedalaman antrian, durasi load model, dll)
+    """
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """
+    Distribusi nilai (latency, ukuran batch) dengan bucket tetap
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Context manager untuk mengukur durasi blok kode
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list:
+        with self._lock:
+            items = [(key, list(series[0]), series[1], series[2]) for key, series in self._series.items()]
+
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Kumpulan metric yang dirender bersama untuk endpoint /metrics
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: tuple = (), callback=None) -> Counter:
+        return self.register(Counter(name, documentation, label_names, callback))
+
+    def gauge(self, name: str, documentation: str, label_names: tuple = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, label_names, callback))
+
+    def histogram(self, name: str, documentation: str, label_names: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        """
+        Render semua metric dalam format teks Prometheus (text/plain; version=0.0.4)
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Metric yang dipakai di seluruh aplikasi
+STAGE_LATENCY = registry.histogram(
+    "wereng_stage_duration_seconds",
+    "Duration of each processing stage (read, hash, save, decode, resize, normalize, queue_wait, inference, log, log_flush)",
+    ("stage",)
+)
+REQUEST_LATENCY = registry.histogram(
+    "wereng_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status")
+)
+BATCH_SIZE = registry.histogram(
+    "wereng_inference_batch_size",
+    "Number of images per model forward pass",
+    buckets=BATCH_SIZE_BUCKETS
+)
+
+
+def timed(stage: str):
+    """
+    Ukur durasi satu stage pipeline
+
+    Contoh:
+        with timed("decode"):
+            img = Image.open(source)
+    """
+    return STAGE_LATENCY.time(stage=stage)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware untuk latency per route (template path, bukan URL asli,
+    agar jumlah label tetap kecil)
+    """
+
+    def __init__(self, app, histogram: Histogram = REQUEST_LATENCY):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - start,
+                method=scope.get("method", ""),
+                route=getattr(route, "path", "other"),
+                status=status["code"]
+            )
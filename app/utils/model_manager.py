@@ -0,0 +1,156 @@
+"""
+Model Lifecycle
+Mengatur loading model secara lazy / background, warm-up inference,
+dan status readiness agar import package dan /health tidak menunggu TensorFlow
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.utils.batcher import MicroBatcher
+from app.utils.helper import load_model, predict_batch, add_input_normalization, NORMALIZE_IN_MODEL, INFERENCE_BACKEND
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+MODEL_PATH = os.getenv("MODEL_PATH", "app/models/wereng_classifier.h5")
+
+# eager: load sebelum server menerima request, background: load di thread saat startup,
+# lazy: load saat request pertama
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background").lower()
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() in ("1", "true", "yes")
+
+
+class ModelManager:
+    """
+    Pemilik tunggal model yang sedang dipakai beserta antrian inferensinya
+
+    Parameters:
+    - model_path: Path ke file model
+    - base_version: Versi model dari metadata (dipakai untuk cache key)
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, base_version: str = "1.0.0"):
+        self.model_path = model_path
+        self.base_version = base_version
+
+        self.model = None
+        self.state = "not_loaded"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._thread = None
+
+        # Batcher bisa dibuat tanpa model; predict_fn menunggu model siap
+        self.batcher = MicroBatcher(self._predict_batch)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state in ("ready", "dummy")
+
+    @property
+    def model_version(self) -> str:
+        """
+        Versi model untuk cache key (varian terkuantisasi menghasilkan prediksi berbeda)
+        """
+        if self.model is None:
+            return f"{self.base_version}+dummy"
+        return f"{self.base_version}+{getattr(self.model, 'variant', 'float')}"
+
+    def load(self):
+        """
+        Load model, tambahkan normalisasi (opsional), lalu jalankan warm-up.
+        Aman dipanggil berkali-kali; hanya load sekali.
+        """
+        with self._lock:
+            if self._loaded.is_set():
+                return
+
+            self.state = "loading"
+            start = time.perf_counter()
+
+            try:
+                # Backend synthetic tidak membutuhkan file model (load test / staging)
+                if os.path.exists(self.model_path) or INFERENCE_BACKEND == "synthetic":
+                    self.model = load_model(self.model_path)
+                else:
+                    print("⚠️  Model file not found. Using dummy prediction mode.")
+
+                if self.model is not None and NORMALIZE_IN_MODEL and self.model.variant != "synthetic":
+                    try:
+                        self.model = add_input_normalization(self.model)
+                        self.batcher.normalize = False
+                    except Exception as e:
+                        print(f"⚠️  Error adding input normalization: {e}")
+
+                self.load_seconds = time.perf_counter() - start
+
+                if self.model is not None and MODEL_WARMUP:
+                    self._warm_up()
+
+                self.state = "ready" if self.model is not None else "dummy"
+
+            except Exception as e:
+                print(f"⚠️  Error loading model: {e}. Using dummy prediction mode.")
+                self.model = None
+                self.error = str(e)
+                self.state = "dummy"
+
+            finally:
+                self._loaded.set()
+
+    def start_background_load(self) -> threading.Thread:
+        """
+        Load model di thread terpisah agar server bisa langsung menerima request
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def wait_until_loaded(self, timeout: float = None) -> bool:
+        """
+        Tunggu sampai model selesai di-load (lazy load jika belum dimulai)
+        """
+        if not self._loaded.is_set() and self._thread is None:
+            self.load()
+        return self._loaded.wait(timeout)
+
+    def get_status(self) -> dict:
+        """
+        Status lifecycle model untuk endpoint readiness
+        """
+        return {
+            "state": self.state,
+            "ready": self.is_ready,
+            "model_path": self.model_path,
+            "backend": getattr(self.model, "name", None),
+            "variant": getattr(self.model, "variant", None),
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "error": self.error
+        }
+
+    def shutdown(self):
+        self.batcher.stop()
+
+    def _warm_up(self):
+        # Jalankan inferensi dummy agar graph tracing / alokasi tensor tidak dibayar request pertama
+        start = time.perf_counter()
+        dtype = np.float32 if self.batcher.normalize else np.uint8
+        for batch_size in sorted({1, self.batcher.max_batch_size}):
+            predict_batch(self.model, np.zeros((batch_size, 224, 224, 3), dtype=dtype))
+        self.warmup_seconds = time.perf_counter() - start
+        print(f"🔥 Model warm-up finished in {self.warmup_seconds:.2f}s")
+
+    def _predict_batch(self, batch: np.ndarray) -> list:
+        self.wait_until_loaded()
+        if not self.batcher.normalize and batch.dtype != np.uint8:
+            # Batch sudah dinormalisasi sebelum model selesai di-load dengan NORMALIZE_IN_MODEL
+            batch = np.round(batch * 255.0).astype(np.uint8)
+        return predict_batch(self.model, batch, dummy=self.model is None)
@@ -0,0 +1,522 @@
+"""
+Model Registry
+Memuat model dan metadata dari folder artifact berversi, mengganti model aktif
+secara atomic (hot swap) tanpa memutus request yang sedang berjalan, serta
+memilih versi per request (eksplisit atau canary)
+
+Struktur folder:
+    app/models/
+        wereng_classifier.h5        # model lama (tanpa versi), memakai DEFAULT_METADATA
+        1.1.0/
+            wereng_classifier.h5    # atau .tflite / .onnx (atau "model_file" di metadata)
+            metadata.json
+        registry.json               # {"active": "1.1.0", "canary": {"version": "1.2.0", "percent": 10}}
+
+registry.json dibaca ulang oleh setiap worker (dicek setiap MODEL_REGISTRY_POLL detik),
+sehingga perubahan dari satu worker (POST /api/model/activate) ikut diterapkan worker lain.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.helper import CLASS_LABELS
+from app.utils.model_manager import ModelManager, MODEL_PATH
+from app.utils.shm_inference import INFERENCE_MODE, ShmModelManager, get_inference_pool
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "app/models")
+MODEL_REGISTRY_FILE = os.getenv("MODEL_REGISTRY_FILE", os.path.join(MODEL_REGISTRY_DIR, "registry.json"))
+MODEL_ACTIVE_VERSION = os.getenv("MODEL_ACTIVE_VERSION", "")
+MODEL_REGISTRY_POLL = float(os.getenv("MODEL_REGISTRY_POLL", "10"))
+MODEL_RETIRE_GRACE = float(os.getenv("MODEL_RETIRE_GRACE", "30"))
+# Jumlah versi non-aktif (dipilih lewat ?version=) yang boleh tetap di memory (LRU)
+MODEL_CACHE_MAX = max(0, int(os.getenv("MODEL_CACHE_MAX", "1")))
+
+# Urutan prioritas file model di folder versi
+MODEL_FILE_EXTENSIONS = (".h5", ".keras", ".tflite", ".onnx")
+
+# Metadata untuk model lama tanpa metadata.json
+DEFAULT_METADATA = {
+    "model_name": "Wereng Classifier",
+    "model_version": "1.0.0",
+    "architecture": "MobileNetV2",
+    "input_shape": [224, 224, 3],
+    "total_classes": len(CLASS_LABELS),
+    "classes": list(CLASS_LABELS),
+    "training_accuracy": 0.95,
+    "validation_accuracy": 0.92,
+    "training_date": "2025-10-15",
+    "dataset_size": 2000,
+    "epochs": 50
+}
+
+
+class ModelNotFound(Exception):
+    """
+    Versi model tidak ada di registry (dipetakan ke HTTP 404)
+    """
+
+    def __init__(self, version: str):
+        super().__init__(f"Model version '{version}' not found")
+        self.version = version
+
+
+class ModelArtifact:
+    """
+    Satu versi model: path file model dan metadata
+    """
+
+    __slots__ = ("version", "model_path", "metadata")
+
+    def __init__(self, version: str, model_path: str, metadata: dict):
+        self.version = version
+        self.model_path = model_path
+        self.metadata = metadata
+
+    def to_dict(self) -> dict:
+        return {
+            "version": self.version,
+            "model_path": self.model_path,
+            "model_exists": os.path.exists(self.model_path)
+        }
+
+
+def version_key(version: str) -> tuple:
+    """
+    Kunci urutan versi: "1.10.0" > "1.9.2" (bagian angka dibandingkan sebagai angka)
+    """
+    return tuple(
+        (0, int(part), "") if part.isdigit() else (1, 0, part)
+        for part in re.split(r"[.\-+]", version)
+    )
+
+
+def _find_model_file(directory: str, metadata: dict) -> str:
+    if metadata.get("model_file"):
+        return os.path.join(directory, metadata["model_file"])
+
+    files = sorted(os.listdir(directory))
+    for ext in MODEL_FILE_EXTENSIONS:
+        for name in files:
+            # Lewati varian terkuantisasi (<nama>.int8.tflite), dipilih lewat MODEL_VARIANT
+            if name.endswith(ext) and name.count(".") == 1:
+                return os.path.join(directory, name)
+    return None
+
+
+def scan_artifacts(registry_dir: str = MODEL_REGISTRY_DIR, legacy_path: str = MODEL_PATH) -> dict:
+    """
+    Cari semua versi model di registry_dir
+
+    Parameters:
+    - registry_dir: Folder berisi sub-folder per versi
+    - legacy_path: File model lama tanpa versi (dipakai jika ada)
+
+    Returns:
+    - Dictionary {versi: ModelArtifact}
+    """
+
+    artifacts = {}
+    legacy = ModelArtifact(DEFAULT_METADATA["model_version"], legacy_path, dict(DEFAULT_METADATA))
+
+    if os.path.exists(legacy_path):
+        artifacts[legacy.version] = legacy
+
+    names = sorted(os.listdir(registry_dir)) if os.path.isdir(registry_dir) else []
+    for name in names:
+        directory = os.path.join(registry_dir, name)
+        if not os.path.isdir(directory) or name.startswith((".", "_")):
+            continue
+
+        metadata = dict(DEFAULT_METADATA)
+        metadata_file = os.path.join(directory, "metadata.json")
+        if os.path.exists(metadata_file):
+            try:
+                with open(metadata_file, "r", encoding="utf-8") as f:
+                    metadata.update(json.load(f))
+            except Exception as e:
+                print(f"⚠️  Error reading {metadata_file}: {e}. Skipping version {name}.")
+                continue
+
+        model_file = _find_model_file(directory, metadata)
+        if model_file is None:
+            continue
+
+        # Nama folder adalah versi (metadata.json tidak boleh mengubahnya)
+        metadata["model_version"] = name
+        artifacts[name] = ModelArtifact(name, model_file, metadata)
+
+    # Tanpa model sama sekali: tetap daftarkan model lama (ModelManager memakai dummy mode)
+    if not artifacts:
+        artifacts[legacy.version] = legacy
+
+    return artifacts
+
+
+class ModelRegistry:
+    """
+    Daftar versi model, model aktif, dan routing canary
+
+    Setiap versi yang di-load punya ModelManager (dan micro-batcher) sendiri.
+    Versi aktif dan canary selalu di memory; versi lain yang diminta lewat
+    ?version= disimpan maksimal MODEL_CACHE_MAX (LRU), sisanya di-unload.
+    Hot swap: versi baru di-load dan di-warm-up dulu, lalu referensi routing
+    diganti dalam satu assignment. Request yang sudah memegang ModelManager lama
+    tetap selesai; versi lama dihentikan setelah MODEL_RETIRE_GRACE detik.
+
+    Parameters:
+    - registry_dir: Folder artifact model
+    - registry_file: File JSON berisi versi aktif dan canary
+    - legacy_path: File model lama tanpa versi
+    """
+
+    def __init__(self, registry_dir: str = MODEL_REGISTRY_DIR, registry_file: str = MODEL_REGISTRY_FILE,
+                 legacy_path: str = MODEL_PATH):
+        self.registry_dir = registry_dir
+        self.registry_file = registry_file
+        self.legacy_path = legacy_path
+
+        self.artifacts = {}
+        self._managers = {}
+        # Versi non-routing yang di-load on demand, urut dari yang paling lama tidak dipakai
+        self._recent = OrderedDict()
+        # Versi yang sudah dijadwalkan untuk di-unload (satu timer per versi)
+        self._retiring = set()
+        # (versi aktif, versi canary, persen canary) diganti sebagai satu tuple (atomic)
+        self._routing = (None, None, 0.0)
+
+        # _lock: hanya untuk mengubah _managers / _routing (singkat, dipakai di jalur request)
+        # _apply_lock: serialisasi reload / activate, boleh ditahan selama load + warm-up
+        self._lock = threading.RLock()
+        self._apply_lock = threading.RLock()
+        self._registry_mtime = None
+        self._last_poll = 0.0
+        self._refreshing = False
+        self._load_mode = "lazy"
+
+    @property
+    def active_version(self) -> str:
+        return self._routing[0]
+
+    def resolve(self, version: str = None) -> ModelManager:
+        """
+        Pilih ModelManager untuk satu request
+
+        Parameters:
+        - version: Versi eksplisit (None: versi aktif, atau canary sesuai persentase)
+
+        Returns:
+        - ModelManager versi terpilih
+
+        Raises:
+        - ModelNotFound jika versi tidak ada
+        """
+        self._maybe_refresh()
+
+        if version:
+            return self._manager(version)
+
+        active, canary, percent = self._routing
+        if canary and percent > 0 and random.random() * 100.0 < percent:
+            return self._manager(canary)
+        return self._manager(active)
+
+    def _manager(self, version: str) -> ModelManager:
+        manager = self._managers.get(version)
+        if manager is not None and version in self._routing[:2]:
+            return manager
+
+        with self._lock:
+            manager = self._managers.get(version)
+            if manager is None:
+                artifact = self.artifacts.get(version)
+                if artifact is None:
+                    raise ModelNotFound(version)
+                # Versi non-aktif di-load saat request pertama (lazy)
+                manager = self._create_manager(artifact)
+                self._managers[version] = manager
+            if version not in self._routing[:2]:
+                self._recent[version] = True
+                self._recent.move_to_end(version)
+                self._evict_recent()
+            return manager
+
+    def _evict_recent(self):
+        # Dipanggil dengan _lock: unload versi on-demand yang paling lama tidak dipakai
+        while len(self._recent) > MODEL_CACHE_MAX:
+            version, _ = self._recent.popitem(last=False)
+            self._retire(version)
+
+    def _create_manager(self, artifact: ModelArtifact) -> ModelManager:
+        if INFERENCE_MODE == "shm":
+            # Versi yang dilayani pool shared memory tidak di-load di worker ini
+            pool = get_inference_pool(artifact.version, artifact.model_path)
+            if pool is not None:
+                return ShmModelManager(pool)
+            print(f"⚠️  Model version '{artifact.version}' is not served by the inference pool. Loading in-process.")
+        return ModelManager(artifact.model_path, base_version=artifact.version)
+
+    def configured_artifact(self) -> ModelArtifact:
+        """
+        Artifact versi aktif menurut registry.json / MODEL_ACTIVE_VERSION, tanpa load model
+        """
+        with self._apply_lock:
+            self.artifacts = scan_artifacts(self.registry_dir, self.legacy_path)
+            version = self._read_config().get("active") or MODEL_ACTIVE_VERSION
+            return self.artifacts.get(version) or self.artifacts[self._latest_version()]
+
+    def start(self, load_mode: str = "background"):
+        """
+        Scan artifact, baca registry.json, lalu load versi aktif (dan canary)
+
+        Parameters:
+        - load_mode: eager (tunggu sampai siap), background, atau lazy
+        """
+        self._load_mode = load_mode
+        self.reload()
+
+    def reload(self, wait: bool = None) -> dict:
+        """
+        Scan ulang folder artifact dan terapkan registry.json
+
+        Parameters:
+        - wait: True untuk load + warm-up versi baru sebelum routing diganti
+          (default: sesuai load_mode saat start)
+
+        Returns:
+        - Status registry
+        """
+        with self._apply_lock:
+            self.artifacts = scan_artifacts(self.registry_dir, self.legacy_path)
+            config = self._read_config()
+            self._apply(
+                config.get("active") or MODEL_ACTIVE_VERSION or self._latest_version(),
+                (config.get("canary") or {}).get("version"),
+                (config.get("canary") or {}).get("percent", 0),
+                wait=wait
+            )
+        return self.get_status()
+
+    def activate(self, version: str, canary_version: str = None, canary_percent: float = 0.0) -> dict:
+        """
+        Ganti versi aktif (dan canary), simpan ke registry.json agar worker lain ikut
+
+        Returns:
+        - Status registry
+
+        Raises:
+        - ModelNotFound / ValueError jika parameter tidak valid
+        - RuntimeError jika versi baru gagal di-load (versi lama tetap aktif)
+        """
+        with self._apply_lock:
+            self.artifacts = scan_artifacts(self.registry_dir, self.legacy_path)
+            for candidate in (version, canary_version):
+                if candidate and candidate not in self.artifacts:
+                    raise ModelNotFound(candidate)
+            if not 0.0 <= canary_percent <= 100.0:
+                raise ValueError("canary_percent must be between 0 and 100")
+
+            self._apply(version, canary_version, canary_percent, wait=True)
+            if self._routing[:2] != (version, canary_version):
+                raise RuntimeError(
+                    f"Model failed to load. Active: {self._routing[0]}, canary: {self._routing[1]}"
+                )
+            self._write_config(version, canary_version, canary_percent)
+        return self.get_status()
+
+    def wait_until_loaded(self, timeout: float = None) -> bool:
+        """
+        Tunggu sampai versi aktif selesai di-load
+        """
+        active = self.active_version
+        if active is None:
+            return True
+        return self._manager(active).wait_until_loaded(timeout)
+
+    def shutdown(self):
+        with self._lock:
+            managers = list(self._managers.values())
+            self._managers = {}
+            self._recent.clear()
+        for manager in managers:
+            manager.shutdown()
+
+    def managers(self) -> dict:
+        """
+        ModelManager yang sedang ada di memory, per versi
+        """
+        return dict(self._managers)
+
+    def get_status(self) -> dict:
+        active, canary, percent = self._routing
+        managers = self.managers()
+        active_manager = managers.get(active)
+
+        return {
+            "active_version": active,
+            "canary_version": canary,
+            "canary_percent": percent,
+            "ready": active_manager.is_ready if active_manager is not None else active is None,
+            "versions": sorted(self.artifacts, key=version_key),
+            "loaded": {version: manager.get_status() for version, manager in managers.items()}
+        }
+
+    def get_metadata(self, version: str = None) -> dict:
+        """
+        Metadata versi tertentu (default: versi aktif)
+
+        Raises:
+        - ModelNotFound jika versi tidak ada
+        """
+        version = version or self.active_version
+        artifact = self.artifacts.get(version)
+        if artifact is None:
+            if version is None:
+                return dict(DEFAULT_METADATA)
+            raise ModelNotFound(version)
+        return artifact.metadata
+
+    def _latest_version(self) -> str:
+        versions = [v for v in self.artifacts if v != DEFAULT_METADATA["model_version"]] or list(self.artifacts)
+        return max(versions, key=version_key) if versions else None
+
+    def _apply(self, active: str, canary: str, canary_percent: float, wait: bool = None):
+        # Dipanggil dengan _apply_lock. Load + warm-up berjalan tanpa _lock, sehingga
+        # resolve() dari request tetap dilayani versi lama selama hot swap / load canary;
+        # _lock hanya dipegang saat routing diganti.
+        if active is not None and active not in self.artifacts:
+            print(f"⚠️  Model version '{active}' not found. Keeping {self.active_version}.")
+            active = self.active_version
+        if canary is not None and canary not in self.artifacts:
+            print(f"⚠️  Canary version '{canary}' not found. Canary disabled.")
+            canary = None
+
+        previous = self._routing
+        wait = self._load_mode == "eager" if wait is None else wait
+        for version in (active, canary):
+            if version is None:
+                continue
+            manager = self._manager(version)
+            if wait:
+                manager.load()
+            elif self._load_mode == "background":
+                manager.start_background_load()
+
+        # Jangan pindah ke versi yang gagal di-load (file ada tapi model tidak bisa dibuka)
+        if wait and active != previous[0] and previous[0] is not None and self._failed(active):
+            print(f"⚠️  Model version '{active}' failed to load. Keeping {previous[0]}.")
+            active = previous[0]
+        if wait and canary is not None and self._failed(canary):
+            print(f"⚠️  Canary version '{canary}' failed to load. Canary disabled.")
+            canary = None
+        with self._lock:
+            self._routing = (active, canary, float(canary_percent or 0.0) if canary else 0.0)
+            for version in (active, canary):
+                self._recent.pop(version, None)
+
+        if previous[:2] != self._routing[:2]:
+            print(f"✅ Active model: {active}" + (f" (canary {canary} {self._routing[2]}%)" if canary else ""))
+
+        for version in set(previous[:2]) - set(self._routing[:2]) - {None}:
+            self._retire(version)
+
+    def _failed(self, version: str) -> bool:
+        manager = self._managers.get(version)
+        failed = (
+            manager is not None
+            and manager.state == "dummy"
+            and os.path.exists(self.artifacts[version].model_path)
+        )
+        if failed:
+            with self._lock:
+                if version not in self._routing[:2]:
+                    # Buang agar aktivasi berikutnya mencoba load ulang
+                    self._managers.pop(version, None)
+                    self._recent.pop(version, None)
+        return failed
+
+    def _retire(self, version: str):
+        # Beri waktu request yang masih memakai versi lama untuk selesai
+        with self._lock:
+            if version in self._retiring:
+                return
+            self._retiring.add(version)
+
+        def _stop():
+            with self._lock:
+                self._retiring.discard(version)
+                if version in self._routing[:2] or version in self._recent:
+                    return
+                manager = self._managers.pop(version, None)
+            if manager is not None:
+                manager.shutdown()
+                print(f"🧹 Model version {version} unloaded")
+
+        timer = threading.Timer(MODEL_RETIRE_GRACE, _stop)
+        timer.daemon = True
+        timer.start()
+
+    def _read_config(self) -> dict:
+        if not os.path.exists(self.registry_file):
+            self._registry_mtime = None
+            return {}
+
+        try:
+            self._registry_mtime = os.path.getmtime(self.registry_file)
+            with open(self.registry_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️  Error reading {self.registry_file}: {e}")
+            return {}
+
+    def _write_config(self, active: str, canary: str, canary_percent: float):
+        config = {"active": active}
+        if canary:
+            config["canary"] = {"version": canary, "percent": canary_percent}
+
+        directory = os.path.dirname(self.registry_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Tulis ke file sementara lalu replace (atomic)
+        tmp_file = f"{self.registry_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2)
+        os.replace(tmp_file, self.registry_file)
+        self._registry_mtime = os.path.getmtime(self.registry_file)
+
+    def _maybe_refresh(self):
+        # Cek perubahan registry.json dari worker lain (tanpa memblokir request)
+        now = time.monotonic()
+        if MODEL_REGISTRY_POLL <= 0 or now - self._last_poll < MODEL_REGISTRY_POLL or self._refreshing:
+            return
+        self._last_poll = now
+
+        try:
+            mtime = os.path.getmtime(self.registry_file) if os.path.exists(self.registry_file) else None
+        except OSError:
+            return
+        if mtime == self._registry_mtime:
+            return
+
+        def _refresh():
+            try:
+                # Versi baru di-load dan di-warm-up sebelum routing diganti
+                self.reload(wait=True)
+            except Exception as e:
+                print(f"⚠️  Error reloading model registry: {e}")
+            finally:
+                self._refreshing = False
+
+        self._refreshing = True
+        threading.Thread(target=_refresh, name="model-registry-refresh", daemon=True).start()
+
+
+# Registry global untuk route klasifikasi dan info model
+model_registry = ModelRegistry()
@@ -0,0 +1,294 @@
+"""
+Prediction Store
+Penyimpanan riwayat prediksi terstruktur (SQLite WAL, append-only) dengan index,
+sehingga /api/history membaca O(limit) baris dan mendukung filter + pagination cursor
+
+Import log teks lama:
+    python -m app.utils.prediction_store --import-legacy logs/prediction_logs.txt
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+PREDICTION_DB = os.getenv("PREDICTION_DB", "logs/predictions.sqlite")
+
+# Format log teks: [2025-10-20 21:30:15] file.jpg → prediksi: Label (Nama) (0.9400)
+_LEGACY_LINE = re.compile(
+    r"^\[(?P<timestamp>[^\]]+)\]\s+(?P<filename>.*?)\s+→\s+prediksi:\s+(?P<label>.*)\s+\((?P<confidence>[0-9.]+)\)\s*$"
+)
+
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_legacy_line(line: str):
+    """
+    Parse satu baris log teks lama (label boleh mengandung tanda kurung)
+
+    Returns:
+    - Dictionary record atau None jika baris tidak valid
+    """
+
+    match = _LEGACY_LINE.match(line.strip())
+    if not match:
+        return None
+
+    return {
+        "timestamp": match.group("timestamp").strip(),
+        "filename": match.group("filename").strip(),
+        "prediction": match.group("label").strip(),
+        "confidence": float(match.group("confidence"))
+    }
+
+
+def _row_to_record(row: sqlite3.Row) -> dict:
+    return {
+        "id": row["id"],
+        "timestamp": row["timestamp"],
+        "filename": row["filename"],
+        "prediction": row["label"],
+        "confidence": row["confidence"],
+        "class_id": row["class_id"]
+    }
+
+
+class PredictionStore:
+    """
+    Riwayat prediksi di SQLite (mode WAL, aman dipakai beberapa worker)
+
+    Parameters:
+    - db_path: Path file database SQLite
+    """
+
+    def __init__(self, db_path: str = PREDICTION_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Satu koneksi SQLite per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "ts REAL NOT NULL, "
+                "timestamp TEXT NOT NULL, "
+                "filename TEXT NOT NULL, "
+                "label TEXT NOT NULL, "
+                "confidence REAL NOT NULL, "
+                "class_id INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_label ON predictions (label, id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def append(self, filename: str, label: str, confidence: float,
+               class_id: int = None, timestamp: datetime = None) -> int:
+        """
+        Tambahkan satu record prediksi
+
+        Returns:
+        - ID record (dipakai sebagai pagination cursor)
+        """
+        return self.append_many([{
+            "filename": filename,
+            "label": label,
+            "confidence": confidence,
+            "class_id": class_id,
+            "timestamp": timestamp
+        }])
+
+    def append_many(self, entries: list) -> int:
+        """
+        Tambahkan banyak record dalam satu transaksi
+
+        Parameters:
+        - entries: List dictionary dengan key filename, label, confidence, class_id, timestamp (opsional)
+
+        Returns:
+        - ID record terakhir
+        """
+        rows = []
+        for entry in entries:
+            timestamp = entry.get("timestamp") or datetime.now()
+            rows.append((
+                timestamp.timestamp(),
+                timestamp.strftime(_TIMESTAMP_FORMAT),
+                entry["filename"],
+                entry["label"],
+                float(entry["confidence"]),
+                entry.get("class_id")
+            ))
+
+        conn = self._connection()
+        with conn:
+            cursor = conn.executemany(
+                "INSERT INTO predictions (ts, timestamp, filename, label, confidence, class_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return cursor.lastrowid
+
+    def query(self, limit: int = 50, cursor: int = None, label: str = None,
+              since: datetime = None, until: datetime = None) -> list:
+        """
+        Ambil record terbaru (urut dari yang paling baru)
+
+        Parameters:
+        - limit: Jumlah record maksimal
+        - cursor: Hanya record dengan id < cursor (halaman berikutnya)
+        - label: Filter label prediksi
+        - since / until: Filter rentang waktu
+
+        Returns:
+        - List dictionary record
+        """
+        clauses, params = [], []
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(cursor)
+        if label:
+            clauses.append("label = ?")
+            params.append(label)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since.timestamp())
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until.timestamp())
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(max(0, limit))
+
+        rows = self._connection().execute(
+            f"SELECT id, timestamp, filename, label, confidence, class_id FROM predictions "
+            f"{where} ORDER BY id DESC LIMIT ?",
+            params
+        ).fetchall()
+
+        return [_row_to_record(row) for row in rows]
+
+    def iter_records(self, page_size: int = 1000):
+        """
+        Streaming seluruh record dari yang paling lama, per halaman (keyset pagination)
+
+        Returns:
+        - Generator dictionary record
+        """
+        last_id = 0
+        while True:
+            rows = self._connection().execute(
+                "SELECT id, timestamp, filename, label, confidence, class_id FROM predictions "
+                "WHERE id > ? ORDER BY id ASC LIMIT ?",
+                (last_id, page_size)
+            ).fetchall()
+
+            if not rows:
+                return
+
+            for row in rows:
+                yield _row_to_record(row)
+            last_id = rows[-1]["id"]
+
+    def fetch_after(self, last_id: int, limit: int = 5000) -> list:
+        """
+        Ambil record dengan id > last_id (urut naik), untuk agregasi inkremental
+
+        Returns:
+        - List tuple (id, ts, label, confidence)
+        """
+        return self._connection().execute(
+            "SELECT id, ts, label, confidence FROM predictions WHERE id > ? ORDER BY id ASC LIMIT ?",
+            (last_id, limit)
+        ).fetchall()
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def max_id(self) -> int:
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM predictions").fetchone()[0]
+
+    def generation(self) -> int:
+        """
+        Nomor reset riwayat: naik setiap clear(), dipakai worker lain untuk membuang agregat lama
+        """
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row is not None else 0
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM predictions")
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+
+    def import_legacy_log(self, log_file: str, batch_size: int = 5000) -> int:
+        """
+        Import log teks lama (prediction_logs.txt) ke store
+
+        Returns:
+        - Jumlah record yang di-import
+        """
+        imported = 0
+        batch = []
+
+        with open(log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                record = parse_legacy_line(line)
+                if record is None:
+                    continue
+
+                batch.append({
+                    "filename": record["filename"],
+                    "label": record["prediction"],
+                    "confidence": record["confidence"],
+                    "timestamp": datetime.strptime(record["timestamp"], _TIMESTAMP_FORMAT)
+                })
+                if len(batch) >= batch_size:
+                    self.append_many(batch)
+                    imported += len(batch)
+                    batch = []
+
+        if batch:
+            self.append_many(batch)
+            imported += len(batch)
+
+        return imported
+
+
+# Store global untuk log_prediction dan /api/history
+prediction_store = PredictionStore()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kelola prediction store")
+    parser.add_argument("--import-legacy", metavar="LOG_FILE", help="Import log teks lama")
+    parser.add_argument("--db", default=PREDICTION_DB)
+    args = parser.parse_args()
+
+    store = PredictionStore(args.db)
+    if args.import_legacy:
+        imported = store.import_legacy_log(args.import_legacy)
+        print(f"✅ Imported {imported} records into {args.db}")
+    print(f"📊 Total records: {store.count()}")
+
+
+if __name__ == "__main__":
+    main()
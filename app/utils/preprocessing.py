@@ -6,6 +6,98 @@ Modul untuk preprocessing gambar sebelum prediksi
 import numpy as np
 from PIL import Image
 import io
+import os
+import threading
+
+from app.utils.metrics import timed
+
+
+# Filter resampling yang bisa dipilih lewat PREPROCESS_RESAMPLE
+RESAMPLE_FILTERS = {
+    "nearest": Image.NEAREST,
+    "box": Image.BOX,
+    "bilinear": Image.BILINEAR,
+    "bicubic": Image.BICUBIC,
+    "lanczos": Image.LANCZOS
+}
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+# Draft mode dan reducing_gap mati secara default agar output sama dengan decode penuh + LANCZOS;
+# aktifkan setelah top-1 agreement diukur dengan benchmarks.preprocess_accuracy
+PREPROCESS_RESAMPLE = os.getenv("PREPROCESS_RESAMPLE", "lanczos").lower()
+PREPROCESS_USE_DRAFT = os.getenv("PREPROCESS_USE_DRAFT", "false").lower() in ("1", "true", "yes")
+PREPROCESS_REDUCING_GAP = float(os.getenv("PREPROCESS_REDUCING_GAP", "0"))
+
+
+def get_resample_filter(name: str = None) -> int:
+    """
+    Mendapatkan konstanta filter resampling PIL dari nama
+    
+    Parameters:
+    - name: Nama filter (nearest, box, bilinear, bicubic, lanczos). Default: PREPROCESS_RESAMPLE
+    
+    Returns:
+    - Konstanta filter PIL
+    """
+    
+    name = (name or PREPROCESS_RESAMPLE).lower()
+    if name not in RESAMPLE_FILTERS:
+        raise ValueError(
+            f"Unknown resample filter '{name}'. Allowed: {', '.join(RESAMPLE_FILTERS)}"
+        )
+    return RESAMPLE_FILTERS[name]
+
+
+def load_image(
+    source,
+    target_size: tuple = (224, 224),
+    resample: str = None,
+    use_draft: bool = None,
+    reducing_gap: float = None
+) -> Image.Image:
+    """
+    Decode dan resize gambar ke target_size dengan jalur cepat
+    
+    Untuk JPEG, decoder diminta langsung menghasilkan gambar yang lebih kecil
+    (reduksi di domain DCT: 1/2, 1/4, 1/8) selama ukurannya masih >= target_size,
+    sehingga foto kamera 12 MP tidak perlu di-decode penuh.
+    
+    Parameters:
+    - source: Path file atau file-like object
+    - target_size: Ukuran target gambar
+    - resample: Nama filter resampling (default: PREPROCESS_RESAMPLE)
+    - use_draft: Gunakan JPEG draft mode (default: PREPROCESS_USE_DRAFT)
+    - reducing_gap: Optimasi resize bertahap PIL, 0 untuk menonaktifkan (default: PREPROCESS_REDUCING_GAP)
+    
+    Returns:
+    - PIL Image RGB dengan ukuran target_size
+    """
+    
+    if use_draft is None:
+        use_draft = PREPROCESS_USE_DRAFT
+    if reducing_gap is None:
+        reducing_gap = PREPROCESS_REDUCING_GAP
+    
+    with timed("decode"):
+        img = Image.open(source)
+        
+        # JPEG draft mode: downscale saat decode
+        if use_draft and img.format == "JPEG":
+            img.draft("RGB", target_size)
+        
+        # Convert to RGB jika grayscale atau RGBA
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        else:
+            # Decode sekarang agar durasi decode tidak terhitung sebagai resize
+            img.load()
+    
+    # Resize image
+    if img.size != tuple(target_size):
+        with timed("resize"):
+            img = img.resize(target_size, get_resample_filter(resample), reducing_gap=reducing_gap or None)
+    
+    return img
 
 
 def preprocess_image(image_path: str, target_size: tuple = (224, 224)) -> np.ndarray:
@@ -21,15 +113,8 @@ def preprocess_image(image_path: str, target_size: tuple = (224, 224)) -> np.nda
     """
     
     try:
-        # Load image
-        img = Image.open(image_path)
-        
-        # Convert to RGB jika grayscale atau RGBA
-        if img.mode != "RGB":
-            img = img.convert("RGB")
-        
-        # Resize image
-        img = img.resize(target_size, Image.LANCZOS)
+        # Load dan resize image
+        img = load_image(image_path, target_size)
         
         # Convert to numpy array
         img_array = np.array(img)
@@ -59,15 +144,8 @@ def preprocess_image_from_bytes(image_bytes: bytes, target_size: tuple = (224, 2
     """
     
     try:
-        # Load image from bytes
-        img = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGB
-        if img.mode != "RGB":
-            img = img.convert("RGB")
-        
-        # Resize image
-        img = img.resize(target_size, Image.LANCZOS)
+        # Load dan resize image dari bytes
+        img = load_image(io.BytesIO(image_bytes), target_size)
         
         # Convert to numpy array
         img_array = np.array(img)
@@ -84,20 +162,159 @@ def preprocess_image_from_bytes(image_bytes: bytes, target_size: tuple = (224, 2
         raise Exception(f"Error preprocessing image from bytes: {str(e)}")
 
 
+def load_image_array(source, target_size: tuple = (224, 224)) -> np.ndarray:
+    """
+    Decode gambar menjadi array uint8 (H, W, 3) tanpa normalisasi
+    
+    Parameters:
+    - source: Path file, file-like object, atau bytes
+    - target_size: Ukuran target gambar
+    
+    Returns:
+    - Numpy array uint8 dengan shape (H, W, 3)
+    """
+    
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    
+    return np.asarray(load_image(source, target_size), dtype=np.uint8)
+
+
+class BatchBuffer:
+    """
+    Buffer (N, H, W, 3) yang dialokasikan sekali dan dipakai ulang antar batch
+    
+    Gambar uint8 ditulis langsung ke buffer, lalu dinormalisasi ke float32
+    dalam satu operasi vektor (in-place ke buffer float yang juga dipakai ulang).
+    Buffer tidak thread-safe: gunakan satu buffer per thread (lihat get_batch_buffer).
+    
+    Parameters:
+    - capacity: Jumlah gambar awal yang bisa ditampung (buffer tumbuh otomatis)
+    - target_size: Ukuran gambar (width, height)
+    """
+    
+    def __init__(self, capacity: int = 16, target_size: tuple = (224, 224)):
+        self.target_size = tuple(target_size)
+        self.capacity = 0
+        self.uint8 = None
+        self.float32 = None
+        self.ensure_capacity(capacity)
+    
+    def ensure_capacity(self, capacity: int):
+        """
+        Perbesar buffer jika capacity lebih besar dari ukuran sekarang
+        """
+        if capacity <= self.capacity:
+            return
+        
+        width, height = self.target_size
+        self.capacity = capacity
+        self.uint8 = np.empty((capacity, height, width, 3), dtype=np.uint8)
+        self.float32 = np.empty((capacity, height, width, 3), dtype=np.float32)
+    
+    def fill(self, images: list, normalize: bool = True) -> np.ndarray:
+        """
+        Salin gambar uint8 ke buffer dan (opsional) normalisasi ke [0, 1]
+        
+        Parameters:
+        - images: List array uint8 dengan shape (H, W, 3)
+        - normalize: Jika False, kembalikan view uint8 (normalisasi dilakukan di model)
+        
+        Returns:
+        - View buffer dengan shape (N, H, W, 3), valid sampai fill berikutnya
+        """
+        n = len(images)
+        self.ensure_capacity(n)
+        
+        for i, image in enumerate(images):
+            self.uint8[i] = image
+        
+        return self.normalize(n) if normalize else self.uint8[:n]
+    
+    def normalize(self, n: int) -> np.ndarray:
+        """
+        Normalisasi n gambar pertama ke float32 [0, 1] dalam satu operasi vektor
+        """
+        out = self.float32[:n]
+        with timed("normalize"):
+            np.divide(self.uint8[:n], np.float32(255.0), out=out, casting="unsafe")
+        return out
+
+
+_thread_buffers = threading.local()
+
+
+def get_batch_buffer(capacity: int, target_size: tuple = (224, 224)) -> BatchBuffer:
+    """
+    Mendapatkan BatchBuffer milik thread saat ini (dibuat sekali per thread)
+    """
+    
+    buffers = getattr(_thread_buffers, "buffers", None)
+    if buffers is None:
+        buffers = _thread_buffers.buffers = {}
+    
+    key = tuple(target_size)
+    buffer = buffers.get(key)
+    if buffer is None:
+        buffer = buffers[key] = BatchBuffer(capacity, key)
+    else:
+        buffer.ensure_capacity(capacity)
+    
+    return buffer
+
+
+def preprocess_batch(
+    sources: list,
+    target_size: tuple = (224, 224),
+    buffer: BatchBuffer = None,
+    normalize: bool = True
+) -> np.ndarray:
+    """
+    Preprocess banyak gambar sekaligus ke satu tensor (N, H, W, 3)
+    
+    Setiap gambar di-decode langsung ke slot buffer uint8 yang sudah dialokasikan,
+    lalu seluruh batch dinormalisasi sekali jalan.
+    
+    Parameters:
+    - sources: List path file, file-like object, atau bytes
+    - target_size: Ukuran target gambar
+    - buffer: BatchBuffer yang dipakai ulang (default: buffer milik thread saat ini)
+    - normalize: Jika False, kembalikan tensor uint8
+    
+    Returns:
+    - View buffer dengan shape (N, H, W, 3), valid sampai batch berikutnya di buffer yang sama
+    """
+    
+    n = len(sources)
+    if buffer is None:
+        buffer = get_batch_buffer(n, target_size)
+    buffer.ensure_capacity(n)
+    
+    try:
+        for i, source in enumerate(sources):
+            buffer.uint8[i] = load_image_array(source, target_size)
+        
+        return buffer.normalize(n) if normalize else buffer.uint8[:n]
+    
+    except Exception as e:
+        raise Exception(f"Error preprocessing batch: {str(e)}")
+
+
 def augment_image(img_array: np.ndarray, augmentation_type: str = "none") -> np.ndarray:
     """
     Augmentasi gambar untuk meningkatkan robustness
     
     Parameters:
-    - img_array: Numpy array gambar
+    - img_array: Numpy array gambar (H, W, 3) atau (1, H, W, 3), uint8 atau float [0, 1]
     - augmentation_type: Tipe augmentasi (flip, rotate, brightness, none)
     
     Returns:
-    - Augmented image array
+    - Augmented image array (shape dan dtype sama dengan input)
     """
     
     # Remove batch dimension temporarily
-    img = img_array[0]
+    batched = img_array.ndim == 4
+    img = img_array[0] if batched else img_array
     
     if augmentation_type == "flip":
         img = np.fliplr(img)
@@ -105,10 +322,32 @@ def augment_image(img_array: np.ndarray, augmentation_type: str = "none") -> np.
         img = np.rot90(img)
     elif augmentation_type == "brightness":
         # Increase brightness slightly
-        img = np.clip(img * 1.2, 0, 1)
+        if img.dtype == np.uint8:
+            img = np.clip(img.astype(np.float32) * 1.2, 0, 255).astype(np.uint8)
+        else:
+            img = np.clip(img * 1.2, 0, 1)
     
     # Add batch dimension back
-    return np.expand_dims(img, axis=0)
+    return np.expand_dims(img, axis=0) if batched else img
+
+
+def augment_batch(img_array: np.ndarray, augmentations: tuple) -> np.ndarray:
+    """
+    Bangun semua varian augmentasi satu gambar sebagai satu tensor batch
+    (diprediksi dalam satu forward pass, bukan satu predict per varian)
+    
+    Parameters:
+    - img_array: Array gambar dengan shape (H, W, 3)
+    - augmentations: Tipe augmentasi per varian (lihat augment_image)
+    
+    Returns:
+    - Array dengan shape (len(augmentations), H, W, 3)
+    """
+    
+    batch = np.empty((len(augmentations),) + img_array.shape, dtype=img_array.dtype)
+    for i, augmentation_type in enumerate(augmentations):
+        batch[i] = augment_image(img_array, augmentation_type)
+    return batch
 
 
 def validate_image(image_path: str) -> dict:
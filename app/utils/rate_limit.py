@@ -0,0 +1,358 @@
+"""
+Rate Limiting
+Admission control untuk endpoint inferensi: token bucket per client (API key atau IP)
+dan batas jumlah gambar yang sedang diinferensi bersamaan di semua worker
+
+State disimpan di SQLite (mode WAL) sehingga dibagi oleh semua worker Uvicorn/Gunicorn
+di satu mesin. Request yang melewati batas ditolak sebelum body dibaca:
+429 (client terlalu sering) atau 503 (kapasitas inferensi penuh), keduanya dengan Retry-After.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from app.utils.batcher import BATCH_MAX_QUEUE, BATCH_MAX_SIZE
+from app.utils.shm_inference import INFERENCE_MODE, SHM_SLOTS
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "logs/rate_limit.sqlite")
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "10"))  # token per detik per client, 0 = nonaktif
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+RATE_LIMIT_PATHS = tuple(
+    path.strip() for path in os.getenv("RATE_LIMIT_PATHS", "/api/classify").split(",") if path.strip()
+)
+RATE_LIMIT_KEY_HEADER = os.getenv("RATE_LIMIT_KEY_HEADER", "x-api-key").lower()
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() in ("1", "true", "yes")
+
+# Batas gambar yang sedang diinferensi bersamaan di semua worker (0 = dari kapasitas inferensi, -1 = nonaktif)
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "0"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# Bobot request batch: predict_many mengirim paling banyak BATCH_MAX_SIZE gambar sekaligus
+ADMISSION_BATCH_WEIGHT = int(os.getenv("ADMISSION_BATCH_WEIGHT", str(BATCH_MAX_SIZE)))
+
+
+def inference_capacity() -> int:
+    """
+    Jumlah gambar yang bisa ditampung inferensi sekaligus di semua worker
+
+    Mode shm: jumlah slot shared memory (dipakai bersama semua worker).
+    Mode local: antrian batcher per worker x jumlah worker.
+    """
+
+    if INFERENCE_MODE == "shm":
+        return SHM_SLOTS
+    return BATCH_MAX_QUEUE * max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AdmissionStore:
+    """
+    Token bucket per client dan hitungan gambar in-flight per proses di SQLite
+
+    Satu transaksi (BEGIN IMMEDIATE) per request: cek dan kurangi token client,
+    lalu reservasi kapasitas sebesar bobot request (jumlah gambar yang dikirim ke
+    inferensi sekaligus). Token tidak dipakai jika request ditolak karena kapasitas penuh.
+
+    Parameters:
+    - db_path: Path file database SQLite
+    - rate: Token per detik per client (0 = tanpa token bucket)
+    - burst: Kapasitas bucket (jumlah request beruntun yang diizinkan)
+    - max_inflight: Batas gambar in-flight di semua worker (0 = inference_capacity(), < 0 = tanpa batas)
+    """
+
+    def __init__(
+        self,
+        db_path: str = RATE_LIMIT_DB,
+        rate: float = RATE_LIMIT_RPS,
+        burst: float = RATE_LIMIT_BURST,
+        max_inflight: int = ADMISSION_MAX_INFLIGHT
+    ):
+        self.db_path = db_path
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_inflight = inference_capacity() if max_inflight == 0 else max_inflight
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._last_prune = time.time()
+        self._store_failing = False
+        self._reset_pid = None
+        self.stats = {"admitted": 0, "rate_limited": 0, "capacity": 0, "errors": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        # Satu koneksi SQLite per thread (dan per proses: koneksi tidak boleh dipakai setelah fork);
+        # timeout pendek agar request tidak tertahan lama
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "client TEXT PRIMARY KEY, "
+                "tokens REAL NOT NULL, "
+                "updated REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS inflight ("
+                "pid INTEGER PRIMARY KEY, "
+                "count INTEGER NOT NULL)"
+            )
+            with self._stats_lock:
+                if self._reset_pid != os.getpid():
+                    # pid bisa dipakai ulang (mis. pid 1 di container setelah restart):
+                    # hitungan proses sebelumnya dengan pid yang sama dibuang sebelum request pertama
+                    conn.execute("DELETE FROM inflight WHERE pid = ?", (os.getpid(),))
+                    self._reset_pid = os.getpid()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _store_error(self, action: str, error: Exception):
+        # Dihitung di metrics; peringatan hanya sekali per gangguan (bukan per request)
+        self._count("errors")
+        if not self._store_failing:
+            self._store_failing = True
+            print(f"⚠️  Rate limit store unavailable ({action}): {error}. Admitting requests until it recovers.")
+
+    def acquire(self, client: str, weight: int = 1) -> tuple:
+        """
+        Coba terima satu request dari client
+
+        Parameters:
+        - client: Identitas client (lihat client_key)
+        - weight: Jumlah gambar yang direservasi (panggil release dengan bobot yang sama)
+
+        Returns:
+        - Tuple (status, retry_after, reserved): status 200 jika diterima, 429 jika token client
+          habis, 503 jika kapasitas inferensi penuh; reserved = bobot yang harus dikembalikan
+          lewat release setelah request selesai (0 jika tidak ada reservasi)
+        """
+
+        now = time.time()
+        if self.max_inflight > 0:
+            # Request yang lebih besar dari kapasitas tetap bisa masuk saat pool kosong
+            weight = max(1, min(weight, self.max_inflight))
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                status, retry_after, tokens = self._check(conn, client, now, weight)
+                if status == 200:
+                    if self.rate > 0:
+                        conn.execute(
+                            "INSERT INTO buckets (client, tokens, updated) VALUES (?, ?, ?) "
+                            "ON CONFLICT(client) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                            (client, tokens - 1, now)
+                        )
+                    if self.max_inflight > 0:
+                        conn.execute(
+                            "INSERT INTO inflight (pid, count) VALUES (?, ?) "
+                            "ON CONFLICT(pid) DO UPDATE SET count = count + excluded.count",
+                            (os.getpid(), weight)
+                        )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        except sqlite3.Error as e:
+            # Store tidak bisa diakses (mis. lock terlalu lama): utamakan availability
+            self._store_error("acquire", e)
+            return 200, 0, 0
+
+        self._store_failing = False
+        self._count({200: "admitted", 429: "rate_limited", 503: "capacity"}[status])
+        if status == 200 and now - self._last_prune >= 60:
+            self._last_prune = now
+            self._prune(now)
+        reserved = weight if status == 200 and self.max_inflight > 0 else 0
+        return status, retry_after, reserved
+
+    def _check(self, conn: sqlite3.Connection, client: str, now: float, weight: int) -> tuple:
+        tokens = self.burst
+        if self.rate > 0:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE client = ?", (client,)).fetchone()
+            if row is not None:
+                tokens = min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            if tokens < 1:
+                return 429, max(1, math.ceil((1 - tokens) / self.rate)), tokens
+
+        if self.max_inflight > 0:
+            total = conn.execute("SELECT COALESCE(SUM(count), 0) FROM inflight").fetchone()[0]
+            if total + weight > self.max_inflight:
+                # Hitungan milik worker yang sudah mati (crash / restart) tidak ikut dihitung
+                total = self._drop_dead_workers(conn)
+            if total + weight > self.max_inflight:
+                return 503, ADMISSION_RETRY_AFTER, tokens
+
+        return 200, 0, tokens
+
+    def _drop_dead_workers(self, conn: sqlite3.Connection) -> int:
+        pids = [row[0] for row in conn.execute("SELECT pid FROM inflight")]
+        dead = [(pid,) for pid in pids if pid != os.getpid() and not _pid_alive(pid)]
+        if dead:
+            conn.executemany("DELETE FROM inflight WHERE pid = ?", dead)
+        return conn.execute("SELECT COALESCE(SUM(count), 0) FROM inflight").fetchone()[0]
+
+    def release(self, weight: int):
+        """
+        Kembalikan kapasitas in-flight setelah request selesai (termasuk jika client disconnect)
+
+        Parameters:
+        - weight: Nilai reserved dari acquire
+        """
+
+        if weight <= 0:
+            return
+        try:
+            self._connection().execute(
+                "UPDATE inflight SET count = MAX(0, count - ?) WHERE pid = ?", (weight, os.getpid())
+            )
+        except sqlite3.Error as e:
+            self._store_error("release", e)
+
+    def _prune(self, now: float):
+        # Bucket yang sudah penuh kembali tidak perlu disimpan
+        if self.rate <= 0:
+            return
+        try:
+            self._connection().execute(
+                "DELETE FROM buckets WHERE updated < ?", (now - self.burst / self.rate,)
+            )
+        except sqlite3.Error as e:
+            self._store_error("prune", e)
+
+    def inflight(self) -> int:
+        try:
+            return self._connection().execute("SELECT COALESCE(SUM(count), 0) FROM inflight").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self.stats)
+
+
+def client_key(scope, key_header: str = RATE_LIMIT_KEY_HEADER, trust_proxy: bool = RATE_LIMIT_TRUST_PROXY) -> str:
+    """
+    Identitas client untuk token bucket: API key (di-hash, tidak disimpan mentah) atau IP
+
+    Returns:
+    - String "key:<hash>" atau "ip:<alamat>"
+    """
+
+    forwarded = None
+    for name, value in scope.get("headers", []):
+        if name == key_header.encode("latin-1") and value:
+            return "key:" + hashlib.blake2b(value, digest_size=16).hexdigest()
+        if name == b"x-forwarded-for":
+            forwarded = value
+
+    if trust_proxy and forwarded:
+        return "ip:" + forwarded.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware: admission control sebelum request inferensi diproses
+
+    Hanya request POST ke prefix di `paths` yang dibatasi (health, metrics, dan
+    endpoint baca lain tidak terpengaruh). Store dipanggil di thread pool agar
+    lock SQLite tidak menahan event loop.
+
+    Kapasitas in-flight dihitung dalam gambar: request biasa berbobot 1, request
+    dengan prefix di `weights` berbobot sesuai nilainya (default /api/classify/batch:
+    ADMISSION_BATCH_WEIGHT, jumlah gambar yang dikirim predict_many sekaligus).
+
+    Parameters:
+    - store: AdmissionStore (default: store global)
+    - paths: Prefix path yang dibatasi
+    - weights: Bobot per prefix path (prefix terpanjang yang cocok dipakai)
+    """
+
+    def __init__(self, app, store: AdmissionStore = None, paths: tuple = RATE_LIMIT_PATHS, weights: dict = None):
+        self.app = app
+        self.store = store or admission_store
+        self.paths = tuple(paths)
+        if weights is None:
+            weights = {"/api/classify/batch": ADMISSION_BATCH_WEIGHT}
+        self.weights = sorted(weights.items(), key=lambda item: len(item[0]), reverse=True)
+        self.enabled = self.store.rate > 0 or self.store.max_inflight > 0
+
+    def _weight(self, path: str) -> int:
+        for prefix, weight in self.weights:
+            if path.startswith(prefix):
+                return weight
+        return 1
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.enabled
+            or scope.get("method") != "POST"
+            or not scope["path"].startswith(self.paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        weight = self._weight(scope["path"])
+        status, retry_after, reserved = await loop.run_in_executor(
+            None, self.store.acquire, client_key(scope), weight
+        )
+        if status != 200:
+            await self._reject(send, status, retry_after)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if reserved:
+                await loop.run_in_executor(None, self.store.release, reserved)
+
+    async def _reject(self, send, status: int, retry_after: int):
+        if status == 429:
+            detail = "Too many requests from this client. Retry later"
+        else:
+            detail = "Inference capacity exhausted. Retry later"
+        body = ('{"detail": "%s"}' % detail).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(retry_after).encode("ascii"))
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Global instance
+admission_store = AdmissionStore()
@@ -0,0 +1,652 @@
+"""
+Shared-Memory Inference Pool
+Mode serving multi-proses: worker web (Gunicorn/Uvicorn) hanya menangani I/O dan decode,
+tensor gambar diserahkan lewat ring buffer shared memory ke beberapa proses inferensi
+yang di-pin ke core CPU. Model dan runtime TensorFlow hanya di-load sekali per proses
+inferensi, bukan sekali per worker web.
+
+Alur satu gambar:
+    worker web  : ambil slot kosong -> tulis uint8 (224, 224, 3) ke slot -> kirim index slot
+    inferensi   : kumpulkan index slot (micro-batch) -> predict -> tulis probabilitas -> set Event slot
+    worker web  : tunggu Event slot -> baca probabilitas -> kembalikan slot
+
+Aktifkan dengan INFERENCE_MODE=shm; dengan Gunicorn, pool dibuat di proses master
+(lihat gunicorn.conf.py) sehingga semua worker hasil fork memakai pool yang sama.
+"""
+
+import asyncio
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.utils.batcher import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+from app.utils.executor import ExecutorSaturated
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local").lower()  # local, shm
+SHM_INFERENCE_PROCESSES = int(os.getenv("SHM_INFERENCE_PROCESSES", "1"))
+SHM_SLOTS = int(os.getenv("SHM_SLOTS", "64"))
+SHM_INFERENCE_CORES = os.getenv("SHM_INFERENCE_CORES", "")  # mis. "2,3" atau "2-3;4-5" per proses
+SHM_RESULT_TIMEOUT = float(os.getenv("SHM_RESULT_TIMEOUT", "30"))
+SHM_SLOT_RECLAIM_SECONDS = float(os.getenv("SHM_SLOT_RECLAIM_SECONDS", "120"))
+SHM_SLOT_POLL_INTERVAL = 0.002  # detik, jeda cek slot kosong di predict_many
+
+IMAGE_SHAPE = (224, 224, 3)
+NUM_CLASSES = 4
+
+_STATE_NAMES = {0: "loading", 1: "ready", 2: "dummy"}
+
+# Status slot selain 0 (ok) / 1 (error): sudah diambil tapi belum dikirim, atau menunggu hasil
+SLOT_RESERVED = 2
+SLOT_SUBMITTED = 3
+
+
+class SlotRing:
+    """
+    Tampilan numpy di atas satu blok shared memory
+
+    Layout: images (slots, 224, 224, 3) uint8 | probs (slots, NUM_CLASSES) float32
+            | owner (slots,) int32 | status (slots,) int8 | in_use (slots,) int8
+
+    owner: pid worker yang memegang slot (slot milik worker yang mati bisa diambil kembali)
+    status: 0 ok, 1 error (ditulis proses inferensi), SLOT_RESERVED, SLOT_SUBMITTED
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int):
+        self.shm = shm
+        self.slots = slots
+
+        image_bytes = slots * int(np.prod(IMAGE_SHAPE))
+        prob_bytes = slots * NUM_CLASSES * 4
+
+        self.images = np.ndarray((slots,) + IMAGE_SHAPE, dtype=np.uint8, buffer=shm.buf, offset=0)
+        self.probs = np.ndarray((slots, NUM_CLASSES), dtype=np.float32, buffer=shm.buf, offset=image_bytes)
+        offset = image_bytes + prob_bytes
+        self.owner = np.ndarray((slots,), dtype=np.int32, buffer=shm.buf, offset=offset)
+        self.status = np.ndarray((slots,), dtype=np.int8, buffer=shm.buf, offset=offset + slots * 4)
+        self.in_use = np.ndarray((slots,), dtype=np.int8, buffer=shm.buf, offset=offset + slots * 5)
+
+    @staticmethod
+    def size(slots: int) -> int:
+        return slots * (int(np.prod(IMAGE_SHAPE)) + NUM_CLASSES * 4 + 4 + 2)
+
+
+class SlotChannel:
+    """
+    Antrian index slot antar proses di atas satu pipe
+
+    Tidak memakai multiprocessing.Queue karena thread feeder-nya tidak ikut
+    saat Gunicorn mem-fork worker (os.fork), sehingga put() dari worker tidak pernah terkirim.
+    Index slot hanya beberapa byte, jadi send() langsung ke pipe tidak pernah blok lama.
+    """
+
+    STOP = -1
+
+    def __init__(self, ctx):
+        self._reader, self._writer = ctx.Pipe(duplex=False)
+        self._read_lock = ctx.Lock()
+        self._write_lock = ctx.Lock()
+
+    def put(self, slot: int):
+        with self._write_lock:
+            self._writer.send_bytes(slot.to_bytes(4, "little", signed=True))
+
+    def get(self, timeout: float = None):
+        """
+        Ambil satu index slot
+
+        Returns:
+        - Index slot, SlotChannel.STOP, atau None jika timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            # Tunggu data tanpa memegang lock: proses lain yang sedang mengumpulkan
+            # micro-batch tidak boleh tertahan oleh proses yang idle
+            if not self._reader.poll(remaining):
+                return None
+            if self._read_lock.acquire(timeout=remaining):
+                try:
+                    # Proses lain bisa lebih dulu mengambil data yang sama
+                    if self._reader.poll(0):
+                        return int.from_bytes(self._reader.recv_bytes(), "little", signed=True)
+                finally:
+                    self._read_lock.release()
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _parse_cores(spec: str, processes: int) -> list:
+    """
+    Tentukan core untuk setiap proses inferensi
+
+    Parameters:
+    - spec: "" (otomatis: core terakhir, satu per proses), "2,3" (satu core per proses),
+      atau "0-1;2-3" (set core per proses)
+    - processes: Jumlah proses inferensi
+
+    Returns:
+    - List set core (None jika pinning tidak didukung)
+    """
+
+    if not hasattr(os, "sched_getaffinity"):
+        return [None] * processes
+
+    available = sorted(os.sched_getaffinity(0))
+    if not spec:
+        # Core terakhir untuk inferensi, core awal tetap untuk worker web
+        return [{available[-1 - (i % len(available))]} for i in range(processes)]
+
+    groups = spec.split(";") if ";" in spec else spec.split(",")
+    cores = []
+    for group in groups:
+        members = set()
+        for part in group.split(","):
+            if "-" in part:
+                start, end = part.split("-")
+                members.update(range(int(start), int(end) + 1))
+            elif part.strip():
+                members.add(int(part))
+        cores.append(members)
+    return [cores[i % len(cores)] for i in range(processes)]
+
+
+def _inference_process(index: int, config: dict, request_queue, events, ready, state, timings, pids):
+    """
+    Main loop proses inferensi (dijalankan dengan start method "spawn")
+    """
+
+    cores = config["cores"]
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+        # Thread intra-op mengikuti jumlah core yang di-pin (dibaca saat helper di-import)
+        os.environ.setdefault("INFERENCE_THREADS", str(len(cores)))
+
+    # Segmen dimiliki proses pembuat pool (satu-satunya yang memanggil unlink)
+    pids[index] = os.getpid()
+    shm = shared_memory.SharedMemory(name=config["shm_name"])
+    ring = SlotRing(shm, config["slots"])
+
+    from app.utils.helper import synthetic_model
+    from app.utils.model_manager import ModelManager
+    from app.utils.preprocessing import BatchBuffer
+
+    manager = ModelManager(config["model_path"], base_version=config["version"])
+    manager.load()
+    model = manager.model
+    normalize = manager.batcher.normalize
+    buffer = BatchBuffer(config["max_batch_size"])
+
+    with state.get_lock():
+        if state.value == 0:
+            state.value = 1 if model is not None else 2
+            timings[0] = manager.load_seconds or 0.0
+            timings[1] = manager.warmup_seconds or 0.0
+    # Mode dummy: prediksi deterministik dari hash gambar (sama dengan mode lokal)
+    model = model or synthetic_model()
+    ready.set()
+    print(f"✅ Inference process {index} ready (pid {os.getpid()}, cores {sorted(cores) if cores else 'any'})")
+
+    max_wait = config["max_wait_ms"] / 1000.0
+    stop = False
+    while not stop:
+        slot = request_queue.get()
+        if slot is None:
+            continue
+        if slot == SlotChannel.STOP:
+            break
+
+        # Kumpulkan slot lain yang datang bersamaan (micro-batch)
+        batch = [slot]
+        deadline = time.monotonic() + max_wait
+        while len(batch) < config["max_batch_size"]:
+            item = request_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            if item is None:
+                break
+            if item == SlotChannel.STOP:
+                stop = True
+                break
+            batch.append(item)
+
+        try:
+            inputs = buffer.fill([ring.images[s] for s in batch], normalize=normalize)
+            probs = np.asarray(model.predict(inputs, verbose=0), dtype=np.float32)
+
+            for i, s in enumerate(batch):
+                ring.probs[s] = probs[i]
+                ring.status[s] = 0
+        except Exception as e:
+            print(f"⚠️  Inference process {index} error: {e}")
+            for s in batch:
+                ring.status[s] = 1
+
+        for s in batch:
+            events[s].set()
+
+    shm.close()
+
+
+class InferencePool:
+    """
+    Ring buffer shared memory + proses inferensi untuk satu versi model
+
+    Parameters:
+    - model_path: Path file model
+    - version: Versi model (untuk cache key dan status)
+    - processes: Jumlah proses inferensi
+    - slots: Jumlah gambar yang bisa diproses/mengantri bersamaan (batas backpressure)
+    - cores: Spesifikasi pinning core (lihat _parse_cores)
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        version: str,
+        processes: int = SHM_INFERENCE_PROCESSES,
+        slots: int = SHM_SLOTS,
+        cores: str = SHM_INFERENCE_CORES,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS
+    ):
+        self.model_path = model_path
+        self.version = version
+        self.processes = max(1, processes)
+        self.slots = max(1, slots)
+        self.cores = _parse_cores(cores, self.processes)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+
+        # Objek sinkronisasi dibuat sebelum fork worker web agar ikut diwariskan
+        ctx = mp.get_context("spawn")
+        self.shm = shared_memory.SharedMemory(create=True, size=SlotRing.size(self.slots))
+        self.ring = SlotRing(self.shm, self.slots)
+        self.ring.in_use[:] = 0
+        self.ring.owner[:] = 0
+        self.request_queue = SlotChannel(ctx)
+        self.slot_lock = ctx.Lock()
+        self.events = [ctx.Event() for _ in range(self.slots)]
+        self.ready = ctx.Event()
+        self.state = ctx.Value("i", 0)
+        self.timings = ctx.Array("d", 2)
+        self.pids = ctx.Array("i", self.processes)
+        self._ctx = ctx
+        self._processes = []
+        self._owner_pid = os.getpid()
+
+    def start(self):
+        """
+        Jalankan proses inferensi (model di-load di masing-masing proses)
+        """
+        config = {
+            "shm_name": self.shm.name,
+            "slots": self.slots,
+            "model_path": self.model_path,
+            "version": self.version,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms
+        }
+
+        for index in range(self.processes):
+            process = self._ctx.Process(
+                target=_inference_process,
+                args=(index, dict(config, cores=self.cores[index]), self.request_queue,
+                      self.events, self.ready, self.state, self.timings, self.pids),
+                name=f"inference-{index}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+        print(f"✅ Shared-memory inference pool started: {self.processes} process(es), {self.slots} slots")
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Hentikan proses inferensi dan hapus shared memory (hanya dari proses pembuat pool)
+        """
+        if os.getpid() != self._owner_pid:
+            return
+
+        for _ in self._processes:
+            self.request_queue.put(SlotChannel.STOP)
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def acquire_slot(self) -> int:
+        """
+        Ambil slot kosong, atau None jika semua slot sedang dipakai
+        """
+        with self.slot_lock:
+            free = np.flatnonzero(self.ring.in_use == 0)
+            if free.size == 0 and self._reclaim_dead_owners():
+                free = np.flatnonzero(self.ring.in_use == 0)
+            if free.size == 0:
+                return None
+            slot = int(free[0])
+            self.ring.in_use[slot] = 1
+            self.ring.owner[slot] = os.getpid()
+            self.ring.status[slot] = SLOT_RESERVED
+        return slot
+
+    def _reclaim_dead_owners(self) -> int:
+        # Dipanggil dengan slot_lock. Slot milik worker yang crash / di-restart dikembalikan,
+        # kecuali gambarnya masih menunggu di proses inferensi (hasilnya belum ditulis)
+        reclaimed = 0
+        owners = {int(pid) for pid in self.ring.owner[self.ring.in_use == 1]}
+        dead = {pid for pid in owners if pid and not _pid_alive(pid)}
+        for slot in np.flatnonzero(self.ring.in_use == 1):
+            if int(self.ring.owner[slot]) in dead and self.ring.status[slot] != SLOT_SUBMITTED:
+                self.ring.in_use[slot] = 0
+                self.ring.owner[slot] = 0
+                reclaimed += 1
+        if reclaimed:
+            print(f"🧹 Reclaimed {reclaimed} shared-memory slot(s) from dead workers")
+        return reclaimed
+
+    def release_slot(self, slot: int):
+        with self.slot_lock:
+            self.ring.in_use[slot] = 0
+            self.ring.owner[slot] = 0
+
+    def slots_in_use(self) -> int:
+        return int(np.count_nonzero(self.ring.in_use))
+
+    def alive_processes(self) -> int:
+        if os.getpid() != self._owner_pid:
+            # Worker hasil fork tidak bisa memanggil is_alive() pada proses milik master:
+            # cek pid yang dicatat proses inferensi saat start
+            return sum(1 for pid in self.pids[:] if pid and _pid_alive(pid))
+        return sum(1 for process in self._processes if process.is_alive())
+
+
+class ShmInferenceClient:
+    """
+    Pengganti MicroBatcher di worker web: kirim gambar ke pool shared memory
+
+    Parameters:
+    - pool: InferencePool yang dibuat sebelum fork
+    - timeout: Batas waktu menunggu hasil (detik)
+    """
+
+    def __init__(self, pool: InferencePool, timeout: float = SHM_RESULT_TIMEOUT):
+        self.pool = pool
+        self.timeout = timeout
+        self.max_batch_size = pool.max_batch_size
+        self.normalize = True
+
+        self._waiters = None
+        self._waiters_pid = None
+        self._stats_lock = threading.Lock()
+        self._total_items = 0
+        self._total_errors = 0
+        self._total_rejected = 0
+        self._total_timeouts = 0
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Thread pool tidak ikut saat fork; buat per proses worker
+        if self._waiters is None or self._waiters_pid != os.getpid():
+            self._waiters = ThreadPoolExecutor(max_workers=self.pool.slots, thread_name_prefix="shm-wait")
+            self._waiters_pid = os.getpid()
+        return self._waiters
+
+    def _acquire(self) -> int:
+        slot = self.pool.acquire_slot()
+        if slot is None:
+            with self._stats_lock:
+                self._total_rejected += 1
+            raise ExecutorSaturated("inference")
+        return slot
+
+    async def _acquire_waiting(self, deadline: float) -> int:
+        # Untuk predict_many: tunggu slot kosong (sampai deadline) daripada langsung menolak
+        while True:
+            slot = self.pool.acquire_slot()
+            if slot is not None:
+                return slot
+            if time.monotonic() >= deadline:
+                with self._stats_lock:
+                    self._total_rejected += 1
+                raise ExecutorSaturated("inference")
+            await asyncio.sleep(SHM_SLOT_POLL_INTERVAL)
+
+    def _release_when_done(self, slot: int):
+        # Hasil datang setelah timeout: slot baru boleh dipakai lagi setelah proses inferensi selesai.
+        # Jika proses inferensi mati (atau macet melewati batas), slot diambil kembali agar tidak bocor.
+        deadline = time.monotonic() + SHM_SLOT_RECLAIM_SECONDS
+        while not self.pool.events[slot].wait(1.0):
+            if self.pool.alive_processes() == 0 or time.monotonic() >= deadline:
+                print(f"⚠️  Reclaiming shared-memory slot {slot} without a result")
+                break
+        self.pool.release_slot(slot)
+
+    async def predict(self, img_array: np.ndarray, slot_deadline: float = None) -> dict:
+        """
+        Prediksi satu gambar uint8 (224, 224, 3) lewat proses inferensi
+
+        Parameters:
+        - img_array: Gambar uint8 (224, 224, 3)
+        - slot_deadline: Jika diisi (time.monotonic), tunggu slot kosong sampai waktu ini
+
+        Raises:
+        - ExecutorSaturated jika semua slot sedang dipakai
+        - TimeoutError jika hasil tidak datang dalam batas waktu
+        """
+        from app.utils.helper import format_predictions
+
+        if slot_deadline is None:
+            slot = self._acquire()
+        else:
+            slot = await self._acquire_waiting(slot_deadline)
+        ring = self.pool.ring
+        event = self.pool.events[slot]
+
+        event.clear()
+        ring.images[slot] = img_array
+        # Ditimpa 0/1 oleh proses inferensi setelah predict
+        ring.status[slot] = SLOT_SUBMITTED
+        self.pool.request_queue.put(slot)
+
+        loop = asyncio.get_running_loop()
+        done = await loop.run_in_executor(self._executor(), event.wait, self.timeout)
+        if not done:
+            with self._stats_lock:
+                self._total_timeouts += 1
+            self._executor().submit(self._release_when_done, slot)
+            raise TimeoutError("Inference timed out")
+
+        try:
+            if ring.status[slot] != 0:
+                with self._stats_lock:
+                    self._total_errors += 1
+                raise Exception("Error during prediction in inference process")
+            probs = ring.probs[slot].copy()
+        finally:
+            self.pool.release_slot(slot)
+
+        with self._stats_lock:
+            self._total_items += 1
+        return format_predictions(probs[np.newaxis])[0]
+
+    async def predict_many(self, images: list, return_exceptions: bool = False) -> list:
+        """
+        Prediksi banyak gambar, dikirim per potongan sebesar max_batch_size (paling banyak
+        jumlah slot) sehingga input yang lebih besar dari jumlah slot tetap bisa diproses
+
+        Slot yang sedang dipakai request lain ditunggu (sampai batas timeout per potongan),
+        bukan langsung ditolak.
+
+        Parameters:
+        - images: List array gambar uint8 dengan shape (H, W, 3)
+        - return_exceptions: True untuk mengembalikan exception di posisi gambar yang gagal
+
+        Returns:
+        - List dictionary hasil prediksi (atau exception), urutan sama dengan input
+        """
+        chunk_size = max(1, min(self.max_batch_size, self.pool.slots))
+        results = []
+        for start in range(0, len(images), chunk_size):
+            chunk = images[start:start + chunk_size]
+            deadline = time.monotonic() + self.timeout
+            results.extend(await asyncio.gather(
+                *[self.predict(image, slot_deadline=deadline) for image in chunk],
+                return_exceptions=return_exceptions
+            ))
+        return results
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "mode": "shm",
+                "processes": self.pool.processes,
+                "alive_processes": self.pool.alive_processes(),
+                "slots": self.pool.slots,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.pool.max_wait_ms,
+                "queue_depth": self.pool.slots_in_use(),
+                "total_items": self._total_items,
+                "total_errors": self._total_errors,
+                "total_rejected": self._total_rejected,
+                "total_timeouts": self._total_timeouts
+            }
+
+    def stop(self, timeout: float = 5.0):
+        # Pool dimiliki proses pembuat (master Gunicorn), bukan worker
+        if self._waiters is not None and self._waiters_pid == os.getpid():
+            self._waiters.shutdown(wait=False)
+            self._waiters = None
+
+
+class ShmModelManager:
+    """
+    Antarmuka ModelManager untuk model yang berjalan di pool shared memory
+
+    Parameters:
+    - pool: InferencePool untuk versi model ini
+    """
+
+    def __init__(self, pool: InferencePool):
+        self.pool = pool
+        self.model_path = pool.model_path
+        self.base_version = pool.version
+        self.model = None
+        self.error = None
+        self.batcher = ShmInferenceClient(pool)
+
+    @property
+    def state(self) -> str:
+        return _STATE_NAMES.get(self.pool.state.value, "loading")
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state in ("ready", "dummy")
+
+    @property
+    def model_version(self) -> str:
+        from app.utils.helper import MODEL_VARIANT
+
+        suffix = "dummy" if self.state == "dummy" else MODEL_VARIANT
+        return f"{self.base_version}+{suffix}"
+
+    @property
+    def load_seconds(self) -> float:
+        return self.pool.timings[0] if self.is_ready else None
+
+    @property
+    def warmup_seconds(self) -> float:
+        return self.pool.timings[1] if self.is_ready else None
+
+    def load(self):
+        self.wait_until_loaded()
+
+    def start_background_load(self):
+        return None
+
+    def wait_until_loaded(self, timeout: float = None) -> bool:
+        return self.pool.ready.wait(timeout)
+
+    def get_status(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.is_ready,
+            "model_path": self.model_path,
+            "backend": "shm",
+            "variant": None,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "error": self.error,
+            "inference": self.batcher.get_stats()
+        }
+
+    def shutdown(self):
+        self.batcher.stop()
+
+
+# Pool global (dibuat di master Gunicorn lewat gunicorn.conf.py, atau saat pertama dipakai)
+inference_pool = None
+_pool_lock = threading.RLock()
+
+
+def start_inference_pool(model_path: str = None, version: str = None) -> InferencePool:
+    """
+    Buat pool untuk versi model aktif (dari registry) jika belum ada
+
+    Returns:
+    - InferencePool global
+    """
+    global inference_pool
+
+    with _pool_lock:
+        if inference_pool is not None:
+            return inference_pool
+
+        if model_path is None:
+            from app.utils.model_registry import ModelRegistry
+
+            artifact = ModelRegistry().configured_artifact()
+            model_path, version = artifact.model_path, artifact.version
+
+        inference_pool = InferencePool(model_path, version)
+        inference_pool.start()
+        return inference_pool
+
+
+def stop_inference_pool():
+    global inference_pool
+
+    with _pool_lock:
+        if inference_pool is not None:
+            inference_pool.stop()
+            inference_pool = None
+
+
+def get_inference_pool(version: str, model_path: str) -> InferencePool:
+    """
+    Pool untuk versi tertentu, atau None jika pool melayani versi lain
+    (versi lain dijalankan in-process seperti mode local)
+    """
+    pool = inference_pool or start_inference_pool(model_path, version)
+    return pool if pool.version == version else None
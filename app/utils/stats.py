@@ -0,0 +1,295 @@
+"""
+Prediction Statistics
+Agregat inkremental riwayat prediksi: jumlah per kelas, rata-rata/varians confidence
+(Welford), histogram confidence, dan tren per jam/hari
+
+Agregat hanya membaca record baru dari prediction store (id > id terakhir), sehingga
+query statistik O(jumlah bucket) dan semua worker melihat data yang sama. Nomor reset
+(generation) di prediction store memberi tahu semua worker jika riwayat dihapus.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+from app.utils.prediction_store import prediction_store
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+STATS_SNAPSHOT_FILE = os.getenv("STATS_SNAPSHOT_FILE", "logs/stats_snapshot.json")
+STATS_PERSIST_INTERVAL = float(os.getenv("STATS_PERSIST_INTERVAL", "60"))
+STATS_HOURLY_RETENTION = int(os.getenv("STATS_HOURLY_RETENTION", str(24 * 14)))
+STATS_DAILY_RETENTION = int(os.getenv("STATS_DAILY_RETENTION", "366"))
+STATS_HISTOGRAM_BINS = 10
+
+_SNAPSHOT_VERSION = 1
+
+
+class RunningStats:
+    """
+    Rata-rata dan varians berjalan (algoritma Welford)
+    """
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+
+class PredictionStats:
+    """
+    Agregator statistik prediksi
+
+    Parameters:
+    - store: PredictionStore sumber data
+    - snapshot_file: Path file snapshot JSON (kosong untuk menonaktifkan)
+    """
+
+    def __init__(self, store=prediction_store, snapshot_file: str = STATS_SNAPSHOT_FILE):
+        self.store = store
+        self.snapshot_file = snapshot_file
+
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._last_persist = time.monotonic()
+        self.generation = 0
+        self._reset_state()
+
+    def _reset_state(self):
+        self.last_id = 0
+        self.total = 0
+        self.class_counts = Counter()
+        self.overall = RunningStats()
+        self.per_class = {}
+        self.histogram = [0] * STATS_HISTOGRAM_BINS
+        self.hourly = OrderedDict()
+        self.daily = OrderedDict()
+
+    def reset(self):
+        """
+        Kosongkan agregat (dipanggil saat riwayat dihapus)
+        """
+        with self._lock:
+            self._reset_state()
+            self.generation = self.store.generation()
+            self._initialized = True
+            self._persist()
+
+    def _sync_with_store(self):
+        # Riwayat dihapus oleh worker lain (generation berubah), atau database dibuat ulang
+        # (id terbesar lebih kecil dari last_id): agregat dibangun ulang dari awal
+        generation = self.store.generation()
+        if generation != self.generation:
+            self._reset_state()
+            self.generation = generation
+        elif self.last_id and self.store.max_id() < self.last_id:
+            print("⚠️  Prediction store is older than the stats snapshot. Rebuilding stats.")
+            self._reset_state()
+
+    def refresh(self, page_size: int = 5000) -> int:
+        """
+        Tambahkan record baru dari store ke agregat
+
+        Returns:
+        - Jumlah record baru yang diproses
+        """
+        with self._lock:
+            if not self._initialized:
+                self._load_snapshot()
+                self._initialized = True
+            self._sync_with_store()
+
+            processed = 0
+            while True:
+                rows = self.store.fetch_after(self.last_id, page_size)
+                for record_id, ts, label, confidence in rows:
+                    self._add(ts, label, confidence)
+                    self.last_id = record_id
+                processed += len(rows)
+                if len(rows) < page_size:
+                    break
+
+            if processed and time.monotonic() - self._last_persist >= STATS_PERSIST_INTERVAL:
+                self._persist()
+
+            return processed
+
+    def persist(self):
+        """
+        Simpan snapshot agregat ke disk sekarang juga
+        """
+        with self._lock:
+            if not self._initialized:
+                return
+            try:
+                self._sync_with_store()
+            except Exception as e:
+                # Jangan menulis agregat yang mungkin sudah direset worker lain
+                print(f"⚠️  Error checking prediction store before saving stats: {e}")
+                return
+            self._persist()
+
+    def summary(self, granularity: str = "hourly", buckets: int = 24, label: str = None) -> dict:
+        """
+        Ringkasan statistik
+
+        Parameters:
+        - granularity: "hourly" atau "daily"
+        - buckets: Jumlah bucket waktu terakhir yang dikembalikan
+        - label: Jika diisi, tren menyertakan share label ini per bucket
+
+        Returns:
+        - Dictionary statistik
+        """
+        with self._lock:
+            series = self.hourly if granularity == "hourly" else self.daily
+            keys = list(series.keys())[-buckets:] if buckets > 0 else []
+
+            trend = []
+            for key in keys:
+                counts = series[key]
+                bucket_total = sum(counts.values())
+                point = {"bucket": key, "total": bucket_total, "counts": dict(counts)}
+                if label:
+                    point["share"] = round(counts.get(label, 0) / bucket_total, 4) if bucket_total else 0.0
+                trend.append(point)
+
+            bin_width = 1.0 / STATS_HISTOGRAM_BINS
+            return {
+                "total_predictions": self.total,
+                "last_id": self.last_id,
+                "confidence": {
+                    "mean": round(self.overall.mean, 4),
+                    "std": round(math.sqrt(self.overall.variance), 4)
+                },
+                "classes": {
+                    name: {
+                        "count": count,
+                        "share": round(count / self.total, 4) if self.total else 0.0,
+                        "mean_confidence": round(self.per_class[name].mean, 4),
+                        "std_confidence": round(math.sqrt(self.per_class[name].variance), 4)
+                    }
+                    for name, count in self.class_counts.most_common()
+                },
+                "confidence_histogram": [
+                    {
+                        "range": [round(i * bin_width, 2), round((i + 1) * bin_width, 2)],
+                        "count": count
+                    }
+                    for i, count in enumerate(self.histogram)
+                ],
+                "granularity": granularity,
+                "trend": trend
+            }
+
+    def _add(self, ts: float, label: str, confidence: float):
+        self.total += 1
+        self.class_counts[label] += 1
+        self.overall.update(confidence)
+        self.per_class.setdefault(label, RunningStats()).update(confidence)
+
+        bin_index = min(int(confidence * STATS_HISTOGRAM_BINS), STATS_HISTOGRAM_BINS - 1)
+        self.histogram[max(bin_index, 0)] += 1
+
+        moment = datetime.fromtimestamp(ts)
+        self._bump(self.hourly, moment.strftime("%Y-%m-%dT%H:00"), label, STATS_HOURLY_RETENTION)
+        self._bump(self.daily, moment.strftime("%Y-%m-%d"), label, STATS_DAILY_RETENTION)
+
+    @staticmethod
+    def _bump(series: OrderedDict, key: str, label: str, retention: int):
+        counts = series.get(key)
+        if counts is None:
+            latest = next(reversed(series), None)
+            counts = series[key] = Counter()
+
+            # Record biasanya datang urut waktu; urutkan ulang jika ada data lama (mis. import log)
+            if latest is not None and key < latest:
+                for existing in sorted(series):
+                    series.move_to_end(existing)
+
+            while len(series) > retention:
+                series.popitem(last=False)
+        counts[label] += 1
+
+    def _persist(self):
+        if not self.snapshot_file:
+            return
+
+        snapshot = {
+            "version": _SNAPSHOT_VERSION,
+            "generation": self.generation,
+            "last_id": self.last_id,
+            "total": self.total,
+            "class_counts": dict(self.class_counts),
+            "overall": self.overall.to_dict(),
+            "per_class": {name: stats.to_dict() for name, stats in self.per_class.items()},
+            "histogram": self.histogram,
+            "hourly": {key: dict(counts) for key, counts in self.hourly.items()},
+            "daily": {key: dict(counts) for key, counts in self.daily.items()}
+        }
+
+        try:
+            directory = os.path.dirname(self.snapshot_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Tulis ke file sementara lalu replace (atomic)
+            tmp_file = f"{self.snapshot_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_file, self.snapshot_file)
+            self._last_persist = time.monotonic()
+
+        except Exception as e:
+            print(f"⚠️  Error saving stats snapshot: {e}")
+
+    def _load_snapshot(self):
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return
+
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+
+            if snapshot.get("version") != _SNAPSHOT_VERSION:
+                return
+
+            self.generation = snapshot.get("generation", 0)
+            self.last_id = snapshot["last_id"]
+            self.total = snapshot["total"]
+            self.class_counts = Counter(snapshot["class_counts"])
+            self.overall = RunningStats(**snapshot["overall"])
+            self.per_class = {
+                name: RunningStats(**values) for name, values in snapshot["per_class"].items()
+            }
+            self.histogram = snapshot["histogram"]
+            self.hourly = OrderedDict((k, Counter(v)) for k, v in snapshot["hourly"].items())
+            self.daily = OrderedDict((k, Counter(v)) for k, v in snapshot["daily"].items())
+
+        except Exception as e:
+            # Snapshot rusak: bangun ulang dari store
+            print(f"⚠️  Error loading stats snapshot: {e}. Rebuilding from prediction store.")
+            self._reset_state()
+
+
+# Agregator global untuk /api/stats
+prediction_stats = PredictionStats()
@@ -0,0 +1,263 @@
+"""
+Upload Ingest
+Membaca upload per chunk dengan batas ukuran, mengecek magic bytes dan dimensi
+gambar dari header (PIL lazy open, tanpa decode) sehingga file yang tidak valid,
+terlalu besar, atau decompression bomb ditolak sebelum decode penuh
+"""
+
+import io
+import os
+import warnings
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+from app.utils.metrics import timed
+
+
+# Konfigurasi default (bisa di-override lewat environment variable)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", str(50_000_000)))
+UPLOAD_MAX_DIMENSION = int(os.getenv("UPLOAD_MAX_DIMENSION", "12000"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+# Magic bytes format gambar yang diterima
+IMAGE_SIGNATURES = {
+    "JPEG": (b"\xff\xd8\xff",),
+    "PNG": (b"\x89PNG\r\n\x1a\n",)
+}
+
+
+class UploadRejected(Exception):
+    """
+    Upload ditolak sebelum decode (dipetakan ke HTTP 413 / 415 / 400)
+
+    Parameters:
+    - status_code: Status HTTP yang dikembalikan ke client
+    - detail: Pesan error
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def sniff_format(head: bytes) -> str:
+    """
+    Deteksi format gambar dari magic bytes
+
+    Returns:
+    - Nama format PIL ("JPEG", "PNG") atau None jika tidak dikenali
+    """
+
+    for fmt, signatures in IMAGE_SIGNATURES.items():
+        if any(head.startswith(signature) for signature in signatures):
+            return fmt
+    return None
+
+
+def probe_image_header(data: bytes, expected_format: str = None) -> tuple:
+    """
+    Baca ukuran gambar dari header saja (PIL lazy open, piksel tidak di-decode)
+
+    Parameters:
+    - data: Bytes gambar (boleh hanya awal file)
+    - expected_format: Format hasil sniff_format, harus sama dengan format yang dibaca PIL
+
+    Returns:
+    - Tuple (width, height)
+
+    Raises:
+    - UploadRejected jika format tidak cocok atau dimensi melebihi batas
+    - Exception lain jika header tidak lengkap / rusak
+    """
+
+    with warnings.catch_warnings():
+        # DecompressionBombWarning dijadikan error agar ditolak, bukan hanya dicatat
+        warnings.simplefilter("error", Image.DecompressionBombWarning)
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                fmt, (width, height) = img.format, img.size
+        except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+            raise UploadRejected(413, "Image rejected: possible decompression bomb")
+
+    if expected_format and fmt != expected_format:
+        raise UploadRejected(415, f"File content ({fmt}) does not match its signature ({expected_format})")
+
+    if width > UPLOAD_MAX_DIMENSION or height > UPLOAD_MAX_DIMENSION or width * height > UPLOAD_MAX_PIXELS:
+        raise UploadRejected(
+            413,
+            f"Image dimensions too large ({width}x{height}). "
+            f"Maximum {UPLOAD_MAX_DIMENSION}px per side and {UPLOAD_MAX_PIXELS} pixels"
+        )
+
+    return width, height
+
+
+def validate_image_bytes(data: bytes, max_bytes: int = UPLOAD_MAX_BYTES):
+    """
+    Validasi gambar yang sudah ada di memory (mis. isi file zip): ukuran, magic bytes, dan header
+
+    Raises:
+    - UploadRejected (413 terlalu besar, 415 bukan gambar yang didukung, 400 header rusak)
+    """
+
+    if not data:
+        raise UploadRejected(400, "Empty file")
+    if len(data) > max_bytes:
+        raise UploadRejected(413, f"File too large ({len(data)} bytes). Maximum {max_bytes} bytes")
+
+    fmt = sniff_format(data[:16])
+    if fmt is None:
+        raise UploadRejected(415, "File content is not a supported image (JPEG or PNG)")
+
+    try:
+        probe_image_header(data, fmt)
+    except UploadRejected:
+        raise
+    except Exception as e:
+        raise UploadRejected(400, f"Invalid image header: {str(e)}")
+
+
+async def read_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES,
+                      chunk_size: int = UPLOAD_CHUNK_SIZE) -> bytes:
+    """
+    Baca upload per chunk dengan validasi bertahap
+
+    1. Ukuran file dari multipart (jika tersedia) dicek sebelum membaca apa pun
+    2. Chunk pertama: magic bytes (JPEG/PNG) dan, jika header sudah lengkap, dimensi gambar
+    3. Chunk berikutnya: total byte tidak boleh melebihi max_bytes
+
+    Parameters:
+    - file: File upload
+    - max_bytes: Ukuran file maksimal
+    - chunk_size: Ukuran chunk baca
+
+    Returns:
+    - Bytes isi file
+
+    Raises:
+    - UploadRejected (413 terlalu besar, 415 bukan gambar yang didukung, 400 header rusak)
+    """
+
+    size = getattr(file, "size", None)
+    if size is not None and size > max_bytes:
+        raise UploadRejected(413, f"File too large ({size} bytes). Maximum {max_bytes} bytes")
+
+    with timed("read"):
+        head = await file.read(chunk_size)
+        if not head:
+            raise UploadRejected(400, "Empty file")
+
+        fmt = sniff_format(head)
+        if fmt is None:
+            raise UploadRejected(415, "File content is not a supported image (JPEG or PNG)")
+
+        # Header JPEG bisa ada setelah segmen EXIF panjang; jika belum lengkap, cek setelah file dibaca
+        header_checked = False
+        try:
+            probe_image_header(head, fmt)
+            header_checked = True
+        except UploadRejected:
+            raise
+        except Exception:
+            pass
+
+        chunks = [head]
+        total = len(head)
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > max_bytes:
+                raise UploadRejected(413, f"File too large. Maximum {max_bytes} bytes")
+            chunks.append(chunk)
+
+        data = b"".join(chunks)
+
+    if not header_checked:
+        try:
+            probe_image_header(data, fmt)
+        except UploadRejected:
+            raise
+        except Exception as e:
+            raise UploadRejected(400, f"Invalid image header: {str(e)}")
+
+    return data
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware: tolak request dengan body lebih besar dari max_bytes
+
+    Jika Content-Length ada, request ditolak (413) sebelum body dibaca sama sekali;
+    untuk chunked transfer, byte dihitung saat body dibaca dan request dihentikan
+    begitu melewati batas.
+
+    Parameters:
+    - max_bytes: Batas default
+    - path_limits: Batas khusus per prefix path (mis. {"/api/jobs": 2 GB} untuk upload zip)
+    """
+
+    def __init__(self, app, max_bytes: int = UPLOAD_MAX_REQUEST_BYTES, path_limits: dict = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.max_bytes
+        for prefix, limit in self.path_limits.items():
+            if scope["path"].startswith(prefix):
+                max_bytes = limit
+                break
+
+        if max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    too_large = int(value) > max_bytes
+                except ValueError:
+                    too_large = False
+                if too_large:
+                    await self._reject(send, max_bytes)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise HTTPException(status_code=413, detail=self._detail(max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _detail(self, max_bytes: int) -> str:
+        return f"Request body too large. Maximum {max_bytes} bytes"
+
+    async def _reject(self, send, max_bytes: int):
+        body = ('{"detail": "%s"}' % self._detail(max_bytes)).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,4 @@
+"""
+Benchmarks Package
+Script untuk mengukur performa preprocessing dan inferensi
+"""
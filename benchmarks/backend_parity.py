@@ -0,0 +1,90 @@
+"""
+Backend Parity Check
+Memastikan output backend TFLite / ONNX sama (secara numerik) dengan model Keras asli,
+dan mengukur waktu load serta latency per batch
+
+Contoh:
+    python -m benchmarks.backend_parity --model app/models/wereng_classifier.h5 --backends tflite onnx
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.utils.helper import INFERENCE_BACKENDS, load_model
+
+
+def _time_predict(model, batch: np.ndarray, repeat: int) -> float:
+    model.predict(batch)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(batch)
+    return (time.perf_counter() - start) / repeat
+
+
+def run_parity(model_path: str, backends: list, batch_size: int, atol: float, repeat: int) -> dict:
+    """
+    Bandingkan output setiap backend dengan backend keras
+
+    Returns:
+    - Dictionary hasil per backend (max abs diff, top-1 agreement, waktu load dan predict)
+    """
+
+    rng = np.random.default_rng(0)
+    batch = rng.random((batch_size, 224, 224, 3), dtype=np.float32)
+
+    start = time.perf_counter()
+    reference_model = load_model(model_path, backend="keras")
+    if reference_model is None:
+        raise SystemExit("Keras model could not be loaded; parity check needs the reference model")
+    report = {
+        "keras": {
+            "load_seconds": round(time.perf_counter() - start, 3),
+            "predict_ms": round(1000 * _time_predict(reference_model, batch, repeat), 3)
+        }
+    }
+    reference = reference_model.predict(batch)
+
+    for backend in backends:
+        start = time.perf_counter()
+        model = load_model(model_path, backend=backend)
+        load_seconds = time.perf_counter() - start
+
+        if model is None or model.name != backend:
+            report[backend] = {"error": "backend not available"}
+            continue
+
+        output = model.predict(batch)
+        max_abs_diff = float(np.abs(output - reference).max())
+        report[backend] = {
+            "load_seconds": round(load_seconds, 3),
+            "predict_ms": round(1000 * _time_predict(model, batch, repeat), 3),
+            "max_abs_diff": max_abs_diff,
+            "top1_agreement": float((output.argmax(axis=1) == reference.argmax(axis=1)).mean()),
+            "passed": bool(max_abs_diff <= atol)
+        }
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cek kesamaan output antar backend inferensi")
+    parser.add_argument("--model", default="app/models/wereng_classifier.h5")
+    parser.add_argument("--backends", nargs="+", default=["tflite", "onnx"],
+                        choices=sorted(set(INFERENCE_BACKENDS) - {"keras"}))
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    report = run_parity(args.model, args.backends, args.batch_size, args.atol, args.repeat)
+    print(json.dumps(report, indent=2))
+
+    if any(not result.get("passed", False) for name, result in report.items() if name != "keras"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
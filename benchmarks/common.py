@@ -0,0 +1,104 @@
+"""
+Benchmark Utilities
+Gambar sintetis, ringkasan latency, dan metadata
+environment agar hasil benchmark bisa dibandingkan antar commit
+"""
+
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+
+def synthetic_image(width: int, height: int, seed: int = 0, fmt: str = "JPEG") -> bytes:
+    """
+    Buat gambar sintetis (gradien + noise, mirip foto) dalam format JPEG/PNG
+
+    Parameters:
+    - width / height: Ukuran gambar
+    - seed: Seed noise (gambar berbeda untuk seed berbeda)
+    - fmt: "JPEG" atau "PNG"
+
+    Returns:
+    - Bytes gambar
+    """
+
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    base = (y * np.array([0.6, 0.3, 0.1], dtype=np.float32) + x * np.array([0.2, 0.5, 0.3], dtype=np.float32))
+    noise = rng.normal(0, 20, size=(height, width, 3)).astype(np.float32)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, "RGB").save(buffer, format=fmt, quality=90)
+    return buffer.getvalue()
+
+
+def summarize_latencies(latencies: list) -> dict:
+    """
+    Ringkasan latency (detik) dalam milidetik: mean dan persentil
+
+    Returns:
+    - Dictionary mean_ms, p50_ms, p90_ms, p95_ms, p99_ms, max_ms
+    """
+
+    if not latencies:
+        return {"count": 0}
+
+    values = np.asarray(latencies, dtype=np.float64) * 1000.0
+    p50, p90, p95, p99 = np.percentile(values, [50, 90, 95, 99])
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+
+def environment_info() -> dict:
+    """
+    Metadata environment (commit, versi Python/NumPy, CPU) untuk membandingkan hasil
+    """
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def write_report(report: dict, output: str = None):
+    """
+    Cetak report JSON ke stdout, dan simpan ke file jika output diisi
+    """
+
+    text = json.dumps(report, indent=2)
+    print(text)
+
+    if output:
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
@@ -0,0 +1,87 @@
+"""
+Benchmark Comparison
+Membandingkan dua report JSON (micro / load_test) dari commit berbeda dan
+menandai regresi latency atau throughput di atas batas toleransi
+
+Contoh:
+    python -m benchmarks.compare baseline.json candidate.json --metric p50_ms --max-regression 0.10
+"""
+
+import argparse
+import json
+
+
+def _flatten(report: dict, prefix: str = "") -> dict:
+    values = {}
+    for key, value in report.items():
+        if key == "environment":
+            continue
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = float(value)
+    return values
+
+
+def compare_reports(baseline: dict, candidate: dict, metric: str, max_regression: float) -> dict:
+    """
+    Bandingkan metric latency (lebih kecil lebih baik) dan *_per_second (lebih besar lebih baik)
+
+    Parameters:
+    - baseline / candidate: Report JSON
+    - metric: Nama metric latency yang dibandingkan (mis. p50_ms, p95_ms, mean_ms)
+    - max_regression: Toleransi relatif (0.10 = 10% lebih lambat)
+
+    Returns:
+    - Dictionary berisi perubahan per metric dan daftar regresi
+    """
+
+    old, new = _flatten(baseline), _flatten(candidate)
+    changes, regressions = {}, []
+
+    for path in sorted(old.keys() & new.keys()):
+        lower_is_better = path.endswith(f".{metric}")
+        higher_is_better = path.endswith("_per_second")
+        if not (lower_is_better or higher_is_better) or old[path] == 0:
+            continue
+
+        change = (new[path] - old[path]) / old[path]
+        changes[path] = {"baseline": old[path], "candidate": new[path], "change": round(change, 4)}
+
+        if (lower_is_better and change > max_regression) or (higher_is_better and -change > max_regression):
+            regressions.append(path)
+
+    return {
+        "baseline_commit": baseline.get("environment", {}).get("commit"),
+        "candidate_commit": candidate.get("environment", {}).get("commit"),
+        "metric": metric,
+        "max_regression": max_regression,
+        "changes": changes,
+        "regressions": regressions
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan dua report benchmark JSON")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p50_ms")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    result = compare_reports(baseline, candidate, args.metric, args.max_regression)
+    print(json.dumps(result, indent=2))
+
+    if result["regressions"]:
+        print(f"❌ {len(result['regressions'])} metric(s) regressed more than {args.max_regression:.0%}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
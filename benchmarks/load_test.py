@@ -0,0 +1,172 @@
+"""
+Load Test
+Mengukur throughput dan persentil latency end-to-end /api/classify dan /api/classify/batch
+lewat client ASGI in-process (httpx), tanpa server dan jaringan
+
+Log prediksi, statistik, dan cache ditulis ke folder sementara agar riwayat asli tidak tercampur.
+Setiap request memakai isi file yang berbeda (kecuali --allow-cache-hits) sehingga
+cache prediksi tidak membuat hasil terlihat lebih cepat.
+
+Contoh:
+    python -m benchmarks.load_test --endpoint classify --requests 500 --concurrency 32
+    python -m benchmarks.load_test --endpoint batch --files-per-request 16 --output benchmarks/results/load.json
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.common import environment_info, summarize_latencies, synthetic_image, write_report
+
+
+ENDPOINTS = {
+    "classify": "/api/classify",
+    "batch": "/api/classify/batch"
+}
+
+
+def _isolate_storage(directory: str):
+    # Harus diset sebelum app di-import (konfigurasi dibaca saat import)
+    os.environ["PREDICTION_DB"] = os.path.join(directory, "predictions.sqlite")
+    os.environ["PREDICTION_LOG_FILE"] = os.path.join(directory, "prediction_logs.txt")
+    os.environ["STATS_SNAPSHOT_FILE"] = os.path.join(directory, "stats_snapshot.json")
+    os.environ["PREDICTION_CACHE_DB"] = ""
+    os.environ["JOB_DB"] = os.path.join(directory, "jobs.sqlite")
+    os.environ["JOB_STORAGE_DIR"] = os.path.join(directory, "jobs")
+    os.environ["RATE_LIMIT_DB"] = os.path.join(directory, "rate_limit.sqlite")
+    # Semua request datang dari satu client; batas kapasitas global tetap aktif
+    os.environ.setdefault("RATE_LIMIT_RPS", "0")
+
+
+class PayloadFactory:
+    """
+    Menghasilkan isi file upload; byte tambahan setelah akhir gambar membuat hash
+    setiap request berbeda tanpa mengubah hasil decode
+    """
+
+    def __init__(self, resolution: tuple, pool_size: int, unique: bool):
+        width, height = resolution
+        self.pool = [synthetic_image(width, height, seed=i) for i in range(max(1, pool_size))]
+        self.unique = unique
+        self._counter = 0
+
+    def next(self) -> bytes:
+        data = self.pool[self._counter % len(self.pool)]
+        if self.unique:
+            data = data + self._counter.to_bytes(8, "big")
+        self._counter += 1
+        return data
+
+
+async def _run_phase(client, endpoint: str, payloads: PayloadFactory, total_requests: int,
+                     concurrency: int, files_per_request: int) -> dict:
+    latencies = []
+    statuses = Counter()
+    remaining = [total_requests]
+
+    async def _worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+
+            if endpoint == "batch":
+                files = [
+                    ("files", (f"image_{i}.jpg", payloads.next(), "image/jpeg"))
+                    for i in range(files_per_request)
+                ]
+            else:
+                files = {"file": ("image.jpg", payloads.next(), "image/jpeg")}
+
+            start = time.perf_counter()
+            try:
+                response = await client.post(ENDPOINTS[endpoint], files=files)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_worker() for _ in range(max(1, concurrency))])
+    elapsed = time.perf_counter() - start
+
+    images = (files_per_request if endpoint == "batch" else 1) * statuses.get("200", 0)
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(total_requests / elapsed, 2) if elapsed else None,
+        "images_per_second": round(images / elapsed, 2) if elapsed else None,
+        "status_counts": dict(statuses),
+        "latency": summarize_latencies(latencies)
+    }
+
+
+async def run_load_test(args) -> dict:
+    """
+    Jalankan lifespan app, warm-up, lalu fase pengukuran
+
+    Returns:
+    - Dictionary report (throughput, persentil latency, statistik batching)
+    """
+
+    import httpx
+    from app.main import app
+    from app.utils.model_registry import model_registry
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    payloads = PayloadFactory((width, height), args.pool_size, unique=not args.allow_cache_hits)
+
+    async with app.router.lifespan_context(app):
+        # Tunggu model siap agar waktu load tidak ikut terukur
+        await asyncio.get_running_loop().run_in_executor(None, model_registry.wait_until_loaded)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            if args.warmup:
+                await _run_phase(client, args.endpoint, payloads, args.warmup,
+                                 args.concurrency, args.files_per_request)
+
+            result = await _run_phase(client, args.endpoint, payloads, args.requests,
+                                      args.concurrency, args.files_per_request)
+
+            stats = (await client.get("/api/classify/stats")).json()
+
+    return {
+        "environment": environment_info(),
+        "config": {
+            "endpoint": ENDPOINTS[args.endpoint],
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "files_per_request": args.files_per_request if args.endpoint == "batch" else 1,
+            "resolution": args.resolution,
+            "cache_hits_allowed": args.allow_cache_hits
+        },
+        "model": model_registry.get_status(),
+        "result": result,
+        "batching": stats.get("batching")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test end-to-end API klasifikasi (in-process)")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="classify")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--files-per-request", type=int, default=8, help="Untuk --endpoint batch")
+    parser.add_argument("--resolution", default="1280x960")
+    parser.add_argument("--pool-size", type=int, default=16, help="Jumlah gambar sintetis dasar")
+    parser.add_argument("--warmup", type=int, default=10, help="Jumlah request warm-up (tidak diukur)")
+    parser.add_argument("--allow-cache-hits", action="store_true")
+    parser.add_argument("--output", help="Simpan report JSON ke file ini")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _isolate_storage(tmp_dir)
+        report = asyncio.run(run_load_test(args))
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Micro Benchmark
+Mengukur preprocess_image / preprocess_image_from_bytes di beberapa resolusi input
+dan predict_image / predict_batch di beberapa ukuran batch (model pengganti
+deterministik dipakai jika file .h5 tidak ada)
+
+Contoh:
+    python -m benchmarks.micro --output benchmarks/results/micro.json
+    python -m benchmarks.compare benchmarks/results/micro_main.json benchmarks/results/micro.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.utils.helper import SyntheticBackend, load_model, predict_image, predict_batch
+from app.utils.preprocessing import preprocess_image, preprocess_image_from_bytes
+from benchmarks.common import environment_info, summarize_latencies, synthetic_image, write_report
+
+
+DEFAULT_RESOLUTIONS = "640x480,1280x960,1920x1080,4032x3024"
+DEFAULT_BATCH_SIZES = "1,2,4,8,16,32,64"
+
+
+def _parse_resolutions(value: str) -> list:
+    resolutions = []
+    for item in value.split(","):
+        width, height = item.lower().split("x")
+        resolutions.append((int(width), int(height)))
+    return resolutions
+
+
+def _time_calls(fn, repeat: int, warmup: int = 1) -> list:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_preprocess(resolutions: list, formats: list, repeat: int) -> dict:
+    """
+    Benchmark preprocessing dari path file dan dari bytes
+
+    Returns:
+    - Dictionary per "<format>_<WxH>" berisi ringkasan latency kedua fungsi
+    """
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for fmt in formats:
+            for width, height in resolutions:
+                data = synthetic_image(width, height, seed=width * height, fmt=fmt.upper())
+                path = os.path.join(tmp_dir, f"{width}x{height}.{fmt.lower()}")
+                with open(path, "wb") as f:
+                    f.write(data)
+
+                report[f"{fmt.lower()}_{width}x{height}"] = {
+                    "input_bytes": len(data),
+                    "preprocess_image": summarize_latencies(
+                        _time_calls(lambda: preprocess_image(path), repeat)
+                    ),
+                    "preprocess_image_from_bytes": summarize_latencies(
+                        _time_calls(lambda: preprocess_image_from_bytes(data), repeat)
+                    )
+                }
+    return report
+
+
+def bench_predict(model, batch_sizes: list, repeat: int) -> dict:
+    """
+    Benchmark predict_image dan predict_batch untuk setiap ukuran batch
+
+    Returns:
+    - Dictionary per "batch_<N>" berisi ringkasan latency dan throughput
+    """
+
+    rng = np.random.default_rng(0)
+    report = {}
+    for batch_size in batch_sizes:
+        batch = rng.random((batch_size, 224, 224, 3), dtype=np.float32)
+
+        image_latencies = _time_calls(lambda: predict_image(model, batch), repeat)
+        batch_latencies = _time_calls(lambda: predict_batch(model, batch), repeat)
+
+        batch_summary = summarize_latencies(batch_latencies)
+        report[f"batch_{batch_size}"] = {
+            "predict_image": summarize_latencies(image_latencies),
+            "predict_batch": batch_summary,
+            "images_per_second": round(batch_size * 1000.0 / batch_summary["p50_ms"], 1)
+            if batch_summary["p50_ms"] else None
+        }
+    return report
+
+
+def synthetic_calibration(predict_report: dict) -> dict:
+    """
+    Estimasi biaya per batch dan per gambar (regresi linear p50 terhadap ukuran batch)
+    untuk SYNTHETIC_BATCH_MS / SYNTHETIC_IMAGE_MS
+
+    Returns:
+    - Dictionary nilai env yang disarankan, atau {} jika ukuran batch kurang dari dua
+    """
+
+    points = [
+        (int(key.split("_")[1]), value["predict_batch"]["p50_ms"])
+        for key, value in predict_report.items()
+    ]
+    if len({size for size, _ in points}) < 2:
+        return {}
+
+    sizes, latencies = np.array(points, dtype=np.float64).T
+    image_ms, batch_ms = np.polyfit(sizes, latencies, 1)
+    return {
+        "SYNTHETIC_COST": "sleep",
+        "SYNTHETIC_BATCH_MS": round(max(0.0, batch_ms), 2),
+        "SYNTHETIC_IMAGE_MS": round(max(0.0, image_ms), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro benchmark preprocessing dan inferensi")
+    parser.add_argument("--model", default="app/models/wereng_classifier.h5")
+    parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help="Daftar WxH dipisah koma")
+    parser.add_argument("--formats", nargs="+", default=["jpeg", "png"], choices=["jpeg", "png"])
+    parser.add_argument("--batch-sizes", default=DEFAULT_BATCH_SIZES, help="Daftar ukuran batch dipisah koma")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--skip-preprocess", action="store_true")
+    parser.add_argument("--skip-predict", action="store_true")
+    parser.add_argument("--output", help="Simpan report JSON ke file ini")
+    args = parser.parse_args()
+
+    report = {"environment": environment_info()}
+
+    if not args.skip_preprocess:
+        report["preprocess"] = bench_preprocess(
+            _parse_resolutions(args.resolutions), args.formats, args.repeat
+        )
+
+    if not args.skip_predict:
+        model = load_model(args.model) if os.path.exists(args.model) else None
+        if model is None:
+            # Tanpa file model: stack konvolusi NumPy (biaya CPU nyata, output deterministik)
+            model = SyntheticBackend(cost="conv")
+        report["model"] = {"backend": getattr(model, "name", "keras"), "path": args.model}
+        report["predict"] = bench_predict(
+            model, [int(size) for size in args.batch_sizes.split(",")], args.repeat
+        )
+        if model.variant != "synthetic":
+            report["synthetic_calibration"] = synthetic_calibration(report["predict"])
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
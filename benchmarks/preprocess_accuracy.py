@@ -0,0 +1,126 @@
+"""
+Preprocessing Accuracy vs Speed Benchmark
+Membandingkan jalur preprocessing lama (decode penuh + LANCZOS) dengan jalur cepat
+(JPEG draft mode + filter resampling yang bisa dipilih) pada sekumpulan gambar referensi
+
+Contoh:
+    python -m benchmarks.preprocess_accuracy --images path/to/reference --resample bilinear
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from app.utils.preprocessing import load_image, RESAMPLE_FILTERS
+from app.utils.helper import load_model, predict_batch
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def _to_array(img) -> np.ndarray:
+    return np.asarray(img, dtype=np.float32)[np.newaxis] / 255.0
+
+
+def _list_images(image_dir: str) -> list:
+    paths = []
+    for root, _, files in os.walk(image_dir):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def run_benchmark(image_dir: str, resample: str, model_path: str, repeat: int = 3,
+                  reducing_gap: float = 3.0) -> dict:
+    """
+    Jalankan benchmark pada semua gambar di image_dir
+
+    Parameters:
+    - image_dir: Folder gambar referensi
+    - resample: Filter resampling untuk jalur cepat
+    - model_path: Path model untuk cek kesamaan prediksi (dilewati jika tidak ada)
+    - repeat: Jumlah pengulangan decode per gambar
+    - reducing_gap: Nilai PREPROCESS_REDUCING_GAP untuk jalur cepat
+
+    Returns:
+    - Dictionary ringkasan hasil benchmark
+    """
+
+    paths = _list_images(image_dir)
+    if not paths:
+        raise SystemExit(f"No images found in {image_dir}")
+
+    model = load_model(model_path) if os.path.exists(model_path) else None
+
+    baseline_times, fast_times, pixel_diffs = [], [], []
+    baseline_arrays, fast_arrays = [], []
+
+    for path in paths:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            baseline = load_image(path, resample="lanczos", use_draft=False, reducing_gap=0)
+        baseline_times.append((time.perf_counter() - start) / repeat)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fast = load_image(path, resample=resample, use_draft=True, reducing_gap=reducing_gap)
+        fast_times.append((time.perf_counter() - start) / repeat)
+
+        baseline_arrays.append(_to_array(baseline))
+        fast_arrays.append(_to_array(fast))
+        pixel_diffs.append(float(np.abs(baseline_arrays[-1] - fast_arrays[-1]).mean()))
+
+    report = {
+        "images": len(paths),
+        "resample": resample,
+        "baseline_ms_mean": round(1000 * float(np.mean(baseline_times)), 3),
+        "fast_ms_mean": round(1000 * float(np.mean(fast_times)), 3),
+        "speedup": round(float(np.sum(baseline_times) / max(np.sum(fast_times), 1e-9)), 2),
+        "mean_abs_pixel_diff": round(float(np.mean(pixel_diffs)), 5),
+        "max_abs_pixel_diff": round(float(np.max(pixel_diffs)), 5),
+        "model_checked": model is not None
+    }
+
+    if model is not None:
+        baseline_preds = predict_batch(model, np.concatenate(baseline_arrays, axis=0))
+        fast_preds = predict_batch(model, np.concatenate(fast_arrays, axis=0))
+
+        mismatches = [
+            {"image": path, "baseline": b["label"], "fast": f["label"]}
+            for path, b, f in zip(paths, baseline_preds, fast_preds)
+            if b["class_id"] != f["class_id"]
+        ]
+        report["top1_agreement"] = round(1 - len(mismatches) / len(paths), 4)
+        report["max_confidence_delta"] = round(max(
+            abs(b["confidence"] - f["confidence"]) if b["class_id"] == f["class_id"] else 1.0
+            for b, f in zip(baseline_preds, fast_preds)
+        ), 5)
+        report["mismatches"] = mismatches
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jalur preprocessing cepat vs lama")
+    parser.add_argument("--images", required=True, help="Folder gambar referensi")
+    parser.add_argument("--resample", default="bilinear", choices=sorted(RESAMPLE_FILTERS))
+    parser.add_argument("--model", default="app/models/wereng_classifier.h5")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reducing-gap", type=float, default=3.0)
+    parser.add_argument("--min-agreement", type=float, default=1.0,
+                        help="Exit code 1 jika top-1 agreement di bawah nilai ini")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.images, args.resample, args.model, args.repeat, args.reducing_gap)
+    print(json.dumps(report, indent=2))
+
+    if report.get("top1_agreement", 1.0) < args.min_agreement:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
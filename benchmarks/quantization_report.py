@@ -0,0 +1,132 @@
+"""
+Quantization Accuracy Regression Harness
+Membandingkan varian model terkuantisasi (dynamic, int8) dengan model float:
+top-1 agreement, selisih confidence, dan latency per batch
+
+Contoh:
+    python -m app.utils.converter --format dynamic int8 --calibration-dir dataset/train
+    python -m benchmarks.quantization_report --images dataset/validation --min-agreement 0.99
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from app.utils.helper import MODEL_VARIANTS, load_model
+from app.utils.preprocessing import preprocess_batch
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def _list_images(image_dir: str, limit: int) -> list:
+    paths = []
+    for root, _, files in os.walk(image_dir):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return paths[:limit] if limit else paths
+
+
+def _predict_all(model, images: np.ndarray, batch_size: int) -> tuple:
+    outputs = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        outputs.append(model.predict(images[i:i + batch_size]))
+    elapsed = time.perf_counter() - start
+    return np.concatenate(outputs, axis=0), elapsed
+
+
+def _latency_ms(model, batch: np.ndarray, repeat: int) -> float:
+    model.predict(batch)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(batch)
+    return 1000 * (time.perf_counter() - start) / repeat
+
+
+def run_report(model_path: str, image_dir: str, variants: list, batch_size: int, limit: int) -> dict:
+    """
+    Jalankan evaluasi semua varian terhadap model float
+
+    Returns:
+    - Dictionary hasil per varian
+    """
+
+    paths = _list_images(image_dir, limit)
+    if not paths:
+        raise SystemExit(f"No images found in {image_dir}")
+
+    # Copy karena preprocess_batch mengembalikan view buffer yang dipakai ulang
+    images = preprocess_batch(paths).copy()
+
+    reference_model = load_model(model_path, variant="float")
+    if reference_model is None:
+        raise SystemExit("Float model could not be loaded")
+
+    reference, reference_seconds = _predict_all(reference_model, images, batch_size)
+    report = {
+        "images": len(paths),
+        "float": {
+            "backend": reference_model.name,
+            "throughput_ips": round(len(paths) / reference_seconds, 2),
+            "latency_ms_batch1": round(_latency_ms(reference_model, images[:1], 10), 3),
+            f"latency_ms_batch{batch_size}": round(_latency_ms(reference_model, images[:batch_size], 5), 3)
+        }
+    }
+
+    reference_top1 = reference.argmax(axis=1)
+    reference_conf = reference.max(axis=1)
+
+    for variant in variants:
+        model = load_model(model_path, variant=variant)
+        if model is None or getattr(model, "variant", "float") != variant:
+            report[variant] = {"error": f"{variant} model not available (run app.utils.converter first)"}
+            continue
+
+        output, seconds = _predict_all(model, images, batch_size)
+        top1 = output.argmax(axis=1)
+        agreement = top1 == reference_top1
+
+        report[variant] = {
+            "top1_agreement": round(float(agreement.mean()), 4),
+            "disagreements": [path for path, same in zip(paths, agreement) if not same],
+            "mean_abs_prob_diff": round(float(np.abs(output - reference).mean()), 5),
+            "max_confidence_drop": round(float(np.max(reference_conf - output.max(axis=1))), 5),
+            "throughput_ips": round(len(paths) / seconds, 2),
+            "latency_ms_batch1": round(_latency_ms(model, images[:1], 10), 3),
+            f"latency_ms_batch{batch_size}": round(_latency_ms(model, images[:batch_size], 5), 3)
+        }
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluasi varian model terkuantisasi vs float")
+    parser.add_argument("--model", default="app/models/wereng_classifier.h5")
+    parser.add_argument("--images", default="dataset/validation", help="Folder gambar evaluasi")
+    parser.add_argument("--variants", nargs="+", default=["dynamic", "int8"],
+                        choices=[v for v in MODEL_VARIANTS if v != "float"])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=0, help="Jumlah gambar maksimal (0 = semua)")
+    parser.add_argument("--min-agreement", type=float, default=0.0,
+                        help="Exit code 1 jika top-1 agreement varian di bawah nilai ini")
+    args = parser.parse_args()
+
+    report = run_report(args.model, args.images, args.variants, args.batch_size, args.limit)
+    print(json.dumps(report, indent=2))
+
+    failed = [
+        v for v in args.variants
+        if report[v].get("top1_agreement", 0.0) < args.min_agreement
+    ]
+    if failed:
+        print(f"❌ Agreement below {args.min_agreement}: {', '.join(failed)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Startup Benchmark
+Mengukur waktu import `app.main` (di proses baru) dan waktu model sampai siap
+(load + warm-up), dengan target maksimal yang bisa dipakai di CI
+
+Contoh:
+    python -m benchmarks.startup --max-import-seconds 1.5
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+def measure_import(module: str, repeat: int) -> dict:
+    """
+    Import module di proses Python baru dan catat waktu wall-clock serta modul termahal
+
+    Returns:
+    - Dictionary berisi waktu import dan 10 modul dengan cumulative import time terbesar
+    """
+
+    timings = []
+    slowest = []
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            env=env
+        )
+        timings.append(time.perf_counter() - start)
+
+        if result.returncode != 0:
+            raise SystemExit(f"Import of {module} failed:\n{result.stderr}")
+
+    # Baris importtime: "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|\s+(.*)", line)
+        if match:
+            slowest.append((int(match.group(2)), match.group(3).strip()))
+
+    slowest.sort(reverse=True)
+    return {
+        "module": module,
+        "import_seconds_min": round(min(timings), 3),
+        "import_seconds_max": round(max(timings), 3),
+        "slowest_imports": [
+            {"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in slowest[:10]
+        ]
+    }
+
+
+def measure_model_ready() -> dict:
+    """
+    Load model + warm-up di proses ini dan catat waktunya
+    """
+
+    from app.utils.model_manager import ModelManager
+
+    manager = ModelManager()
+    start = time.perf_counter()
+    manager.load()
+    status = manager.get_status()
+    status["ready_seconds"] = round(time.perf_counter() - start, 3)
+    manager.shutdown()
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark waktu startup worker")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-model", action="store_true", help="Hanya ukur waktu import")
+    parser.add_argument("--max-import-seconds", type=float, default=0.0,
+                        help="Exit code 1 jika waktu import (min) melebihi target ini")
+    args = parser.parse_args()
+
+    report = {"import": measure_import(args.module, args.repeat)}
+    if not args.skip_model:
+        report["model"] = measure_model_ready()
+
+    print(json.dumps(report, indent=2))
+
+    if args.max_import_seconds and report["import"]["import_seconds_min"] > args.max_import_seconds:
+        print(f"❌ Import time above target of {args.max_import_seconds}s")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Gunicorn Config
+Jalankan dengan: gunicorn -c gunicorn.conf.py app.main:app
+
+Dengan INFERENCE_MODE=shm, pool proses inferensi (shared memory) dibuat di proses master
+sebelum worker di-fork, sehingga semua worker memakai model yang sama tanpa load ulang.
+"""
+
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    from app.utils.shm_inference import INFERENCE_MODE, start_inference_pool
+
+    if INFERENCE_MODE == "shm":
+        start_inference_pool()
+
+
+def on_exit(server):
+    from app.utils.shm_inference import stop_inference_pool
+
+    stop_inference_pool()
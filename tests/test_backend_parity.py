@@ -0,0 +1,77 @@
+"""
+Test kesamaan output backend inferensi (Keras vs TFLite / ONNX)
+
+Model kecil dibuat dan di-export saat test berjalan; test dilewati jika
+TensorFlow / runtime backend tidak terpasang.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from app.utils.converter import export_onnx, export_tflite
+from app.utils.helper import CLASS_LABELS, load_model
+from app.utils.model_manager import MODEL_PATH
+
+ATOL = 1e-4
+
+
+@pytest.fixture(scope="module")
+def keras_model_path(tmp_path_factory):
+    tf.random.set_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(224, 224, 3)),
+        tf.keras.layers.Conv2D(8, 3, strides=4, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(len(CLASS_LABELS), activation="softmax")
+    ])
+    path = str(tmp_path_factory.mktemp("model") / "wereng_classifier.h5")
+    model.save(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return np.random.default_rng(0).random((4, 224, 224, 3), dtype=np.float32)
+
+
+def _assert_parity(model_path: str, backend: str, batch: np.ndarray):
+    reference = load_model(model_path, backend="keras", variant="float")
+    model = load_model(model_path, backend=backend, variant="float")
+
+    # load_model fallback ke keras jika runtime / file tidak ada
+    assert model is not None and model.name == backend
+
+    expected = reference.predict(batch)
+    output = model.predict(batch)
+    assert output.shape == expected.shape
+    np.testing.assert_allclose(output, expected, atol=ATOL)
+    assert (output.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_tflite_matches_keras(keras_model_path, batch):
+    export_tflite(keras_model_path)
+    _assert_parity(keras_model_path, "tflite", batch)
+
+
+def test_onnx_matches_keras(keras_model_path, batch):
+    pytest.importorskip("tf2onnx")
+    pytest.importorskip("onnxruntime")
+
+    export_onnx(keras_model_path)
+    _assert_parity(keras_model_path, "onnx", batch)
+
+
+@pytest.mark.parametrize("backend", ["tflite", "onnx"])
+def test_exported_production_model_matches_keras(backend, batch):
+    # File hasil app.utils.converter di samping model asli (jika ada)
+    exported = f"{os.path.splitext(MODEL_PATH)[0]}.{backend}"
+    if not (os.path.exists(MODEL_PATH) and os.path.exists(exported)):
+        pytest.skip(f"{MODEL_PATH} or {exported} not found")
+    if backend == "onnx":
+        pytest.importorskip("onnxruntime")
+
+    _assert_parity(MODEL_PATH, backend, batch)
@@ -0,0 +1,122 @@
+"""
+Test MicroBatcher: penggabungan request, urutan hasil, dan penanganan error
+"""
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.utils.batcher import MicroBatcher
+from app.utils.executor import ExecutorSaturated
+
+
+def _image(value: int) -> np.ndarray:
+    return np.full((224, 224, 3), value, dtype=np.uint8)
+
+
+def _echo_predict(batch: np.ndarray) -> list:
+    # Hasil menyimpan nilai piksel agar urutan bisa dicek
+    return [{"value": int(image[0, 0, 0])} for image in batch]
+
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def _make(predict_fn=_echo_predict, **kwargs):
+        kwargs.setdefault("max_wait_ms", 20)
+        batcher = MicroBatcher(predict_fn, normalize=False, **kwargs)
+        batchers.append(batcher)
+        return batcher
+
+    yield _make
+    for batcher in batchers:
+        batcher.stop()
+
+
+def test_results_follow_submission_order(make_batcher):
+    batcher = make_batcher(max_batch_size=4)
+
+    futures = batcher.submit_many([_image(value) for value in range(6)])
+
+    assert [f.result(timeout=5)["value"] for f in futures] == list(range(6))
+    stats = batcher.get_stats()
+    assert stats["total_items"] == 6
+    assert stats["total_batches"] >= 2
+
+
+def test_concurrent_submissions_are_batched(make_batcher):
+    batch_sizes = []
+
+    def predict(batch):
+        batch_sizes.append(len(batch))
+        return _echo_predict(batch)
+
+    batcher = make_batcher(predict, max_batch_size=8, max_wait_ms=200)
+
+    futures = [batcher.submit(_image(value)) for value in range(4)]
+
+    assert [f.result(timeout=5)["value"] for f in futures] == [0, 1, 2, 3]
+    assert max(batch_sizes) > 1
+
+
+def test_wrong_result_count_fails_every_future(make_batcher):
+    batcher = make_batcher(lambda batch: _echo_predict(batch)[:-1], max_batch_size=4, max_wait_ms=200)
+
+    futures = batcher.submit_many([_image(value) for value in range(3)])
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+    assert batcher.get_stats()["total_errors"] >= 1
+
+
+def test_predict_error_is_propagated(make_batcher):
+    def predict(batch):
+        raise ValueError("boom")
+
+    batcher = make_batcher(predict)
+
+    with pytest.raises(ValueError, match="boom"):
+        batcher.submit(_image(1)).result(timeout=5)
+
+
+def test_full_queue_is_rejected(make_batcher):
+    started = threading.Event()
+    release = threading.Event()
+
+    def predict(batch):
+        started.set()
+        release.wait(timeout=5)
+        return _echo_predict(batch)
+
+    batcher = make_batcher(predict, max_batch_size=1, max_queue=1, max_wait_ms=0)
+
+    first = batcher.submit(_image(1))
+    assert started.wait(timeout=5)
+    queued = batcher.submit(_image(2))
+
+    with pytest.raises(ExecutorSaturated):
+        batcher.submit(_image(3))
+    assert batcher.get_stats()["total_rejected"] == 1
+
+    release.set()
+    assert first.result(timeout=5)["value"] == 1
+    assert queued.result(timeout=5)["value"] == 2
+
+
+def test_predict_many_chunks_and_returns_exceptions(make_batcher):
+    batcher = make_batcher(max_batch_size=2, max_queue=2)
+
+    results = asyncio.run(batcher.predict_many([_image(value) for value in range(5)]))
+    assert [result["value"] for result in results] == list(range(5))
+
+    # Potongan yang lebih besar dari antrian ditolak per gambar, bukan seluruh request
+    small_queue = make_batcher(max_batch_size=2, max_queue=1)
+    results = asyncio.run(small_queue.predict_many([_image(1), _image(2)], return_exceptions=True))
+    assert all(isinstance(result, ExecutorSaturated) for result in results)
+
+    with pytest.raises(ExecutorSaturated):
+        asyncio.run(small_queue.predict_many([_image(1), _image(2)]))
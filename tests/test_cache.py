@@ -0,0 +1,82 @@
+"""
+Test PredictionCache: cache key, LRU + TTL di memory, dan tier disk SQLite
+"""
+
+import numpy as np
+
+from app.utils.cache import PredictionCache, make_cache_key
+
+
+def _result(label: str = "Wereng Coklat") -> dict:
+    return {
+        "label": label,
+        "confidence": 0.9,
+        "class_id": 0,
+        "probs": np.array([0.9, 0.05, 0.03, 0.02], dtype=np.float32)
+    }
+
+
+def test_cache_key_depends_on_content_and_version():
+    key = make_cache_key(b"image", "1.0.0")
+
+    assert key == make_cache_key(b"image", "1.0.0")
+    assert key.startswith("1.0.0:")
+    assert key != make_cache_key(b"image", "1.1.0")
+    assert key != make_cache_key(b"other", "1.0.0")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = PredictionCache(max_size=2, ttl=60, db_path="")
+
+    cache.set("a", _result("a"))
+    cache.set("b", _result("b"))
+    assert cache.get("a")["label"] == "a"
+    cache.set("c", _result("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a")["label"] == "a"
+    assert cache.get("c")["label"] == "c"
+
+    stats = cache.get_stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["memory_hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_expired_entries_are_not_returned():
+    cache = PredictionCache(max_size=8, ttl=-1, db_path="")
+
+    cache.set("a", _result())
+
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PredictionCache(max_size=0, ttl=60, db_path="")
+
+    cache.set("a", _result())
+
+    assert not cache.enabled
+    assert cache.get("a") is None
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    db_path = str(tmp_path / "cache" / "prediction_cache.sqlite")
+    writer = PredictionCache(max_size=8, ttl=60, db_path=db_path)
+    reader = PredictionCache(max_size=8, ttl=60, db_path=db_path)
+
+    writer.set("a", _result())
+    value = reader.get("a")
+
+    assert value["label"] == "Wereng Coklat"
+    np.testing.assert_allclose(value["probs"], _result()["probs"])
+    assert reader.get_stats()["disk_hits"] == 1
+
+    # Hit berikutnya dilayani tier memory
+    reader.get("a")
+    assert reader.get_stats()["memory_hits"] == 1
+
+    writer.clear()
+    assert PredictionCache(max_size=8, ttl=60, db_path=db_path).get("a") is None